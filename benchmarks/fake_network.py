@@ -0,0 +1,171 @@
+# benchmarks/fake_network.py
+
+import asyncio
+import ipaddress
+import itertools
+import socket
+import threading
+
+# SSH identification strings handed out in turn to the fake SSH hosts
+SSH_BANNERS = [
+    'SSH-2.0-OpenSSH_8.9p1 Ubuntu-3ubuntu0.6',
+    'SSH-2.0-OpenSSH_9.2p1 Debian-2+deb12u2',
+    'SSH-2.0-Cisco-1.25',
+    'SSH-2.0-ROSSSH',
+    'SSH-2.0-dropbear_2022.83',
+    'SSH-2.0-OpenSSH_9.6',
+]
+
+# Ports each kind of host listens on; every other port of a loopback
+# address refuses the connection (RST), like a live host with that port closed
+HOST_KINDS = {
+    'ssh': (22,),         # SSH server sending a banner
+    'netconf': (22, 830),  # SSH + NETCONF over SSH
+    'web': (80, 443),     # Web interface only
+    'switch': (22, 23, 80, 443, 830),  # Everything a managed switch may expose
+    'silent': (22,),      # Accepts connections on 22 and never says anything
+    'filtered': (),       # Drops every SYN on the scanned ports: looks down
+    'closed': (),         # Refuses everything: up, no open port
+}
+
+
+def parse_mix(mix):
+    """'ssh:50,web:20' -> [('ssh', 50), ('web', 20)]"""
+    parsed = []
+    for entry in mix.split(','):
+        kind, _, count = entry.strip().partition(':')
+        if kind not in HOST_KINDS:
+            raise ValueError(f"Unknown host kind '{kind}' (expected one of {', '.join(HOST_KINDS)})")
+        parsed.append((kind, int(count or 1)))
+    return parsed
+
+
+class FakeHost:
+    def __init__(self, ip, kind, banner=None):
+        self.ip = ip
+        self.kind = kind
+        self.banner = banner
+
+    @property
+    def ports(self):
+        return HOST_KINDS[self.kind]
+
+    def to_dict(self):
+        return {'ip': self.ip, 'kind': self.kind, 'ports': list(self.ports), 'banner': self.banner}
+
+
+class FakeNetwork:
+    def __init__(self, network='127.42.0.0/24', mix='ssh:20,web:10,closed:5', scan_ports=(22, 23, 80, 443, 161, 830),
+                 banner_delay=0.0):
+        """
+        Simulated hosts on loopback addresses (Linux routes all of
+        127.0.0.0/8 to lo, so no setup is needed).
+
+        Listening hosts are served by one asyncio event loop in a helper
+        thread. Filtered hosts rely on the kernel dropping SYNs to a
+        listener whose accept queue is full: each of their scanned ports has
+        a listener with a backlog of 0 that is never accepted from, filled
+        by a connection of our own.
+
+        Args:
+            network (str): Loopback range the hosts are placed in, from its
+                first host address
+            mix (str): Host kinds and counts, e.g. 'ssh:50,web:20,filtered:5'
+            scan_ports (tuple): Ports the scanner probes (filtered hosts drop them all)
+            banner_delay (float): Seconds a server waits before its banner
+        """
+        self.network = ipaddress.IPv4Network(network)
+        if not self.network.subnet_of(ipaddress.IPv4Network('127.0.0.0/8')):
+            raise ValueError('The fake network must be inside 127.0.0.0/8')
+        self.scan_ports = scan_ports
+        self.banner_delay = banner_delay
+        self.hosts = []
+        banners = itertools.cycle(SSH_BANNERS)
+        addresses = self.network.hosts()
+        for kind, count in parse_mix(mix):
+            for _ in range(count):
+                try:
+                    ip = str(next(addresses))
+                except StopIteration:
+                    raise ValueError(f'{self.network} is too small for the host mix {mix}')
+                self.hosts.append(FakeHost(ip, kind, next(banners) if 22 in HOST_KINDS[kind] else None))
+        self.connections = 0
+        self._loop = None
+        self._thread = None
+        self._servers = []
+        self._sockets = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def host(self, ip):
+        return next((host for host in self.hosts if host.ip == ip), None)
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='fake-network', daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start_servers(), self._loop).result()
+        for host in self.hosts:
+            if host.kind == 'filtered':
+                for port in self.scan_ports:
+                    self._drop_syns(host.ip, port)
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._stop_servers(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        for sock in self._sockets:
+            sock.close()
+        self._sockets = []
+
+    async def _start_servers(self):
+        for host in self.hosts:
+            for port in host.ports:
+                server = await asyncio.start_server(self._handler(host, port), host.ip, port,
+                                                    reuse_address=True, backlog=1024)
+                self._servers.append(server)
+
+    async def _stop_servers(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+
+    def _handler(self, host, port):
+        async def handle(reader, writer):
+            self.connections += 1
+            try:
+                if host.kind != 'silent' and port in (22, 830):
+                    if self.banner_delay:
+                        await asyncio.sleep(self.banner_delay)
+                    writer.write((host.banner + '\r\n').encode())
+                    await writer.drain()
+                # Hold the connection until the client goes away
+                await reader.read(1024)
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                writer.close()
+        return handle
+
+    def _drop_syns(self, ip, port):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((ip, port))
+        listener.listen(0)
+        self._sockets.append(listener)
+        # The queue holds backlog + 1 connections: once full, new SYNs are dropped
+        for _ in range(2):
+            filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            filler.setblocking(False)
+            filler.connect_ex((ip, port))
+            self._sockets.append(filler)
@@ -0,0 +1,243 @@
+# benchmarks/scanner_bench.py
+"""
+Benchmark of the network scanner against simulated hosts on loopback.
+
+    python benchmarks/scanner_bench.py --mix ssh:100,netconf:20,web:50,silent:20,filtered:10,closed:50
+
+Runs scan_network, quick_scan and _get_host_details_batch on the fake
+network and reports, for each: hosts/sec, p50/p99 per-host latency, and the
+peak threads, file descriptors and RSS of the process during the run.
+Latency is the time from the start of the scan to each host's on_host call
+for the scans, and from submission to on_host for _get_host_details_batch.
+
+The TCP sweep is always used, even where nmap is installed: the point is to
+measure this code, not nmap.
+"""
+
+import argparse
+import ipaddress
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_network import FakeNetwork  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the network scanner on a simulated loopback network')
+    parser.add_argument('--network', default='127.42.0.0/22',
+                        help='Loopback range the fake hosts are placed in (default: %(default)s)')
+    parser.add_argument('--mix', default='ssh:100,netconf:20,web:50,silent:20,filtered:10,closed:50',
+                        help='Host kinds and counts: ssh, netconf, web, switch, silent, filtered, closed '
+                             '(default: %(default)s)')
+    parser.add_argument('--banner-delay', type=float, default=0.0,
+                        help='Seconds the fake servers wait before sending their banner')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Probe rate budget per second (default: OVS_SCAN_RATE; 0 for unlimited)')
+    parser.add_argument('--timeout', type=float, default=1.0,
+                        help='Seconds per TCP probe and fingerprinting probe (default: %(default)s)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Let quick_scan reuse the fingerprints of the first scan')
+    parser.add_argument('--resolve-names', action='store_true', help='Look host names up in reverse DNS')
+    parser.add_argument('--snmp-community', default='public', help="SNMP community ('' to skip SNMP)")
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    return parser.parse_args()
+
+
+class ResourceMonitor:
+    def __init__(self, interval=0.01):
+        """Peak threads, open file descriptors and RSS of this process, sampled in a thread"""
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.baseline = self.sample()
+        self.peak = dict(self.baseline)
+
+    @staticmethod
+    def sample():
+        with open('/proc/self/statm') as statm:
+            rss = int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        return {
+            'threads': threading.active_count(),
+            'fds': len(os.listdir('/proc/self/fd')),
+            'rss_mb': round(rss / 2 ** 20, 1),
+        }
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name='bench-monitor', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            for key, value in self.sample().items():
+                self.peak[key] = max(self.peak[key], value)
+            self._stop.wait(self.interval)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def measure(name, run):
+    """
+    Run run(on_host, latencies), by default timing each on_host call from
+    the start; run may append its own per-host latencies instead.
+
+    Returns:
+        dict: the measures of the run
+    """
+    latencies = []
+    lock = threading.Lock()
+    with ResourceMonitor() as monitor:
+        start = time.perf_counter()
+
+        def on_host(host_info):
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+        result = run(on_host, latencies)
+        elapsed = time.perf_counter() - start
+
+    hosts = result.get('hosts', [])
+    return {
+        'name': name,
+        'error': result.get('error'),
+        'hosts': len(hosts),
+        'switch_candidates': sum(1 for host in hosts if host.get('is_switch_candidate')),
+        'seconds': round(elapsed, 3),
+        'hosts_per_sec': round(len(hosts) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        'delta': {key: value if isinstance(value, int) else len(value)
+                  for key, value in (result.get('delta') or {}).items()},
+        'baseline': monitor.baseline,
+        'peak': monitor.peak,
+    }
+
+
+def run_benchmark(args):
+    from services import fingerprint, network_scanner, scan_scheduler, tcp_sweep
+
+    # The scanner logs every host at DEBUG level
+    logging.getLogger().setLevel(logging.WARNING)
+
+    scanner = network_scanner.NetworkScanner()
+    # The fake hosts are only seen by the sweep's own probes
+    scanner.check_nmap_installed = lambda: False
+    scanner.timeout = args.timeout
+    tcp_sweep.tcp_sweeper.timeout = args.timeout
+    fingerprint.fingerprinter.timeout = args.timeout
+    fingerprint.fingerprinter.community = args.snmp_community
+    if args.rate is not None:
+        scan_scheduler.probe_budget.rate = args.rate
+        scan_scheduler.probe_budget.capacity = max(1.0, args.rate)
+
+    net = FakeNetwork(args.network, args.mix, tuple(scanner.open_ports), args.banner_delay)
+    network = net.network
+    # Every other loopback address answers (RST): it would show up as a live
+    # host, so the scans stop at the last fake host
+    last = ipaddress.IPv4Address(net.hosts[-1].ip)
+    exclude = f'{last + 1}-{network.broadcast_address}' if last + 1 < network.broadcast_address else None
+    expected = sum(1 for host in net.hosts if host.kind != 'filtered')
+
+    results = []
+    with net:
+        results.append(measure('scan_network', lambda on_host, latencies: scanner.scan_network(
+            str(network), on_host=on_host, exclude=exclude, incremental=False,
+            resolve_names=args.resolve_names)))
+
+        results.append(measure('quick_scan', lambda on_host, latencies: scanner.quick_scan(
+            str(network.network_address), network.prefixlen, exclude=exclude, on_host=on_host,
+            incremental=args.incremental, resolve_names=args.resolve_names)))
+
+        def batch(on_host, latencies):
+            # Hosts as the sweep would hand them over, all at once: fingerprinting only
+            submitted = {}
+            lock = threading.Lock()
+
+            def swept_hosts():
+                for host in net.hosts:
+                    if host.kind == 'filtered':
+                        continue
+                    banners = {port: (None if host.kind == 'silent' else host.banner)
+                               for port in host.ports if port in fingerprint.BANNER_PORTS}
+                    submitted[host.ip] = time.perf_counter()
+                    yield host.ip, list(host.ports), banners
+
+            def timed(host_info):
+                with lock:
+                    latencies.append(time.perf_counter() - submitted[host_info['ip']])
+
+            return scanner._get_host_details_batch(swept_hosts(), on_host=timed,
+                                                   resolve_names=args.resolve_names)
+
+        results.append(measure('_get_host_details_batch', batch))
+
+    return {
+        'network': str(network),
+        'mix': args.mix,
+        'fake_hosts': len(net.hosts),
+        'expected_hosts': expected,
+        'connections_served': net.connections,
+        'probe_budget': scan_scheduler.probe_budget.stats(),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'runs': results,
+    }
+
+
+def print_report(report):
+    print(f"Fake network {report['network']}: {report['fake_hosts']} hosts ({report['mix']}), "
+          f"{report['expected_hosts']} reachable")
+    header = f"{'run':<26}{'hosts':>7}{'sec':>9}{'hosts/s':>10}{'p50 ms':>10}{'p99 ms':>10}" \
+             f"{'threads':>10}{'fds':>8}{'rss MB':>9}"
+    print(header)
+    print('-' * len(header))
+    for run in report['runs']:
+        if run['error']:
+            print(f"{run['name']:<26}error: {run['error']}")
+            continue
+        peak = run['peak']
+        print(f"{run['name']:<26}{run['hosts']:>7}{run['seconds']:>9}{run['hosts_per_sec']:>10}"
+              f"{str(run['p50_ms']):>10}{str(run['p99_ms']):>10}"
+              f"{peak['threads']:>10}{peak['fds']:>8}{peak['rss_mb']:>9}")
+    print()
+    for run in report['runs']:
+        if run['delta']:
+            print(f"{run['name']} delta: {run['delta']}")
+    print(f"Connections served by the fake hosts: {report['connections_served']}")
+    print(f"Probe budget: {report['probe_budget']}")
+    print(f"Peak RSS (ru_maxrss): {report['max_rss_mb']} MB")
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix='ovs-bench-') as tmp:
+        # Settings read at import time: a throwaway inventory, the SNMP community
+        os.environ['OVS_INVENTORY_DB'] = os.path.join(tmp, 'inventory.db')
+        os.environ['OVS_SNMP_COMMUNITY'] = args.snmp_community
+        report = run_benchmark(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,8 @@ from .ovs_load_config import load_config_bp
 from .api_backups import backup_api
 from .network_scan import network_scan_bp  # ✅ Import network scanner
 from .logging_routes import logging_routes_bp  # ✅ Import logging routes
+from .jobs import jobs_bp
+from .events import events_bp
 from flask import send_from_directory
 
 def init_routes(app):
@@ -25,4 +27,6 @@ def init_routes(app):
     app.register_blueprint(backup_api)
     app.register_blueprint(load_config_bp)
     app.register_blueprint(network_scan_bp)  # ✅ Register network scanner routes
-    app.register_blueprint(logging_routes_bp)  # ✅ Register logging routes
\ No newline at end of file
+    app.register_blueprint(logging_routes_bp)  # ✅ Register logging routes
+    app.register_blueprint(jobs_bp)  # Background jobs (scan, backup, restore)
+    app.register_blueprint(events_bp)  # Live progress (Server-Sent Events)
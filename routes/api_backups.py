@@ -3,6 +3,7 @@
 from flask import Blueprint, jsonify, request
 import os
 from services.ssh_utils import run_ovs_command, clean_ovs_output
+from services.deadline import Deadline
 
 backup_api = Blueprint('backup_api', __name__)
 
@@ -30,7 +31,7 @@ def list_bridges():
             return jsonify({"success": False, "error": "Password is required."}), 400
         
         # Get list of bridges
-        raw_output, err = run_ovs_command("ovs-vsctl list-br", password=password)
+        raw_output, err = run_ovs_command("ovs-vsctl list-br", password=password, deadline=Deadline())
         
         if err:
             return jsonify({
@@ -0,0 +1,79 @@
+# routes/events.py
+
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from services.event_bus import event_bus
+from services.job_engine import job_engine
+
+events_bp = Blueprint('events', __name__)
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_INTERVAL = 15
+
+def _publish_job(job):
+    event_bus.publish('job', job.to_dict(include_result=False), operation=job.operation)
+
+# Every background job reports its status and progress on the bus
+job_engine.add_listener(_publish_job)
+
+def _format_event(event):
+    payload = json.dumps({
+        'operation': event['operation'],
+        'time': event['time'],
+        'data': event['data']
+    }, default=str)
+    return f"id: {event['id']}\nevent: {event['topic']}\ndata: {payload}\n\n"
+
+@events_bp.route('/api/events', methods=['GET'])
+def stream_events():
+    """
+    Server-Sent Events stream of the progress of one operation.
+
+    Query parameters:
+    - operation: operation id (required); the id the client sent with the
+      request it started, so a client only sees its own operations
+    - topics: comma separated topic prefixes (scan, apply, backup, verify, job), all by default
+
+    A new stream first replays the operation's events still kept, so none
+    published before it connected is lost. A client too slow to keep up is
+    sent what is queued, then a 'dropped' event and disconnected; it
+    reconnects with Last-Event-ID and the missed events still kept are
+    replayed.
+    """
+    operation = request.args.get('operation', '').strip()
+    if not operation:
+        return jsonify({'success': False, 'error': 'Paramètre operation manquant'}), 400
+
+    topics = [t.strip() for t in request.args.get('topics', '').split(',') if t.strip()]
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else 0
+    except ValueError:
+        last_event_id = 0
+
+    subscription = event_bus.subscribe(topics=topics, operation=operation, last_event_id=last_event_id)
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                event = subscription.get(timeout=0 if subscription.dropped else HEARTBEAT_INTERVAL)
+                if event is None:
+                    if subscription.dropped:
+                        yield "event: dropped\ndata: {}\n\n"
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _format_event(event)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@events_bp.route('/api/events/stats', methods=['GET'])
+def event_statistics():
+    """Subscribers connected, events published and slow subscribers dropped"""
+    return jsonify({'success': True, 'statistics': event_bus.stats()})
@@ -0,0 +1,44 @@
+# routes/jobs.py
+
+from flask import Blueprint, request, jsonify
+from services.job_engine import job_engine
+
+jobs_bp = Blueprint('jobs', __name__)
+
+def submit_job(kind, func, *args, description='', operation=None):
+    """Submit func as a background job and answer 202 with where to follow it"""
+    job = job_engine.submit(kind, func, *args, description=description, operation=operation)
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f'/api/jobs/{job.id}'
+    }), 202
+
+@jobs_bp.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List known jobs (optionally ?kind=scan|backup|restore), newest first"""
+    jobs = job_engine.list(kind=request.args.get('kind'))
+    return jsonify({
+        'success': True,
+        'jobs': [job.to_dict(include_result=False) for job in jobs],
+        'stats': job_engine.stats()
+    })
+
+@jobs_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, progress and (once finished) result of a job"""
+    job = job_engine.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': f'Tâche inconnue ou expirée : {job_id}'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+@jobs_bp.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    job = job_engine.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': f'Tâche inconnue ou expirée : {job_id}'}), 404
+    if not job_engine.cancel(job_id):
+        return jsonify({'success': False, 'error': f'La tâche est déjà terminée ({job.status})'}), 409
+    return jsonify({'success': True, 'job': job.to_dict(include_result=False)})
@@ -2,6 +2,8 @@
 
 from flask import Blueprint, request, jsonify, send_file
 from services.action_logger import action_logger
+from services.ssh_scheduler import ssh_scheduler
+from services.ssh_pool import ssh_pool
 import io
 import datetime
 
@@ -164,6 +166,22 @@ def get_log_statistics():
         print(f"Get log statistics error: {str(e)}")
         return jsonify({'success': False, 'error': f'Failed to get statistics: {str(e)}'}), 500
 
+@logging_routes_bp.route('/api/ssh_stats', methods=['GET'])
+def get_ssh_statistics():
+    """
+    Get SSH scheduler queue/exec times per switch and pool usage
+    """
+    try:
+        return jsonify({
+            'success': True,
+            'scheduler': ssh_scheduler.stats(),
+            'pool': ssh_pool.stats()
+        })
+        
+    except Exception as e:
+        print(f"Get SSH statistics error: {str(e)}")
+        return jsonify({'success': False, 'error': f'Failed to get SSH statistics: {str(e)}'}), 500
+
 @logging_routes_bp.route('/api/clear_logs', methods=['POST'])
 def clear_logs():
     """
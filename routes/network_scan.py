@@ -2,6 +2,14 @@
 
 from flask import Blueprint, request, jsonify
 from services.network_scanner import NetworkScanner
+from services.deadline import Deadline
+from services.event_bus import event_bus
+from services.scan_ranges import MAX_SCAN_ADDRESSES, parse_exclusions, count_addresses, is_host_address
+from services.inventory import device_inventory
+from services.dns_resolver import reverse_resolver
+from services.scan_scheduler import scan_scheduler
+from routes.jobs import submit_job
+import ipaddress
 import re
 import logging
 import traceback
@@ -20,6 +28,9 @@ def scan_network():
         logger.info("Received network scan request")
         data = request.json or {}
         network_range = data.get('network_range')
+        exclude = data.get('exclude')  # Addresses, CIDR blocks or ranges to skip
+        incremental = not data.get('full_rescan')  # Re-probe every host, ignoring the inventory
+        resolve_names = data.get('resolve_names', True)  # False skips reverse DNS
 
         if not network_range:
             logger.warning("No network range provided")
@@ -36,35 +47,124 @@ def scan_network():
                 'error': 'Format de plage réseau invalide. Format attendu : 192.168.1.0/24'
             }), 400
 
+        try:
+            total = count_addresses(ipaddress.IPv4Network(network_range, strict=False), parse_exclusions(exclude))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Plage ou exclusions invalides : {str(e)}'
+            }), 400
+        if total > MAX_SCAN_ADDRESSES:
+            return jsonify({
+                'success': False,
+                'error': f'Plage trop grande : {total} adresses (maximum {MAX_SCAN_ADDRESSES})'
+            }), 400
+
+        if data.get('async'):
+            return submit_job('scan', _scan_job, network_range, exclude, incremental, resolve_names,
+                              description=f'Scan réseau {network_range}', operation=data.get('operation_id'))
+
         logger.info(f"Starting network scan for: {network_range}")
         
-        # Perform network scan
-        result = scanner.scan_network(network_range)
+        # Hosts and progress are streamed on /api/events while the request runs
+        operation = data.get('operation_id')
 
-        if 'error' in result:
-            logger.error(f"Network scan failed: {result['error']}")
+        def progress(done, total, message):
+            event_bus.publish('scan.progress', {'done': done, 'total': total, 'message': message},
+                              operation=operation)
+
+        payload, status = perform_scan(network_range, progress=progress, operation=operation, exclude=exclude,
+                                       incremental=incremental, resolve_names=resolve_names)
+        return jsonify(payload), status
+
+    except Exception as e:
+        logger.error(f"Network scan route error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': f"Échec du scan : {str(e)}"
+        }), 500
+
+def perform_scan(network_range, progress=None, operation=None, exclude=None, incremental=True, resolve_names=True,
+                 deadline=None):
+    """
+    Scan a range and summarise the result. Each host is published as a
+    'scan.host' event as soon as it has been analysed, and the changes
+    against the inventory as a 'scan.delta' event at the end.
+
+    Returns:
+        tuple: (response dict, HTTP status)
+    """
+    def on_host(host_info):
+        event_bus.publish('scan.host', host_info, operation=operation)
+
+    # Perform network scan
+    result = scanner.scan_network(network_range, progress=progress, on_host=on_host, exclude=exclude,
+                                  incremental=incremental, resolve_names=resolve_names, deadline=deadline)
+
+    if 'error' in result:
+        logger.error(f"Network scan failed: {result['error']}")
+        return {
+            'success': False,
+            'error': result['error']
+        }, 500
+
+    logger.info(f"Network scan completed. Found {len(result['hosts'])} hosts")
+    event_bus.publish('scan.delta', result['delta'], operation=operation)
+    
+    return {
+        'success': True,
+        'hosts': result['hosts'],
+        'total_found': len(result['hosts']),
+        'switch_candidates': len([
+            h for h in result['hosts'] if h.get('is_switch_candidate')
+        ]),
+        'delta': result['delta'],
+        'shared_with': result.get('shared_with')
+    }, 200
+
+def _scan_job(job, network_range, exclude=None, incremental=True, resolve_names=True):
+    def progress(done, total, message):
+        job.check_cancelled()
+        job.update(done=done, total=total, message=message)
+
+    logger.info(f"Starting network scan job {job.id} for: {network_range}")
+    payload, _ = perform_scan(network_range, progress=progress, operation=job.operation, exclude=exclude,
+                              incremental=incremental, resolve_names=resolve_names, deadline=job.deadline)
+    return payload
+
+@network_scan_bp.route('/api/inventory', methods=['GET'])
+def inventory():
+    """
+    Devices recorded by previous scans.
+
+    Query parameters:
+    - network: only the devices of this range (e.g. 192.168.1.0/24)
+    - all: 1 to include the devices not found by the last scan of their range
+    """
+    try:
+        network = request.args.get('network')
+        try:
+            network = ipaddress.IPv4Network(network, strict=False) if network else None
+        except ValueError:
             return jsonify({
                 'success': False,
-                'error': result['error']
-            }), 500
+                'error': 'Format de plage réseau invalide. Format attendu : 192.168.1.0/24'
+            }), 400
 
-        logger.info(f"Network scan completed. Found {len(result['hosts'])} hosts")
-        
+        hosts = device_inventory.hosts(network=network, include_gone=request.args.get('all') == '1')
         return jsonify({
             'success': True,
-            'hosts': result['hosts'],
-            'total_found': len(result['hosts']),
-            'switch_candidates': len([
-                h for h in result['hosts'] if h.get('is_switch_candidate')
-            ])
+            'hosts': hosts,
+            'total_found': len(hosts),
+            'last_scans': device_inventory.last_scans()
         })
 
     except Exception as e:
-        logger.error(f"Network scan route error: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.error(f"Inventory route error: {str(e)}")
         return jsonify({
             'success': False,
-            'error': f"Échec du scan : {str(e)}"
+            'error': f"Lecture de l'inventaire impossible : {str(e)}"
         }), 500
 
 @network_scan_bp.route('/api/test_switch', methods=['POST'])
@@ -92,7 +192,7 @@ def test_switch():
         logger.info(f"Testing switch connectivity for: {ip}")
         
         # Run the connectivity test
-        result = scanner.test_switch_connectivity(ip, username, password)
+        result = scanner.test_switch_connectivity(ip, username, password, deadline=Deadline())
         
         logger.info(f"Switch test result: {result}")
         return jsonify(result)
@@ -105,18 +205,121 @@ def test_switch():
             'error': f"Échec du test : {str(e)}"
         }), 500
 
+@network_scan_bp.route('/api/verify_switches', methods=['POST'])
+def verify_switches():
+    """
+    Check SSH authentication, sudo and Open vSwitch on several switches at
+    once, typically the candidates of a scan. Each result is published as a
+    'verify.result' event as soon as its switch has been checked.
+    """
+    try:
+        logger.info("Received switch verification request")
+        data = request.json or {}
+        hosts = data.get('hosts') or []  # IPs, or host records of a scan result
+        username = data.get('username', 'kali')
+        password = data.get('password')
+
+        if not password:
+            return jsonify({
+                'success': False,
+                'error': 'Mot de passe requis pour la vérification'
+            }), 400
+
+        ips = []
+        invalid = []
+        for host in hosts:
+            ip = host.get('ip') if isinstance(host, dict) else host
+            if not isinstance(ip, str) or not is_host_address(ip):
+                invalid.append(ip)
+            elif ip not in ips:
+                ips.append(ip)
+
+        if invalid:
+            return jsonify({
+                'success': False,
+                'error': f"Adresses invalides : {', '.join(str(ip) for ip in invalid)}"
+            }), 400
+        if not ips:
+            return jsonify({
+                'success': False,
+                'error': 'Aucun switch à vérifier'
+            }), 400
+
+        if data.get('async'):
+            return submit_job('verify', _verify_job, ips, username, password,
+                              description=f'Vérification de {len(ips)} switches',
+                              operation=data.get('operation_id'))
+
+        payload, status = perform_verification(ips, username, password, deadline=Deadline(),
+                                               operation=data.get('operation_id'))
+        return jsonify(payload), status
+
+    except Exception as e:
+        logger.error(f"Switch verification route error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': f"Échec de la vérification : {str(e)}"
+        }), 500
+
+def perform_verification(ips, username, password, deadline=None, operation=None, job=None):
+    """
+    Verify switches concurrently and summarise the results.
+
+    Returns:
+        tuple: (response dict, HTTP status)
+    """
+    def on_result(result):
+        event_bus.publish('verify.result', result, operation=operation)
+        if job is not None:
+            job.advance(message=f"{result['ip']} vérifié")
+
+    results = scanner.verify_switches(ips, username, password, deadline=deadline, on_result=on_result)
+    verified = len([r for r in results if r['success']])
+    logger.info(f"Switch verification completed: {verified}/{len(results)} switches verified")
+
+    return {
+        'success': True,
+        'results': results,
+        'total': len(results),
+        'verified': verified
+    }, 200
+
+def _verify_job(job, ips, username, password):
+    job.update(done=0, total=len(ips), message='Vérification des switches')
+    payload, _ = perform_verification(ips, username, password, deadline=job.deadline, operation=job.operation,
+                                      job=job)
+    return payload
+
 @network_scan_bp.route('/api/quick_scan', methods=['POST'])
 def quick_scan():
-    """Quick scan based on provided base IP (e.g., 192.168.1.1)"""
+    """Quick scan based on provided base IP (e.g., 192.168.1.1), /24 unless a prefix is given"""
     try:
         logger.info("Received quick scan request")
         data = request.json or {}
         base_ip = data.get('base_ip', '192.168.1.1')
+        prefix = data.get('prefix', 24)
 
-        logger.info(f"Starting quick scan from base IP: {base_ip}")
+        try:
+            if not 0 <= int(prefix) <= 32:
+                raise ValueError
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'Préfixe invalide (entre 0 et 32)'
+            }), 400
+
+        logger.info(f"Starting quick scan from base IP: {base_ip}/{prefix}")
         
+        operation = data.get('operation_id')
+
+        def on_host(host_info):
+            event_bus.publish('scan.host', host_info, operation=operation)
+
         # Perform the scan using the scanner's quick_scan method
-        result = scanner.quick_scan(base_ip)
+        result = scanner.quick_scan(base_ip, prefix=prefix, exclude=data.get('exclude'), on_host=on_host,
+                                    incremental=not data.get('full_rescan'),
+                                    resolve_names=data.get('resolve_names', True))
 
         if 'error' in result:
             logger.error(f"Quick scan failed: {result['error']}")
@@ -144,6 +347,8 @@ def scanner_health():
     try:
         health_info = {
             'nmap_available': scanner.check_nmap_installed(),
+            'reverse_dns': reverse_resolver.stats(),
+            'scan_scheduler': scan_scheduler.stats(),
             'scanner_ready': True,
             'python_version': str(__import__('sys').version_info),
         }
@@ -4,8 +4,11 @@ from flask import request, jsonify
 from datetime import datetime
 import os
 import yaml
-from services.ssh_utils import run_ovs_command, clean_ovs_output
+from services.ovs_state import read_switch_state
+from services.deadline import Deadline
+from services.event_bus import event_bus
 from services.action_logger import action_logger  # ✅ Import action logger
+from routes.jobs import submit_job
 
 BACKUP_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backup')
 
@@ -30,128 +33,124 @@ def register_backup_routes(app):
 
         action_logger.log_action(f"Backup started for switch '{switch_name}' on host '{hostname or 'localhost'}'", "SUCCESS")
 
-        # 🧠 Step 1: First verify the bridge exists
-        bridge_check_cmd = f"ovs-vsctl br-exists {switch_name}"
-        _, check_err = run_ovs_command(bridge_check_cmd, hostname=hostname, password=password)
-        
-        if check_err and "does not exist" in check_err.lower():
-            error_msg = f"Bridge '{switch_name}' does not exist. Available bridges can be seen with 'ovs-vsctl list-br'"
-            action_logger.log_action(f"Backup failed - {error_msg}", "ERROR")
-            return jsonify({
-                "success": False, 
-                "error": error_msg
-            }), 400
-
-        # 🧠 Step 2: Get list of ports on the given bridge
-        raw_ports, err = run_ovs_command(f"ovs-vsctl list-ports {switch_name}", hostname=hostname, password=password)
-        
-        if err and ("no bridge named" in err.lower() or "does not exist" in err.lower()):
-            error_msg = f"Bridge '{switch_name}' not found. Error: {err}"
-            action_logger.log_action(f"Backup failed - {error_msg}", "ERROR")
-            return jsonify({
-                "success": False, 
-                "error": error_msg
-            }), 400
-
-        # Clean and validate port output
-        cleaned_ports = clean_ovs_output(raw_ports)
-        if not cleaned_ports.strip():
-            # No ports found, but bridge exists
-            port_list = []
-        else:
-            port_list = [p.strip() for p in cleaned_ports.splitlines() if p.strip()]
-
-        # Filter out any error messages that might have slipped through
-        valid_ports = []
-        for port in port_list:
-            if "ovs-vsctl:" in port.lower() or "error:" in port.lower() or "no bridge" in port.lower():
-                continue  # Skip error messages
-            valid_ports.append(port)
-
-        action_logger.log_action(f"Found {len(valid_ports)} valid ports on bridge '{switch_name}'", "SUCCESS")
-
-        ports_data = []
-        interfaces_data = []
-
-        # 🧠 Step 3: For each valid port, get its interface type
-        for port in valid_ports:
-            if not port:
-                continue
-                
-            # Get interface type for the port
-            iface_type_cmd = f"ovs-vsctl get Interface {port} type"
-            iface_type_raw, iface_err = run_ovs_command(iface_type_cmd, hostname=hostname, password=password)
-            
-            if iface_err:
-                # If there's an error getting the type, set it as empty
-                iface_type = ""
-            else:
-                iface_type = clean_ovs_output(iface_type_raw).strip().strip('"')
-                # If the result is still an error message, set as empty
-                if "ovs-vsctl:" in iface_type.lower() or "error:" in iface_type.lower():
-                    iface_type = ""
-
-            ports_data.append({"name": port, "type": iface_type})
-            interfaces_data.append({"name": port, "type": iface_type})
-
-        # 🧠 Step 4: Also get bridge information
-        bridge_info_cmd = f"ovs-vsctl get Bridge {switch_name} datapath_id"
-        datapath_raw, dp_err = run_ovs_command(bridge_info_cmd, hostname=hostname, password=password)
-        
-        datapath_id = ""
-        if not dp_err:
-            datapath_id = clean_ovs_output(datapath_raw).strip().strip('"')
-            if "ovs-vsctl:" in datapath_id.lower() or "error:" in datapath_id.lower():
-                datapath_id = ""
-
-        # 🧠 Step 5: Build YAML structure
-        yaml_data = {
-            "metadata": {
-                "backup_date": datetime.now().isoformat(),
-                "source_host": hostname or "localhost",
-                "bridge_name": switch_name
-            },
-            "bridges": [{
-                "name": switch_name,
-                "datapath_id": datapath_id,
-                "ports": ports_data
-            }],
-            "interfaces": interfaces_data
-        }
-
-        # 🧠 Step 6: Save YAML file
-        if not os.path.exists(BACKUP_FOLDER):
-            os.makedirs(BACKUP_FOLDER)
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        host_suffix = f"_{hostname.replace('.', '_')}" if hostname else ""
-        filename = f"{switch_name}_backup{host_suffix}_{timestamp}.yaml"
-        filepath = os.path.join(BACKUP_FOLDER, filename)
-
-        try:
-            with open(filepath, "w") as f:
-                yaml.dump(yaml_data, f, default_flow_style=False, indent=2)
-            
-            action_logger.log_action(f"Backup completed successfully - File: {filename}", "SUCCESS", {
-                'filename': filename,
-                'ports_found': len(valid_ports),
-                'source_host': hostname or "localhost",
-                'bridge_name': switch_name
-            })
-            
-        except Exception as e:
-            error_msg = f"Failed to save backup file: {str(e)}"
-            action_logger.log_action(f"Backup failed - {error_msg}", "ERROR")
-            return jsonify({
-                "success": False,
-                "error": error_msg
-            }), 500
-
-        return jsonify({
-            "success": True,
-            "message": f"Backup saved to {filename}",
-            "file": filename,
-            "ports_found": len(valid_ports),
-            "bridge_exists": True,
-            "source_host": hostname or "localhost"
-        })
\ No newline at end of file
+        if data.get("async"):
+            return submit_job("backup", _backup_job, hostname, password, switch_name,
+                              description=f"Sauvegarde de '{switch_name}' sur {hostname or 'localhost'}",
+                              operation=data.get("operation_id"))
+
+        payload, status = perform_backup(hostname, password, switch_name, deadline=Deadline(),
+                                         operation=data.get("operation_id"))
+        return jsonify(payload), status
+
+def _backup_job(job, hostname, password, switch_name):
+    payload, _ = perform_backup(hostname, password, switch_name, deadline=job.deadline, job=job, operation=job.operation)
+    if payload.get("success"):
+        job.update(done=2, message=payload["message"])
+    return payload
+
+def perform_backup(hostname, password, switch_name, deadline=None, job=None, operation=None):
+    """
+    Read the switch state and write the YAML backup of one bridge.
+    Each port saved is published as a 'backup.port' event.
+
+    Returns:
+        tuple: (response dict, HTTP status)
+    """
+    # 🧠 Step 1: Read Bridge/Port/Interface tables in a single round-trip
+    if job is not None:
+        job.update(done=0, total=2, message="Lecture de l'état du switch")
+    state, state_err = read_switch_state(hostname, password, deadline=deadline)
+    if state_err:
+        error_msg = f"Failed to read switch state: {state_err}"
+        action_logger.log_action(f"Backup failed - {error_msg}", "ERROR")
+        return {
+            "success": False,
+            "error": error_msg
+        }, 500
+
+    # 🧠 Step 2: Verify the bridge exists
+    bridge = state.bridge(switch_name)
+    if bridge is None:
+        error_msg = f"Bridge '{switch_name}' does not exist. Available bridges can be seen with 'ovs-vsctl list-br'"
+        action_logger.log_action(f"Backup failed - {error_msg}", "ERROR")
+        return {
+            "success": False, 
+            "error": error_msg
+        }, 400
+
+    # 🧠 Step 3: Ports of the bridge with their interface type, joined
+    # on UUIDs by the topology model (same set and order as 'ovs-vsctl list-ports')
+    valid_ports = bridge.port_names()
+
+    action_logger.log_action(f"Found {len(valid_ports)} valid ports on bridge '{switch_name}'", "SUCCESS")
+
+    ports_data = []
+    interfaces_data = []
+    for index, port in enumerate(valid_ports, 1):
+        iface_type = state.port(port).type
+        ports_data.append({"name": port, "type": iface_type})
+        interfaces_data.append({"name": port, "type": iface_type})
+        event_bus.publish("backup.port", {
+            "switch": switch_name,
+            "port": port,
+            "type": iface_type,
+            "done": index,
+            "total": len(valid_ports)
+        }, operation=operation)
+
+    # 🧠 Step 4: Bridge information
+    datapath_id = bridge.datapath_id
+
+    # 🧠 Step 5: Build YAML structure
+    yaml_data = {
+        "metadata": {
+            "backup_date": datetime.now().isoformat(),
+            "source_host": hostname or "localhost",
+            "bridge_name": switch_name
+        },
+        "bridges": [{
+            "name": switch_name,
+            "datapath_id": datapath_id,
+            "ports": ports_data
+        }],
+        "interfaces": interfaces_data
+    }
+
+    # 🧠 Step 6: Save YAML file
+    if job is not None:
+        job.update(done=1, message='Écriture du fichier de sauvegarde')
+    if not os.path.exists(BACKUP_FOLDER):
+        os.makedirs(BACKUP_FOLDER)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    host_suffix = f"_{hostname.replace('.', '_')}" if hostname else ""
+    filename = f"{switch_name}_backup{host_suffix}_{timestamp}.yaml"
+    filepath = os.path.join(BACKUP_FOLDER, filename)
+
+    try:
+        with open(filepath, "w") as f:
+            yaml.dump(yaml_data, f, default_flow_style=False, indent=2)
+
+        action_logger.log_action(f"Backup completed successfully - File: {filename}", "SUCCESS", {
+            'filename': filename,
+            'ports_found': len(valid_ports),
+            'source_host': hostname or "localhost",
+            'bridge_name': switch_name
+        })
+
+    except Exception as e:
+        error_msg = f"Failed to save backup file: {str(e)}"
+        action_logger.log_action(f"Backup failed - {error_msg}", "ERROR")
+        return {
+            "success": False,
+            "error": error_msg
+        }, 500
+
+    return {
+        "success": True,
+        "message": f"Backup saved to {filename}",
+        "file": filename,
+        "ports_found": len(valid_ports),
+        "bridge_exists": True,
+        "source_host": hostname or "localhost"
+    }, 200
@@ -1,7 +1,14 @@
 import os
+import logging
 import yaml
 from flask import Blueprint, request, jsonify
 from services.ovs_configurator import apply_configuration_from_yaml
+from services.ovs_planner import restore_configuration
+from services.deadline import Deadline
+from services.event_bus import event_bus
+from routes.jobs import submit_job
+
+logger = logging.getLogger(__name__)
 
 load_config_bp = Blueprint('load_config_bp', __name__)
 BACKUP_DIR = 'backup'
@@ -20,6 +27,10 @@ def load_config():
         backup_file = data.get('backup_file')
         switch_ip = data.get('switch_name')  # This should be the IP address, not bridge name
         password = data.get('password')
+        batch = data.get('batch', True)  # False = one SSH round-trip per command
+        diff = data.get('diff', True)  # Only push what differs from the switch
+        dry_run = data.get('dry_run', False)  # Return the plan without applying it
+        prune = data.get('prune', False)  # Also remove ports that are not in the backup
 
         if not all([backup_file, switch_ip, password]):
             missing_fields = []
@@ -55,13 +66,64 @@ def load_config():
         if not config_data:
             return jsonify({'success': False, 'error': 'Le fichier de configuration est vide ou invalide'}), 400
 
-        # Pass parsed dict to apply_configuration_from_yaml
-        result = apply_configuration_from_yaml(config_data, switch_ip, password)
+        options = {'batch': batch, 'diff': diff, 'dry_run': dry_run, 'prune': prune}
+        if data.get('async'):
+            return submit_job('restore', _load_config_job, config_data, switch_ip, password, options,
+                              description=f'Chargement de "{backup_file}" sur {switch_ip}',
+                              operation=data.get('operation_id'))
 
-        return jsonify({'success': True, 'results': result})
+        # One budget for the whole request, diff read and apply included
+        payload, status = perform_load_config(config_data, switch_ip, password, deadline=Deadline(),
+                                              operation=data.get('operation_id'), **options)
+        return jsonify(payload), status
 
     except Exception as e:
         print(f"Erreur dans load_config: {str(e)}")
         import traceback
         traceback.print_exc()
-        return jsonify({'success': False, 'error': f'Erreur serveur: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': f'Erreur serveur: {str(e)}'}), 500
+
+def _load_config_job(job, config_data, switch_ip, password, options):
+    job.update(done=0, total=1, message=f'Application de la configuration sur {switch_ip}')
+    payload, _ = perform_load_config(config_data, switch_ip, password, deadline=job.deadline,
+                                     operation=job.operation, **options)
+    job.update(done=1)
+    return payload
+
+def perform_load_config(config_data, switch_ip, password, batch=True, diff=True, dry_run=False, prune=False,
+                        deadline=None, operation=None):
+    """
+    Restore a parsed backup on a switch: diff against its current state and
+    push only the changes, or replay the whole configuration. Each command
+    result is published as an 'apply.result' event as soon as it is known.
+
+    The response's 'mode' says which ran: 'diff', or 'full_replay' (asked
+    for with diff=False, or because the switch's state could not be read,
+    the reason then being in 'diff_error').
+
+    Returns:
+        tuple: (response dict, HTTP status)
+    """
+    def publish_result(cmd, out, err):
+        event_bus.publish('apply.result', {'switch': switch_ip, 'command': cmd, 'output': out, 'error': err},
+                          operation=operation)
+
+    diff_error = None
+    if diff or dry_run:
+        restore = restore_configuration(config_data, switch_ip, password, dry_run=dry_run, prune=prune,
+                                        deadline=deadline, on_result=publish_result, batch=batch)
+        if 'error' not in restore:
+            return {'success': True, 'dry_run': dry_run, 'mode': 'diff', **restore}, 200
+        if dry_run:
+            return {'success': False, 'error': restore['error']}, 502
+        diff_error = restore['error']
+        logger.warning(f"Diff restore unavailable on {switch_ip}, replaying full config: {diff_error}")
+
+    # Pass parsed dict to apply_configuration_from_yaml
+    result = apply_configuration_from_yaml(config_data, switch_ip, password, batch=batch, deadline=deadline,
+                                           on_result=publish_result)
+
+    payload = {'success': True, 'mode': 'full_replay', 'results': result}
+    if diff_error:
+        payload['diff_error'] = diff_error
+    return payload, 200
@@ -1,35 +1,20 @@
 # routes/ovs_show.py
 
 from flask import request, jsonify
-from services.ssh_utils import run_ovs_command, clean_ovs_output
+from services.ssh_utils import run_ovs_commands, clean_ovs_output
+from services.ovsdb_parser import parse_tables, format_records
+from services.ovs_topology import Topology
+from services.deadline import Deadline
 import yaml
 import os
-import re
-
-def parse_ovs_list(raw_output):
-    """
-    Parses 'ovs-vsctl list <table>' output blocks separated by blank lines.
-    Returns a list of dicts, each dict corresponds to one block.
-    """
-    blocks = []
-    current_block = {}
-    for line in raw_output.splitlines():
-        line = line.strip()
-        if line == "":
-            if current_block:
-                blocks.append(current_block)
-                current_block = {}
-        else:
-            m = re.match(r"(\S+)\s*:\s*(.*)", line)
-            if m:
-                key, val = m.group(1), m.group(2)
-                current_block[key] = val
-            else:
-                # Lines not matching key: value are ignored here
-                pass
-    if current_block:
-        blocks.append(current_block)
-    return blocks
+
+# Tables are fetched as JSON and rendered back to the usual
+# 'ovs-vsctl list' text for display
+LIST_TABLES = {
+    "ovs-vsctl list bridge": "Bridge",
+    "ovs-vsctl list port": "Port",
+    "ovs-vsctl list interface": "Interface",
+}
 
 def register_show_routes(app):
     @app.route('/api/show_ovs_full', methods=['POST'])
@@ -56,59 +41,51 @@ def register_show_routes(app):
         }
 
         results = {}
-        raw_outputs = {}
+        records = {}
 
+        run_cmds = {}
         for cmd in commands:
-            # ✅ Use dynamic hostname if provided
-            output, error = run_ovs_command(cmd, hostname=hostname, password=password)
+            table = LIST_TABLES.get(cmd)
+            run_cmds[cmd] = f"ovs-vsctl --format=json list {table}" if table else cmd
+
+        # ✅ Use dynamic hostname if provided; all commands run concurrently
+        # on one SSH connection, within the request budget (commands still
+        # running when it expires come back with their partial output)
+        outputs = run_ovs_commands(list(run_cmds.values()), hostname=hostname, password=password,
+                                   deadline=Deadline())
 
-            print(f"Command: {cmd}")
+        for cmd, run_cmd in run_cmds.items():
+            table = LIST_TABLES.get(cmd)
+            output, error = outputs[run_cmd]
+
+            print(f"Command: {run_cmd}")
             print(f"Output: {output[:200] if output else 'None'}")  # first 200 chars max
             print(f"Error: {error}")
-            
+
+            if table:
+                try:
+                    records[table] = parse_tables(output, [(table, None)]).get(table, [])
+                except ValueError as e:
+                    records[table] = []
+                    error = error or str(e)
+                display = format_records(records[table])
+            else:
+                display = clean_ovs_output(output)
+
             results[cmd] = {
-                "output": clean_ovs_output(output),
+                "output": display,
                 "error": error or None
             }
-            raw_outputs[cmd] = output  # keep raw outputs for parsing
-
-        # Parse bridge, port, interface outputs to structured data
-        bridges = parse_ovs_list(raw_outputs.get("ovs-vsctl list bridge", ""))
-        ports = parse_ovs_list(raw_outputs.get("ovs-vsctl list port", ""))
-        interfaces = parse_ovs_list(raw_outputs.get("ovs-vsctl list interface", ""))
 
-        # Build quick lookups by name
-        interfaces_by_name = {iface.get("name"): iface for iface in interfaces if "name" in iface}
-        ports_by_name = {port.get("name"): port for port in ports if "name" in port}
+        # Join bridge -> port -> interface on the UUID references
+        topology = Topology.from_tables(records)
 
         switch_data = {
             "switch_name": switch_name,
             "switch_ip": hostname if hostname else "localhost",
-            "bridges": []
+            "bridges": topology.to_dict()["bridges"]
         }
 
-        for bridge in bridges:
-            bridge_name = bridge.get("name", "").strip('"')
-            bridge_ports = []
-
-            # Find ports associated with this bridge
-            for port_name, port in ports_by_name.items():
-                port_name_clean = port_name.strip('"') if port_name else ""
-                
-                # Add port info
-                bridge_ports.append({
-                    "name": port_name_clean,
-                    "tag": port.get("tag", "").strip('"'),
-                    "interfaces": []
-                })
-
-            bridge_data = {
-                "name": bridge_name,
-                "datapath_id": bridge.get("datapath_id", "").strip('"'),
-                "ports": bridge_ports
-            }
-            switch_data["bridges"].append(bridge_data)
-
         # Save to YAML file in backups/
         backup_dir = "backup"
         if not os.path.exists(backup_dir):
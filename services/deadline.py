@@ -0,0 +1,101 @@
+# services/deadline.py
+
+import os
+import threading
+import time
+
+# Seconds an API request may spend talking to switches before it answers
+# with whatever it has (OVS_REQUEST_BUDGET)
+DEFAULT_BUDGET = float(os.environ.get('OVS_REQUEST_BUDGET', 30))
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an operation starts or continues past its request's deadline"""
+
+
+class Deadline:
+    """
+    Time budget of one request, passed down to every SSH step it triggers
+    (scheduler queue, connect, banner/auth, channel open, reads).
+
+    Each step asks timeout() for how long it may block, so the request as a
+    whole finishes within its budget however slow a switch is. cancel()
+    ends the request early: steps in progress are told through the
+    callbacks registered with on_cancel().
+    """
+
+    def __init__(self, budget=None):
+        """
+        Args:
+            budget (float): seconds from now; None uses DEFAULT_BUDGET
+        """
+        self.budget = DEFAULT_BUDGET if budget is None else budget
+        self.expires_at = time.monotonic() + self.budget
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._callbacks = []
+
+    def restart(self):
+        """Start the budget over from now (cancellation is kept)"""
+        self.expires_at = time.monotonic() + self.budget
+
+    def remaining(self):
+        """Seconds left (0 once expired or cancelled)"""
+        if self._cancelled:
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def timeout(self, cap=None):
+        """
+        How long the next blocking step may take: the time left, lowered to
+        cap if given. Raises DeadlineExceeded when nothing is left.
+        """
+        self.check()
+        remaining = self.remaining()
+        return remaining if cap is None else min(cap, remaining)
+
+    def check(self):
+        if self._cancelled or time.monotonic() >= self.expires_at:
+            raise DeadlineExceeded(self.reason())
+
+    def reason(self):
+        if self._cancelled:
+            return "request cancelled"
+        return f"request budget of {self.budget:g}s exceeded"
+
+    def cancel(self):
+        """Cancel the request and notify whatever is running for it"""
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback):
+        """
+        Call callback() if the deadline is cancelled (right away if it already is).
+
+        Returns:
+            callable: removes the callback again
+        """
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
@@ -0,0 +1,154 @@
+# services/dns_resolver.py
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+logger = logging.getLogger(__name__)
+
+# Seconds a caller waits for a PTR answer before going on without a name (OVS_DNS_TIMEOUT)
+LOOKUP_TIMEOUT = float(os.environ.get('OVS_DNS_TIMEOUT', 1))
+
+# Seconds a name found is kept (OVS_DNS_CACHE_TTL)
+CACHE_TTL = float(os.environ.get('OVS_DNS_CACHE_TTL', 3600))
+
+# Seconds an address without a name is kept: networks without PTR records
+# are not asked again on every scan (OVS_DNS_NEGATIVE_TTL)
+NEGATIVE_TTL = float(os.environ.get('OVS_DNS_NEGATIVE_TTL', 300))
+
+
+class ReverseResolver:
+    def __init__(self, max_workers=32, timeout=LOOKUP_TIMEOUT, ttl=CACHE_TTL, negative_ttl=NEGATIVE_TTL,
+                 max_entries=65536):
+        """
+        Reverse DNS (PTR) lookups with a hard timeout and a shared cache.
+
+        Lookups go through the system resolver (hosts file and NSS included)
+        in a bounded thread pool, so many run at once. A caller waits at most
+        timeout; a lookup that takes longer goes on in the background and
+        its answer, found or not, is cached for the next scan. Concurrent
+        requests for the same address share one lookup.
+
+        Args:
+            max_workers (int): Lookups in progress at most
+            timeout (float): Seconds a caller waits for an answer
+            ttl (float): Seconds a name is cached
+            negative_ttl (float): Seconds the absence of a name is cached
+            max_entries (int): Cached addresses at most (oldest evicted first)
+        """
+        self.timeout = timeout
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='rdns')
+        self._cache = OrderedDict()  # ip -> (hostname or None, expires_at)
+        self._pending = {}  # ip -> Future of the lookup in progress
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'timeouts': 0}
+
+    def cached(self, ip):
+        """
+        Returns:
+            tuple: (True, hostname or None) on a fresh cache entry, else (False, None)
+        """
+        with self._lock:
+            entry = self._cache.get(ip)
+            if entry is None:
+                return False, None
+            if entry[1] <= time.monotonic():
+                del self._cache[ip]
+                return False, None
+            self._cache.move_to_end(ip)
+            return True, entry[0]
+
+    def remember(self, ip, hostname):
+        """Cache a name learnt elsewhere (nmap's own resolution); None for no name"""
+        ttl = self.ttl if hostname else self.negative_ttl
+        with self._lock:
+            self._cache[ip] = (hostname, time.monotonic() + ttl)
+            self._cache.move_to_end(ip)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def submit(self, ip):
+        """Start (or join) the lookup of ip; returns its concurrent Future"""
+        with self._lock:
+            future = self._pending.get(ip)
+            if future is None:
+                future = self._executor.submit(self._resolve, ip)
+                self._pending[ip] = future
+            return future
+
+    def prefetch(self, ip):
+        """Start resolving ip now, for a lookup() expected later"""
+        if not self.cached(ip)[0]:
+            self.submit(ip)
+
+    def lookup(self, ip, timeout=None):
+        """
+        Name of ip, waiting at most timeout (default self.timeout).
+
+        Returns:
+            str: hostname, or None if there is none or it did not come in time
+        """
+        hit, hostname = self._count(ip)
+        if hit:
+            return hostname
+        try:
+            return self.submit(ip).result(self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            return self._timed_out(ip)
+
+    async def lookup_async(self, ip, timeout=None):
+        """lookup() for coroutines: the event loop is not blocked while waiting"""
+        hit, hostname = self._count(ip)
+        if hit:
+            return hostname
+        try:
+            # Shielded: giving up on the wait leaves the lookup running to fill the cache
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(self.submit(ip))),
+                                          self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            return self._timed_out(ip)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._cache), pending=len(self._pending))
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _count(self, ip):
+        hit, hostname = self.cached(ip)
+        with self._lock:
+            self._stats['hits' if hit else 'misses'] += 1
+        return hit, hostname
+
+    def _timed_out(self, ip):
+        logger.debug(f"Reverse DNS lookup of {ip} still running after {self.timeout}s, going on without it")
+        with self._lock:
+            self._stats['timeouts'] += 1
+        return None
+
+    def _resolve(self, ip):
+        try:
+            hostname = socket.gethostbyaddr(ip)[0]
+        except (socket.herror, socket.gaierror, OSError):
+            hostname = None
+        except Exception as e:
+            logger.debug(f"Reverse DNS lookup of {ip} failed: {e}")
+            hostname = None
+        self.remember(ip, hostname)
+        with self._lock:
+            self._pending.pop(ip, None)
+        return hostname
+
+
+# Global resolver instance
+reverse_resolver = ReverseResolver()
@@ -0,0 +1,144 @@
+# services/event_bus.py
+
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Events a subscriber may have waiting before it is considered too slow
+QUEUE_SIZE = 256
+
+# Recent events kept so that a reconnecting client can catch up (Last-Event-ID)
+HISTORY_SIZE = 512
+
+
+class Subscription:
+    """One consumer of the bus, with its own bounded queue"""
+
+    def __init__(self, topics=None, operation=None, max_queue=QUEUE_SIZE):
+        self.topics = set(topics) if topics else None
+        self.operation = operation
+        self.dropped = False
+        self.created_at = time.time()
+        self._queue = queue.Queue(maxsize=max_queue)
+
+    def wants(self, event):
+        if self.operation and event.get('operation') != self.operation:
+            return False
+        if self.topics is None:
+            return True
+        # 'scan' matches 'scan.host', 'scan.progress', ...
+        return any(event['topic'] == t or event['topic'].startswith(t + '.') for t in self.topics)
+
+    def get(self, timeout=None):
+        """Next event, or None if nothing arrived within timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def offer(self, event):
+        """Queue an event without blocking; False if the queue is full"""
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+
+class EventBus:
+    def __init__(self, history=HISTORY_SIZE):
+        """
+        In-process publish/subscribe of progress events.
+
+        publish() never blocks: a subscriber whose queue is full is dropped
+        (flagged and unsubscribed) instead of slowing down the operation
+        that publishes. It can reconnect and resume from the history.
+        """
+        self._subscribers = []
+        self._history = deque(maxlen=history)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._published = 0
+        self._dropped = 0
+
+    def subscribe(self, topics=None, operation=None, last_event_id=None, max_queue=QUEUE_SIZE):
+        """
+        Args:
+            topics (iterable): Topic prefixes to receive, all if empty
+            operation (str): Only receive events of this operation id
+            last_event_id (int): Replay the kept events published after it
+        Returns:
+            Subscription
+        """
+        subscription = Subscription(topics, operation, max_queue)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event['id'] > last_event_id and subscription.wants(event):
+                        if not subscription.offer(event):
+                            # More to catch up on than the queue holds: like a slow
+                            # subscriber, it gets what fits and resumes from there
+                            subscription.dropped = True
+                            self._dropped += 1
+                            break
+            if not subscription.dropped:
+                self._subscribers.append(subscription)
+        if subscription.dropped:
+            logger.warning(f"Dropped event subscriber while replaying history ({subscription.pending} events pending)")
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def publish(self, topic, data=None, operation=None):
+        """
+        Send an event to every interested subscriber.
+
+        Returns:
+            dict: The event ({'id', 'topic', 'operation', 'time', 'data'})
+        """
+        event = {
+            'id': next(self._ids),
+            'topic': topic,
+            'operation': operation,
+            'time': time.time(),
+            'data': data,
+        }
+        slow = []
+        with self._lock:
+            self._history.append(event)
+            self._published += 1
+            for subscription in self._subscribers:
+                if subscription.wants(event) and not subscription.offer(event):
+                    slow.append(subscription)
+            for subscription in slow:
+                subscription.dropped = True
+                self._subscribers.remove(subscription)
+                self._dropped += 1
+        for subscription in slow:
+            logger.warning(f"Dropped slow event subscriber ({subscription.pending} events pending)")
+        return event
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'published': self._published,
+                'dropped_subscribers': self._dropped,
+                'history': len(self._history),
+            }
+
+
+# Global event bus instance
+event_bus = EventBus()
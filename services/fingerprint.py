@@ -0,0 +1,317 @@
+# services/fingerprint.py
+
+import asyncio
+import logging
+import os
+import random
+import re
+
+from services.dns_resolver import reverse_resolver
+from services.scan_scheduler import probe_budget
+
+logger = logging.getLogger(__name__)
+
+# SNMP community used to read sysDescr; empty to disable the SNMP probe (OVS_SNMP_COMMUNITY)
+SNMP_COMMUNITY = os.environ.get('OVS_SNMP_COMMUNITY', 'public')
+
+# Seconds each fingerprinting probe may take (OVS_FINGERPRINT_TIMEOUT)
+FINGERPRINT_TIMEOUT = float(os.environ.get('OVS_FINGERPRINT_TIMEOUT', 2))
+
+# Score from which a host is reported as a switch candidate
+SWITCH_THRESHOLD = 0.4
+
+SSH_PORT = 22
+NETCONF_PORT = 830
+SNMP_PORT = 161
+
+# Ports whose server speaks first: their banner is read by the TCP sweep
+BANNER_PORTS = (SSH_PORT, NETCONF_PORT)
+
+# sysDescr.0 (SNMPv2-MIB)
+_SYSDESCR_OID = (1, 3, 6, 1, 2, 1, 1, 1, 0)
+
+# (pattern, device type, weight) matched against the SNMP sysDescr, first match wins
+_SYSDESCR_RULES = [
+    (r'open ?vswitch', 'Open vSwitch', 0.9),
+    (r'cisco', 'Cisco Device', 0.7),
+    (r'junos|juniper', 'Juniper Device', 0.7),
+    (r'arista', 'Arista Device', 0.7),
+    (r'procurve|aruba', 'HPE/Aruba Device', 0.6),
+    (r'routeros|mikrotik', 'MikroTik Device', 0.6),
+    (r'cumulus|sonic|force10|dell networking|edgecore|brocade|extreme|huawei|h3c|fortiswitch|edgeswitch',
+     'Network Device', 0.6),
+    (r'switch|router', 'Network Device', 0.5),
+    (r'windows', 'Windows Host', -0.5),
+    (r'printer|laserjet|jetdirect', 'Printer', -0.5),
+    (r'linux', 'Linux Server/Switch', 0.2),
+]
+
+# (pattern, device type, weight) matched against the SSH identification string
+_SSH_RULES = [
+    (r'cisco', 'Cisco Device', 0.5),
+    (r'juniper|junos', 'Juniper Device', 0.5),
+    (r'rosssh|mikrotik', 'MikroTik Device', 0.5),
+    (r'openssh.*(linux|ubuntu|debian)', 'Linux Server/Switch', 0.25),
+    (r'openssh', 'SSH Server', 0.2),
+    # Anything else (dropbear, vendor SSH stacks): mostly embedded systems
+    (r'.', 'Network Device', 0.3),
+]
+
+
+def _match(rules, text):
+    for pattern, device_type, weight in rules:
+        if re.search(pattern, text, re.IGNORECASE):
+            return device_type, weight
+    return None, 0.0
+
+
+def classify(open_ports, ssh_banner=None, netconf_banner=None, sysdescr=None):
+    """
+    Device type and switch likelihood of a host from what was learnt about it.
+
+    Each clue adds to a score (some, like a Windows sysDescr, take from it);
+    the score, bounded to 0..1, is the confidence that the host is a switch.
+
+    Args:
+        open_ports (list): Open TCP ports
+        ssh_banner (str): SSH identification string on port 22
+        netconf_banner (str): Identification string on port 830 (or nmap's
+            service name for it)
+        sysdescr (str): SNMP sysDescr.0
+    Returns:
+        dict: {'device_type', 'is_switch_candidate', 'confidence', 'evidence'}
+    """
+    score = 0.0
+    evidence = []
+    device_type = None
+
+    if sysdescr:
+        device_type, weight = _match(_SYSDESCR_RULES, sysdescr)
+        score += 0.1 + weight
+        evidence.append(f"SNMP : {sysdescr.splitlines()[0][:80]}")
+
+    if NETCONF_PORT in open_ports:
+        # NETCONF runs over SSH: an SSH identification on 830 is a NETCONF server
+        if netconf_banner and re.match(r'ssh|netconf', netconf_banner, re.IGNORECASE):
+            score += 0.6
+            evidence.append('NETCONF (port 830)')
+        else:
+            score += 0.2
+            evidence.append('port 830 ouvert')
+
+    if SSH_PORT in open_ports:
+        score += 0.2
+        if ssh_banner:
+            ssh_type, weight = _match(_SSH_RULES, ssh_banner)
+            score += weight
+            device_type = device_type or ssh_type
+            evidence.append(f"SSH : {ssh_banner[:80]}")
+        else:
+            evidence.append('SSH ouvert')
+
+    if 23 in open_ports:
+        score += 0.15
+        evidence.append('Telnet ouvert')
+
+    if any(port in open_ports for port in (80, 443)):
+        score += 0.1
+        evidence.append('interface web')
+
+    if device_type is None and any('NETCONF' in clue for clue in evidence):
+        device_type = 'Network Device'
+
+    confidence = round(min(1.0, max(0.0, score)), 2)
+    return {
+        'device_type': device_type or 'Unknown',
+        'is_switch_candidate': confidence >= SWITCH_THRESHOLD,
+        'confidence': confidence,
+        'evidence': evidence,
+    }
+
+
+def _ber_length(length):
+    if length < 0x80:
+        return bytes([length])
+    encoded = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes([0x80 | len(encoded)]) + encoded
+
+
+def _ber(tag, value):
+    return bytes([tag]) + _ber_length(len(value)) + value
+
+
+def _ber_int(value):
+    return _ber(0x02, value.to_bytes(max(1, (value.bit_length() + 8) // 8), 'big', signed=True))
+
+
+def _ber_oid(oid):
+    body = bytes([40 * oid[0] + oid[1]])
+    for part in oid[2:]:
+        chunk = [part & 0x7f]
+        part >>= 7
+        while part:
+            chunk.insert(0, 0x80 | (part & 0x7f))
+            part >>= 7
+        body += bytes(chunk)
+    return _ber(0x06, body)
+
+
+def _ber_read(data, offset):
+    """(tag, value, next offset) of the TLV at offset"""
+    tag = data[offset]
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        size = length & 0x7f
+        length = int.from_bytes(data[offset:offset + size], 'big')
+        offset += size
+    value = data[offset:offset + length]
+    if len(value) < length:
+        raise ValueError('truncated BER value')
+    return tag, value, offset + length
+
+
+def snmp_get_request(community, request_id, oid=_SYSDESCR_OID):
+    """SNMPv2c GetRequest for one OID"""
+    varbind = _ber(0x30, _ber_oid(oid) + b'\x05\x00')
+    pdu = _ber(0xa0, _ber_int(request_id) + _ber_int(0) + _ber_int(0) + _ber(0x30, varbind))
+    return _ber(0x30, _ber_int(1) + _ber(0x04, community.encode()) + pdu)
+
+
+def parse_snmp_response(data, request_id):
+    """
+    Value of the single varbind of a GetResponse, as text.
+
+    Returns:
+        str: the value, or None if the response is for another request,
+             reports an error or holds no string
+    Raises:
+        ValueError, IndexError: if data is not a valid SNMP message
+    """
+    _, message, _ = _ber_read(data, 0)
+    _, _, offset = _ber_read(message, 0)  # version
+    _, _, offset = _ber_read(message, offset)  # community
+    tag, pdu, _ = _ber_read(message, offset)
+    if tag != 0xa2:
+        return None
+    _, value, offset = _ber_read(pdu, 0)
+    if int.from_bytes(value, 'big', signed=True) != request_id:
+        return None
+    _, error_status, offset = _ber_read(pdu, offset)
+    if int.from_bytes(error_status, 'big'):
+        return None
+    _, _, offset = _ber_read(pdu, offset)  # error index
+    _, varbinds, _ = _ber_read(pdu, offset)
+    _, varbind, _ = _ber_read(varbinds, 0)
+    _, _, offset = _ber_read(varbind, 0)  # oid
+    tag, value, _ = _ber_read(varbind, offset)
+    if tag != 0x04:
+        return None  # noSuchObject / noSuchInstance / endOfMibView
+    return value.decode('utf-8', errors='ignore').strip() or None
+
+
+class _SNMPClient(asyncio.DatagramProtocol):
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.answer = asyncio.get_running_loop().create_future()
+
+    def datagram_received(self, data, addr):
+        try:
+            value = parse_snmp_response(data, self.request_id)
+        except (ValueError, IndexError):
+            return
+        if not self.answer.done():
+            self.answer.set_result(value)
+
+    def error_received(self, exc):
+        # ICMP port unreachable: no SNMP agent
+        if not self.answer.done():
+            self.answer.set_result(None)
+
+
+class Fingerprinter:
+    def __init__(self, community=SNMP_COMMUNITY, timeout=FINGERPRINT_TIMEOUT):
+        """
+        Identification of a discovered host: reverse DNS, SSH and NETCONF
+        banners, SNMP sysDescr, all probed at once, then scored by classify().
+
+        Args:
+            community (str): SNMP community ('' to skip SNMP)
+            timeout (float): Seconds per probe
+        """
+        self.community = community
+        self.timeout = timeout
+
+    async def read_banner(self, ip, port):
+        """First line the server on port sends, or None"""
+        await probe_budget.acquire_async()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), self.timeout)
+        except (asyncio.TimeoutError, OSError):
+            return None
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.timeout)
+            return line[:1024].decode('utf-8', errors='ignore').strip() or None
+        except (asyncio.TimeoutError, OSError, ValueError):
+            return None
+        finally:
+            writer.transport.abort()
+
+    async def snmp_sysdescr(self, ip):
+        """sysDescr.0 of the host's SNMP agent, or None"""
+        if not self.community:
+            return None
+        loop = asyncio.get_running_loop()
+        request_id = random.randint(1, 0x7fffffff)
+        await probe_budget.acquire_async()
+        try:
+            transport, client = await loop.create_datagram_endpoint(
+                lambda: _SNMPClient(request_id), remote_addr=(ip, SNMP_PORT))
+        except OSError:
+            return None
+        try:
+            transport.sendto(snmp_get_request(self.community, request_id))
+            return await asyncio.wait_for(client.answer, self.timeout)
+        except (asyncio.TimeoutError, OSError):
+            return None
+        finally:
+            transport.close()
+
+    async def fingerprint_async(self, ip, open_ports, banners=None, resolve_names=True):
+        """
+        Args:
+            ip (str): Host address
+            open_ports (list): Open TCP ports
+            banners (dict): {port: banner or None} already read (by the
+                TCP sweep); ports missing from it are read here
+            resolve_names (bool): Look the host's name up (reverse DNS,
+                bounded by the resolver's timeout) alongside the probes
+        Returns:
+            dict: classify() fields plus 'hostname', 'banner' (SSH) and 'sysdescr'
+        """
+        banners = dict(banners or {})
+
+        async def banner(port):
+            if port not in open_ports:
+                return None
+            if port in banners:
+                return banners[port]
+            return await self.read_banner(ip, port)
+
+        async def hostname():
+            return (await reverse_resolver.lookup_async(ip) if resolve_names else None) or ip
+
+        name, ssh_banner, netconf_banner, sysdescr = await asyncio.gather(
+            hostname(), banner(SSH_PORT), banner(NETCONF_PORT), self.snmp_sysdescr(ip))
+
+        result = classify(open_ports, ssh_banner, netconf_banner, sysdescr)
+        result.update({'hostname': name, 'banner': ssh_banner, 'sysdescr': sysdescr})
+        return result
+
+    def fingerprint(self, ip, open_ports, banners=None, resolve_names=True):
+        """fingerprint_async() from synchronous code (a scan worker thread)"""
+        return asyncio.run(self.fingerprint_async(ip, open_ports, banners, resolve_names))
+
+
+# Global fingerprinter instance
+fingerprinter = Fingerprinter()
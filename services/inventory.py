@@ -0,0 +1,326 @@
+# services/inventory.py
+
+import ipaddress
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from services.scan_ranges import is_scanned
+
+logger = logging.getLogger(__name__)
+
+# SQLite file of the device inventory (OVS_INVENTORY_DB)
+INVENTORY_DB = os.environ.get('OVS_INVENTORY_DB',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'inventory.db'))
+
+# Seconds a host's fingerprint (hostname, banner, device type) stays valid
+# while its open ports do not change (OVS_INVENTORY_TTL)
+INVENTORY_TTL = float(os.environ.get('OVS_INVENTORY_TTL', 24 * 3600))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    ip TEXT PRIMARY KEY,
+    ip_int INTEGER NOT NULL,
+    hostname TEXT,
+    open_ports TEXT NOT NULL,
+    banner TEXT,
+    device_type TEXT,
+    ssh_available INTEGER NOT NULL DEFAULT 0,
+    is_switch_candidate INTEGER NOT NULL DEFAULT 0,
+    confidence REAL,
+    evidence TEXT,
+    sysdescr TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    last_probed REAL NOT NULL,
+    present INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS hosts_ip_int ON hosts (ip_int);
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    network TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL NOT NULL,
+    found INTEGER NOT NULL,
+    probed INTEGER NOT NULL,
+    new INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    gone INTEGER NOT NULL
+);
+"""
+
+# Columns added since the first schema, created on databases that lack them
+_ADDED_COLUMNS = {'confidence': 'REAL', 'evidence': 'TEXT', 'sysdescr': 'TEXT'}
+
+# What identifies a host's state: a difference in one of these is a change
+_COMPARED = ('hostname', 'open_ports', 'device_type')
+
+
+def _row_to_host(row):
+    return {
+        'ip': row['ip'],
+        'hostname': row['hostname'] or row['ip'],
+        'open_ports': json.loads(row['open_ports']),
+        'banner': row['banner'],
+        'device_type': row['device_type'] or 'Unknown',
+        'ssh_available': bool(row['ssh_available']),
+        'is_switch_candidate': bool(row['is_switch_candidate']),
+        'confidence': row['confidence'],
+        'evidence': json.loads(row['evidence'] or '[]'),
+        'sysdescr': row['sysdescr'],
+    }
+
+
+class InventoryScan:
+    """
+    Bookkeeping of one scan against the inventory: which hosts can skip
+    fingerprinting, and the delta (new, changed, gone) it produces.
+    Methods are safe to call from the scan's worker threads.
+    """
+
+    def __init__(self, inventory, network, exclusions=(), incremental=True, resolve_names=True):
+        self.inventory = inventory
+        self.network = network
+        self.exclusions = list(exclusions)
+        self.incremental = incremental
+        self.resolve_names = resolve_names
+        self.started = time.time()
+        self.seen = set()
+        self.unread = set()
+        self.probed = 0
+        self.new = []
+        self.changed = []
+        self._lock = threading.Lock()
+
+    def fresh(self, ip, open_ports):
+        """
+        The known record of ip if it can be reused as is: seen before with
+        the same open ports, fingerprinted less than the TTL ago.
+
+        Returns:
+            dict: host record, or None if the host must be fingerprinted
+        """
+        if not self.incremental:
+            return None
+        return self.inventory.fresh(ip, open_ports)
+
+    def record(self, host_info, probed=True):
+        """Store a host found by the scan and account for it in the delta"""
+        status = self.inventory.record(host_info, probed, self.resolve_names)
+        with self._lock:
+            self.seen.add(host_info['ip'])
+            if probed:
+                self.probed += 1
+            if status == 'new':
+                self.new.append(host_info['ip'])
+            elif status == 'changed':
+                self.changed.append(host_info['ip'])
+        return status
+
+    def keep(self, ip):
+        """A host found alive whose details could not be read: left as stored, not gone"""
+        with self._lock:
+            self.unread.add(ip)
+
+    def finish(self):
+        """
+        Close a completed scan: hosts of the range not seen this time are
+        marked gone. Not to be called for an interrupted scan.
+
+        Returns:
+            dict: {'new': [ip], 'changed': [ip], 'gone': [ip],
+                   'probed': int, 'reused': int}
+        """
+        gone = self.inventory.mark_gone(self.network, self.exclusions, self.seen | self.unread)
+        delta = {
+            'new': sorted(self.new, key=ipaddress.IPv4Address),
+            'changed': sorted(self.changed, key=ipaddress.IPv4Address),
+            'gone': gone,
+            'probed': self.probed,
+            'reused': len(self.seen) - self.probed,
+        }
+        self.inventory.log_scan(self, delta)
+        return delta
+
+
+class DeviceInventory:
+    def __init__(self, path=INVENTORY_DB, ttl=INVENTORY_TTL):
+        """
+        Persistent record of the devices found by network scans (SQLite).
+
+        Args:
+            path (str): Database file
+            ttl (float): Seconds a fingerprint is reused by rescans
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        # Opened on first use; one connection shared by all threads, serialized by _lock
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(_SCHEMA)
+            columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(hosts)')}
+            for column, kind in _ADDED_COLUMNS.items():
+                if column not in columns:
+                    self._conn.execute(f'ALTER TABLE hosts ADD COLUMN {column} {kind}')
+        return self._conn
+
+    def begin_scan(self, network, exclusions=(), incremental=True, resolve_names=True):
+        """
+        Args:
+            network (IPv4Network): Range being scanned
+            exclusions (list): IPv4Network blocks left out of the scan
+            incremental (bool): Reuse fresh fingerprints (False re-probes all)
+            resolve_names (bool): Whether the scan looks host names up
+                (without it, the stored names are kept)
+        Returns:
+            InventoryScan
+        """
+        return InventoryScan(self, network, exclusions, incremental, resolve_names)
+
+    def fresh(self, ip, open_ports):
+        with self._lock:
+            row = self._db().execute('SELECT * FROM hosts WHERE ip = ?', (ip,)).fetchone()
+        if row is None or not row['present']:
+            return None
+        if json.loads(row['open_ports']) != list(open_ports):
+            return None
+        if time.time() - row['last_probed'] > self.ttl:
+            return None
+        return _row_to_host(row)
+
+    def record(self, host_info, probed=True, names_resolved=True):
+        """
+        Insert or update a host seen now.
+
+        Args:
+            host_info (dict): Host as reported by the scan
+            probed (bool): Fingerprinted by this scan (not reused)
+            names_resolved (bool): host_info's hostname comes from a name
+                lookup; otherwise it is only the address, and the stored
+                name is kept and not compared
+        Returns:
+            str: 'new' (never seen, or seen again after being gone),
+                 'changed' or 'unchanged'
+        """
+        now = time.time()
+        ip = host_info['ip']
+        values = {
+            'hostname': host_info.get('hostname'),
+            'open_ports': json.dumps(list(host_info.get('open_ports', []))),
+            'banner': host_info.get('banner'),
+            'device_type': host_info.get('device_type'),
+            'ssh_available': int(bool(host_info.get('ssh_available'))),
+            'is_switch_candidate': int(bool(host_info.get('is_switch_candidate'))),
+            'confidence': host_info.get('confidence'),
+            'evidence': json.dumps(host_info.get('evidence') or []),
+            'sysdescr': host_info.get('sysdescr'),
+        }
+        compared = _COMPARED if names_resolved else tuple(key for key in _COMPARED if key != 'hostname')
+        with self._lock:
+            db = self._db()
+            row = db.execute('SELECT * FROM hosts WHERE ip = ?', (ip,)).fetchone()
+            if not names_resolved:
+                values['hostname'] = row['hostname'] if row is not None else ip
+            if row is None:
+                db.execute(
+                    'INSERT INTO hosts (ip, ip_int, hostname, open_ports, banner, device_type, ssh_available, '
+                    'is_switch_candidate, confidence, evidence, sysdescr, first_seen, last_seen, last_probed, '
+                    'present) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)',
+                    (ip, int(ipaddress.IPv4Address(ip)), values['hostname'], values['open_ports'],
+                     values['banner'], values['device_type'], values['ssh_available'],
+                     values['is_switch_candidate'], values['confidence'], values['evidence'],
+                     values['sysdescr'], now, now, now))
+                db.commit()
+                return 'new'
+
+            if row['present']:
+                status = 'changed' if any(row[key] != values[key] for key in compared) else 'unchanged'
+            else:
+                status = 'new'
+            db.execute(
+                'UPDATE hosts SET hostname = ?, open_ports = ?, banner = ?, device_type = ?, ssh_available = ?, '
+                'is_switch_candidate = ?, confidence = ?, evidence = ?, sysdescr = ?, last_seen = ?, '
+                'last_probed = ?, present = 1 WHERE ip = ?',
+                (values['hostname'], values['open_ports'], values['banner'], values['device_type'],
+                 values['ssh_available'], values['is_switch_candidate'], values['confidence'],
+                 values['evidence'], values['sysdescr'], now, now if probed else row['last_probed'], ip))
+            db.commit()
+            return status
+
+    def mark_gone(self, network, exclusions, seen):
+        """
+        Flag the present hosts of network not in seen. Only the addresses
+        the scan probed count: exclusions, and the network and broadcast
+        addresses it skips, are left as they are.
+
+        Returns:
+            list: IPs now gone, in address order
+        """
+        with self._lock:
+            db = self._db()
+            rows = db.execute(
+                'SELECT ip FROM hosts WHERE present = 1 AND ip_int BETWEEN ? AND ? ORDER BY ip_int',
+                (int(network.network_address), int(network.broadcast_address))).fetchall()
+            gone = [row['ip'] for row in rows
+                    if row['ip'] not in seen and is_scanned(row['ip'], network, exclusions)]
+            db.executemany('UPDATE hosts SET present = 0 WHERE ip = ?', [(ip,) for ip in gone])
+            db.commit()
+        return gone
+
+    def log_scan(self, scan, delta):
+        with self._lock:
+            db = self._db()
+            db.execute(
+                'INSERT INTO scans (network, started, finished, found, probed, new, changed, gone) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (str(scan.network), scan.started, time.time(), len(scan.seen), delta['probed'],
+                 len(delta['new']), len(delta['changed']), len(delta['gone'])))
+            db.commit()
+
+    def hosts(self, network=None, include_gone=False):
+        """
+        Known hosts, in address order.
+
+        Args:
+            network (IPv4Network): Only the hosts of this range
+            include_gone (bool): Also the hosts not found by the last scan of their range
+        Returns:
+            list: host records, with 'first_seen', 'last_seen' (ISO dates) and 'present'
+        """
+        query = 'SELECT * FROM hosts WHERE 1 = 1'
+        params = []
+        if network is not None:
+            query += ' AND ip_int BETWEEN ? AND ?'
+            params += [int(network.network_address), int(network.broadcast_address)]
+        if not include_gone:
+            query += ' AND present = 1'
+        with self._lock:
+            rows = self._db().execute(query + ' ORDER BY ip_int', params).fetchall()
+
+        hosts = []
+        for row in rows:
+            host = _row_to_host(row)
+            host['first_seen'] = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(row['first_seen']))
+            host['last_seen'] = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(row['last_seen']))
+            host['present'] = bool(row['present'])
+            hosts.append(host)
+        return hosts
+
+    def last_scans(self, limit=10):
+        with self._lock:
+            rows = self._db().execute('SELECT * FROM scans ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+
+# Global inventory instance
+device_inventory = DeviceInventory()
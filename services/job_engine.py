@@ -0,0 +1,255 @@
+# services/job_engine.py
+
+import datetime
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from services.deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+# Budget of one background job (scan, backup, restore), in seconds (OVS_JOB_BUDGET)
+JOB_BUDGET = float(os.environ.get('OVS_JOB_BUDGET', 900))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been cancelled"""
+
+
+def _isoformat(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+class Job:
+    """
+    One background operation and everything a client needs to follow it.
+
+    The job function receives the Job as first argument. It reports progress
+    with update(), passes ``job.deadline`` to SSH operations (cancel() cancels
+    that deadline, which interrupts them) and may call check_cancelled()
+    between steps. The deadline's budget counts from the moment a worker
+    starts the job, not from its submission.
+    """
+
+    def __init__(self, kind, description='', budget=None, operation=None):
+        self.id = uuid.uuid4().hex
+        # Id the job's progress events are published under (client-chosen or the job id)
+        self.operation = operation or self.id
+        self.kind = kind
+        self.description = description
+        self.status = QUEUED
+        self.done = 0
+        self.total = None
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.deadline = Deadline(JOB_BUDGET if budget is None else budget)
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._future = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def cancel_requested(self):
+        return self.deadline.cancelled
+
+    def update(self, done=None, total=None, message=None):
+        """Report progress (any subset of done/total/message)"""
+        with self._lock:
+            if done is not None:
+                self.done = done
+            if total is not None:
+                self.total = total
+            if message is not None:
+                self.message = message
+        self._notify()
+
+    def advance(self, step=1, message=None):
+        with self._lock:
+            self.done += step
+            if message is not None:
+                self.message = message
+        self._notify()
+
+    def check_cancelled(self):
+        if self.cancel_requested:
+            raise JobCancelled(f"Job {self.id} cancelled")
+
+    def add_listener(self, callback):
+        """callback(job) is called after every progress or status change"""
+        self._listeners.append(callback)
+
+    def to_dict(self, include_result=True):
+        with self._lock:
+            data = {
+                'id': self.id,
+                'kind': self.kind,
+                'operation': self.operation,
+                'description': self.description,
+                'status': self.status,
+                'progress': {'done': self.done, 'total': self.total, 'message': self.message},
+                'created_at': _isoformat(self.created_at),
+                'started_at': _isoformat(self.started_at),
+                'finished_at': _isoformat(self.finished_at),
+                'error': self.error,
+            }
+            if include_result and self.finished:
+                data['result'] = self.result
+            return data
+
+    def _set_status(self, status, result=None, error=None):
+        with self._lock:
+            self.status = status
+            if status == RUNNING:
+                self.started_at = time.time()
+            if status in FINISHED_STATES:
+                self.finished_at = time.time()
+                self.result = result
+                self.error = error
+        self._notify()
+
+    def _notify(self):
+        for callback in list(self._listeners):
+            try:
+                callback(self)
+            except Exception as e:
+                logger.debug(f"Job listener failed: {e}")
+
+
+class JobEngine:
+    def __init__(self, max_workers=4, retention=3600, max_finished=200):
+        """
+        Runs long operations in a bounded pool of worker threads and keeps
+        their state for polling.
+
+        Args:
+            max_workers (int): Jobs running at once; the rest wait queued
+            retention (int): Seconds a finished job (and its result) is kept
+            max_finished (int): Finished jobs kept at most, oldest dropped first
+        """
+        self.max_workers = max_workers
+        self.retention = retention
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def submit(self, kind, func, *args, description='', budget=None, operation=None, **kwargs):
+        """
+        Queue func(job, *args, **kwargs).
+
+        The job succeeds with func's return value as result, unless it is a
+        dict with 'success': False, in which case the job fails with its
+        'error'. An exception fails the job; cancellation wins over both.
+
+        Returns:
+            Job
+        """
+        self._expire()
+        job = Job(kind, description, budget, operation)
+        for callback in self._listeners:
+            job.add_listener(callback)
+        with self._lock:
+            self._jobs[job.id] = job
+        job._future = self._executor.submit(self._run, job, func, args, kwargs)
+        logger.info(f"Queued {kind} job {job.id}: {description}")
+        job._notify()
+        return job
+
+    def get(self, job_id):
+        self._expire()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, kind=None):
+        """Known jobs, newest first"""
+        self._expire()
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if kind is None or j.kind == kind]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job.
+
+        Returns:
+            bool: False if the job is unknown or already finished
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.deadline.cancel()
+        if job._future is not None and job._future.cancel():
+            # Never started
+            job._set_status(CANCELLED, error='Cancelled before start')
+        logger.info(f"Cancellation requested for job {job_id}")
+        return True
+
+    def add_listener(self, callback):
+        """callback(job) is called on every change of every job submitted afterwards"""
+        self._listeners.append(callback)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {'max_workers': self.max_workers, 'jobs': counts}
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancel_requested:
+            job._set_status(CANCELLED, error='Cancelled before start')
+            return
+        # Time spent queued does not count against the budget
+        job.deadline.restart()
+        job._set_status(RUNNING)
+        try:
+            result = func(job, *args, **kwargs)
+        except JobCancelled:
+            job._set_status(CANCELLED, error='Cancelled')
+        except Exception as e:
+            logger.exception(f"Job {job.id} ({job.kind}) failed")
+            if job.cancel_requested:
+                job._set_status(CANCELLED, error='Cancelled')
+            else:
+                job._set_status(FAILED, error=str(e))
+        else:
+            if job.cancel_requested:
+                # Keep what was done before the cancellation took effect
+                job._set_status(CANCELLED, result=result, error='Cancelled')
+            elif isinstance(result, dict) and result.get('success') is False:
+                job._set_status(FAILED, result=result, error=result.get('error'))
+            else:
+                job._set_status(SUCCEEDED, result=result)
+
+    def _expire(self):
+        now = time.time()
+        with self._lock:
+            finished = sorted((j for j in self._jobs.values() if j.finished),
+                              key=lambda j: j.finished_at)
+            excess = len(finished) - self.max_finished
+            for index, job in enumerate(finished):
+                if index < excess or now - job.finished_at > self.retention:
+                    del self._jobs[job.id]
+
+
+# Global job engine instance
+job_engine = JobEngine()
@@ -1,24 +1,70 @@
 # services/network_scanner.py
 
+import asyncio
+import os
 import subprocess
 import re
+import tempfile
+import xml.etree.ElementTree as ET
 import json
 import socket
 import threading
+import time
 import ipaddress
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import paramiko
 import logging
-import time
+from services.ssh_async import ssh_engine
+from services.deadline import Deadline
+from services.tcp_sweep import tcp_sweeper
+from services.nmap_xml import iter_nmap_hosts
+from services.inventory import device_inventory
+from services.fingerprint import fingerprinter, classify, BANNER_PORTS
+from services.dns_resolver import reverse_resolver
+from services.scan_scheduler import scan_scheduler, probe_budget
+from services.scan_ranges import (MAX_SCAN_ADDRESSES, parse_exclusions, iter_addresses, count_addresses,
+                                  iter_chunks, is_host_address)
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Addresses handed to one nmap run; large ranges are scanned chunk by chunk.
+# 256 (a /24's worth) keeps each run well inside NMAP_CHUNK_TIMEOUT and
+# progress moving on a /16, at the cost of one nmap start per chunk.
+NMAP_CHUNK_SIZE = 256
+
+# Seconds one nmap run may take
+NMAP_CHUNK_TIMEOUT = 600
+
+# Seconds between two progress reports while nothing is found
+PROGRESS_INTERVAL = 0.25
+
+# Switches checked at once by verify_switches() (OVS_VERIFY_CONCURRENCY)
+VERIFY_CONCURRENCY = int(os.environ.get('OVS_VERIFY_CONCURRENCY', 16))
+
+# Seconds the check of one switch may take, within the request's budget
+VERIFY_HOST_TIMEOUT = 20
+
+# What sudo prints (merged into stdout by the PTY) when it refuses to run the command
+_SUDO_FAILURES = ('sorry, try again', 'incorrect password', 'not in the sudoers', 'is not allowed to execute',
+                  'a password is required', 'no tty present', 'a terminal is required')
+
+class _NmapFailed(Exception):
+    pass
+
+def _bounded_progress(progress, deadline):
+    """progress callback that first raises DeadlineExceeded once deadline is over"""
+    def report(done, total, message):
+        deadline.check()
+        if progress:
+            progress(done, total, message)
+    return report
+
 class NetworkScanner:
     def __init__(self):
         self.open_ports = [22, 23, 80, 443, 161, 830]  # Common switch ports
-        self.timeout = 2
+        self.timeout = tcp_sweeper.timeout
     
     def check_nmap_installed(self):
         """Check if nmap is installed on the system"""
@@ -29,322 +75,473 @@ class NetworkScanner:
         except (FileNotFoundError, subprocess.TimeoutExpired):
             return False
     
-    def scan_network(self, network_range):
+    def scan_network(self, network_range, progress=None, on_host=None, exclude=None, incremental=True,
+                     resolve_names=True, deadline=None):
         """
         Scan network range for active hosts
+        
+        Scans go through the process-wide scheduler: they wait their turn
+        when too many are running, and one whose range is already being
+        scanned shares that scan's result instead of probing again.
+        
         Args:
             network_range (str): Network range like "192.168.1.0/24"
+            progress (callable): progress(done, total, message), called as
+                hosts are probed; an exception it raises aborts the scan
+            on_host (callable): on_host(host_info), called from a worker
+                thread as soon as each host has been analysed
+            exclude (str|list): Addresses, CIDR blocks or 'first-last'
+                ranges to leave out
+            incremental (bool): Reuse the inventory's fingerprint of hosts
+                whose open ports did not change (False re-probes every host)
+            resolve_names (bool): Look host names up in reverse DNS (False
+                reports the addresses as names)
+            deadline (Deadline): Bounds the whole scan, waiting for its turn
+                included; checked on every progress report, it aborts the
+                scan once expired or cancelled
         Returns:
-            dict: Results with hosts or error
+            dict: Results with hosts and the inventory delta, or error
         """
+        if deadline is not None:
+            progress = _bounded_progress(progress, deadline)
         try:
             logger.info(f"Starting network scan for {network_range}")
             
             # Validate network range
             try:
                 network = ipaddress.IPv4Network(network_range, strict=False)
+                exclusions = parse_exclusions(exclude)
             except ValueError as e:
                 return {'error': f'Format de réseau invalide: {str(e)}'}
             
-            # Check if nmap is available
-            if self.check_nmap_installed():
-                logger.info("Using nmap for network scan")
-                return self._scan_with_nmap(network_range)
-            else:
-                logger.info("Nmap not available, using Python ping scan")
-                return self._scan_with_ping(network)
+            total = count_addresses(network, exclusions)
+            if total > MAX_SCAN_ADDRESSES:
+                return {'error': f'Plage trop grande : {total} adresses (maximum {MAX_SCAN_ADDRESSES})'}
+            
+            def scan(on_host):
+                # Hosts found are recorded in the inventory as they come
+                inventory_scan = device_inventory.begin_scan(network, exclusions, incremental, resolve_names)
+                
+                # Check if nmap is available
+                if self.check_nmap_installed():
+                    logger.info("Using nmap for network scan")
+                    result = self._scan_with_nmap(network, exclusions, progress, on_host, inventory_scan,
+                                                  resolve_names)
+                else:
+                    logger.info("Nmap not available, using TCP sweep")
+                    result = self._scan_with_sweep(network, exclusions, progress, on_host, inventory_scan,
+                                                   resolve_names)
+                
+                # Only a complete scan can tell which devices are gone
+                if 'error' not in result:
+                    result['delta'] = inventory_scan.finish()
+                    delta = result['delta']
+                    logger.info(f"Inventory delta: {len(delta['new'])} new, {len(delta['changed'])} changed, "
+                                f"{len(delta['gone'])} gone, {delta['reused']} fingerprints reused")
+                return result
+            
+            return scan_scheduler.run(network, exclusions, scan, key=(incremental, resolve_names),
+                                      on_host=on_host, progress=progress, total=total)
                 
         except Exception as e:
             logger.error(f"Network scan error: {str(e)}")
             return {'error': f'Erreur lors du scan: {str(e)}'}
     
-    def _scan_with_nmap(self, network_range):
-        """Scan using nmap if available"""
+    def _scan_with_nmap(self, network, exclusions=(), progress=None, on_host=None, inventory_scan=None,
+                        resolve_names=True):
+        """
+        Scan using nmap if available: discovery, switch ports and SSH
+        service detection in one run per chunk, read from its XML output
+        """
         try:
-            # Basic host discovery with nmap
-            cmd = [
-                'nmap', 
-                '-sn',  # Ping scan only
-                '--host-timeout', '10s',
-                '-T4',  # Faster timing
-                network_range
-            ]
-            
-            logger.info(f"Running nmap command: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-            
-            if result.returncode != 0:
-                logger.error(f"Nmap failed with return code {result.returncode}")
-                logger.error(f"Stderr: {result.stderr}")
-                return {'error': f'Nmap scan failed: {result.stderr}'}
-            
-            # Parse nmap output to extract IP addresses
-            ip_pattern = r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b'
-            discovered_ips = re.findall(ip_pattern, result.stdout)
-            
-            # Remove duplicates and filter valid IPs
-            unique_ips = list(set(discovered_ips))
-            valid_ips = [ip for ip in unique_ips if self._is_valid_ip(ip)]
-            
-            logger.info(f"Found {len(valid_ips)} valid IPs")
-            
-            # Get detailed info for each IP
-            return self._get_host_details_batch(valid_ips)
-            
+            hosts = []
+            for host_info in self._iter_nmap_hosts(network, exclusions, progress, resolve_names):
+                hosts.append(host_info)
+                if inventory_scan:
+                    inventory_scan.record(host_info)
+                if on_host:
+                    on_host(host_info)
+            
+            logger.info(f"Found {len(hosts)} hosts via nmap")
+            return {'hosts': sorted(hosts, key=lambda x: ipaddress.IPv4Address(x['ip']))}
+            
+        except _NmapFailed as e:
+            return {'error': f'Nmap scan failed: {e}'}
         except subprocess.TimeoutExpired:
             return {'error': 'Network scan timed out'}
         except Exception as e:
             logger.error(f"Nmap scan error: {str(e)}")
             return {'error': f'Nmap scan error: {str(e)}'}
     
-    def _scan_with_ping(self, network):
-        """Fallback ping scan using Python"""
+    def _iter_nmap_hosts(self, network, exclusions=(), progress=None, resolve_names=True):
+        """Run nmap on NMAP_CHUNK_SIZE addresses at a time, yielding each host up as nmap reports it"""
+        total = count_addresses(network, exclusions)
+        done = 0
+        cmd = [
+            'nmap',
+            '-oX', '-',  # XML on stdout, parsed as it is written
+            '-T4',  # Faster timing
+            '--host-timeout', '30s',
+            '-p', ','.join(str(port) for port in self.open_ports),
+            '-sV', '--version-light',  # Service/banner detection on the open ports
+            '--stats-every', '2s',
+            '-iL', '-'  # Targets read from stdin
+        ]
+        if not resolve_names:
+            cmd.insert(1, '-n')  # No reverse DNS
+        if probe_budget.rate > 0:
+            # nmap paces itself: its share of the probe budget
+            cmd[1:1] = ['--max-rate', str(max(1, int(probe_budget.rate / scan_scheduler.max_concurrent)))]
+        
+        for chunk in iter_chunks(iter_addresses(network, exclusions), NMAP_CHUNK_SIZE):
+            logger.info(f"Running nmap command: {' '.join(cmd)} ({chunk[0]} - {chunk[-1]})")
+            if progress:
+                progress(done, total, 'Scan nmap')
+            
+            def on_progress(task, percent, start=done, size=len(chunk)):
+                if progress:
+                    progress(start + int(size * percent / 100), total, f'Scan nmap : {task}')
+            
+            for record in self._run_nmap(cmd, chunk, on_progress):
+                if record['state'] == 'up' and self._is_valid_ip(record['ip'], network):
+                    if resolve_names:
+                        # nmap resolved the name itself: keep it for the sweep path
+                        reverse_resolver.remember(record['ip'], record['hostname'])
+                    yield self._host_from_nmap(record)
+            done += len(chunk)
+        
+        if progress:
+            progress(done, total, 'Scan nmap')
+    
+    def _run_nmap(self, cmd, targets, on_progress=None):
+        """Run one nmap invocation and stream-parse its XML output"""
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr)
+            # Bounded run time: killing nmap ends its output, and the parsing below
+            watchdog = threading.Timer(NMAP_CHUNK_TIMEOUT, proc.kill)
+            watchdog.start()
+            try:
+                proc.stdin.write('\n'.join(str(ip) for ip in targets).encode())
+                proc.stdin.close()
+                yield from iter_nmap_hosts(proc.stdout, on_progress)
+            except ET.ParseError as e:
+                # Output cut short: report why below, from the exit status
+                logger.debug(f"Nmap XML output incomplete: {e}")
+            finally:
+                timed_out = watchdog.finished.is_set() and not watchdog.is_alive()
+                watchdog.cancel()
+                if proc.poll() is None:
+                    proc.kill()
+                proc.stdout.close()
+                proc.wait()
+            
+            if timed_out:
+                raise subprocess.TimeoutExpired(cmd, NMAP_CHUNK_TIMEOUT)
+            if proc.returncode != 0:
+                stderr.seek(0)
+                error = stderr.read().decode(errors='replace')
+                logger.error(f"Nmap failed with return code {proc.returncode}")
+                logger.error(f"Stderr: {error}")
+                raise _NmapFailed(error)
+    
+    def _host_from_nmap(self, record):
+        """Host record of the scan results from an nmap XML host"""
+        open_ports = [port for port in self.open_ports
+                      if record['ports'].get(port, {}).get('state') == 'open']
+        
+        # What nmap's service detection read from the SSH and NETCONF banners
+        ssh_banner = self._nmap_service(record, 22, ('product', 'version', 'extrainfo', 'ostype'))
+        netconf_banner = self._nmap_service(record, 830, ('name', 'product', 'version'))
+        fingerprint = classify(open_ports, ssh_banner, netconf_banner)
+        
+        return {
+            'ip': record['ip'],
+            'hostname': record['hostname'] or record['ip'],
+            'open_ports': open_ports,
+            'is_switch_candidate': fingerprint['is_switch_candidate'],
+            'ssh_available': 22 in open_ports,
+            'device_type': fingerprint['device_type'],
+            'banner': ssh_banner,
+            'confidence': fingerprint['confidence'],
+            'evidence': fingerprint['evidence'],
+            'sysdescr': None
+        }
+    
+    def _nmap_service(self, record, port, keys):
+        """Service detection fields of an open port, joined, or None"""
+        if record['ports'].get(port, {}).get('state') != 'open':
+            return None
+        service = record['ports'][port]['service']
+        return ' '.join(service[key] for key in keys if key in service) or None
+    
+    def _scan_with_sweep(self, network, exclusions=(), progress=None, on_host=None, inventory_scan=None,
+                         resolve_names=True):
+        """Discovery and port check of the whole range with one asyncio TCP sweep"""
         try:
-            logger.info(f"Performing ping scan on {network}")
-            hosts = []
+            logger.info(f"Performing TCP sweep on {network}")
             
-            # Generate list of IPs to scan (limit to reasonable size)
-            ip_list = list(network.hosts())
-            if len(ip_list) > 254:  # Limit for /24 or smaller
-                ip_list = ip_list[:254]
-            
-            # Ping each host
-            active_ips = []
-            with ThreadPoolExecutor(max_workers=50) as executor:
-                future_to_ip = {executor.submit(self._ping_host, str(ip)): str(ip) 
-                               for ip in ip_list}
-                
-                for future in as_completed(future_to_ip):
-                    ip = future_to_ip[future]
-                    try:
-                        if future.result():
-                            active_ips.append(ip)
-                    except Exception as e:
-                        logger.debug(f"Ping failed for {ip}: {e}")
+            # Addresses are generated lazily: a /16 costs no more memory than a /24
+            total = count_addresses(network, exclusions)
+            addresses = iter_addresses(network, exclusions)
             
-            logger.info(f"Found {len(active_ips)} active IPs via ping")
+            # Hosts are analysed as soon as they answer, while the sweep goes on
+            swept_hosts = self._iter_active_hosts(addresses, total, progress, resolve_names)
+            result = self._get_host_details_batch(swept_hosts, progress, on_host, inventory_scan, resolve_names)
             
-            # Get detailed info for active IPs
-            return self._get_host_details_batch(active_ips)
+            logger.info(f"Found {len(result['hosts'])} active IPs via TCP sweep")
+            return result
             
         except Exception as e:
-            logger.error(f"Ping scan error: {str(e)}")
-            return {'error': f'Ping scan error: {str(e)}'}
+            logger.error(f"TCP sweep error: {str(e)}")
+            return {'error': f'TCP sweep error: {str(e)}'}
     
-    def _ping_host(self, ip):
-        """Ping a single host"""
+    def _iter_active_hosts(self, addresses, total, progress=None, resolve_names=False):
+        """
+        Sweep hosts concurrently, yielding (ip, open_ports, banners) as soon
+        as a host is found alive; SSH and NETCONF banners are read on the
+        sweep's own connections. With resolve_names, the reverse DNS lookup
+        of a live host starts right away, before a detail worker is free.
+        """
+        active = 0
+        last_report = 0
+        sweep = tcp_sweeper.iter_sweep(addresses, self.open_ports, self.timeout, banner_ports=BANNER_PORTS)
         try:
-            # Use system ping command
-            import platform
-            param = '-n' if platform.system().lower() == 'windows' else '-c'
-            cmd = ['ping', param, '1', '-W', '2000', ip]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
-            return result.returncode == 0
-        except:
-            return False
+            for done, (ip, alive, open_ports, banners) in enumerate(sweep, 1):
+                if alive:
+                    active += 1
+                # Report found hosts at once, the silent ones a few times a second
+                now = time.monotonic()
+                if progress and (alive or done == total or now - last_report >= PROGRESS_INTERVAL):
+                    last_report = now
+                    progress(done, total, f'Sondage TCP ({active} actifs)')
+                if alive:
+                    if resolve_names:
+                        reverse_resolver.prefetch(ip)
+                    yield ip, open_ports, banners
+        finally:
+            # Aborted: stop the probes still in flight
+            sweep.close()
     
-    def _get_host_details_batch(self, ip_list):
-        """Get detailed information for multiple hosts"""
+    def _get_host_details_batch(self, swept_hosts, progress=None, on_host=None, inventory_scan=None,
+                                resolve_names=True):
+        """
+        Get detailed information for multiple hosts
+
+        swept_hosts holds (ip, open_ports, banners) and may be a generator: each
+        host is analysed as soon as it is produced, and on_host(host_info)
+        called as soon as it is analysed.
+        """
         hosts = []
         with ThreadPoolExecutor(max_workers=20) as executor:
-            futures = {executor.submit(self._get_host_details, ip): ip for ip in ip_list}
+            futures = {}
             
-            for future in as_completed(futures):
-                try:
-                    host_info = future.result()
-                    if host_info:
-                        hosts.append(host_info)
-                except Exception as e:
-                    logger.debug(f"Failed to get host details: {e}")
+            try:
+                for ip, open_ports, banners in swept_hosts:
+                    futures[executor.submit(self._get_host_details, ip, on_host, open_ports, inventory_scan,
+                                            banners, resolve_names)] = ip
+                for done, future in enumerate(as_completed(futures), 1):
+                    try:
+                        host_info = future.result()
+                        if host_info:
+                            hosts.append(host_info)
+                    except Exception as e:
+                        logger.debug(f"Failed to get host details: {e}")
+                    if progress:
+                        progress(done, len(futures), 'Analyse des hôtes')
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
         
-        return {'hosts': sorted(hosts, key=lambda x: x['ip'])}
+        return {'hosts': sorted(hosts, key=lambda x: ipaddress.IPv4Address(x['ip']))}
     
-    def _is_valid_ip(self, ip):
-        """Validate IP address format"""
-        try:
-            parts = ip.split('.')
-            if len(parts) != 4:
-                return False
-            for part in parts:
-                if not (0 <= int(part) <= 255):
-                    return False
-            # Skip localhost, broadcast, and network addresses
-            if ip.endswith('.0') or ip.endswith('.255') or ip == '127.0.0.1':
-                return False
-            return True
-        except:
-            return False
+    def _is_valid_ip(self, ip, network=None):
+        """Validate IP address format (a host address of network, when given)"""
+        return is_host_address(ip, network)
     
-    def _get_host_details(self, ip):
-        """Get detailed information about a host"""
+    def _get_host_details(self, ip, on_host=None, open_ports=None, inventory_scan=None, banners=None,
+                          resolve_names=True):
+        """
+        Get detailed information about a host (open_ports, banners: already
+        known from a sweep). A host the inventory knows with the same open
+        ports and a recent fingerprint is not probed again.
+        """
         try:
-            logger.debug(f"Getting details for {ip}")
-            
-            host_info = {
-                'ip': ip,
-                'hostname': self._get_hostname(ip),
-                'open_ports': self._scan_ports(ip),
-                'is_switch_candidate': False,
-                'ssh_available': False,
-                'device_type': 'Unknown'
-            }
-            
-            # Check if SSH is available
-            if 22 in host_info['open_ports']:
-                host_info['ssh_available'] = True
-                host_info['device_type'] = self._identify_device_type(ip)
+            if open_ports is None:
+                open_ports = self._scan_ports(ip)
             
-            # Determine if this could be a switch
-            switch_indicators = [
-                22 in host_info['open_ports'],  # SSH
-                161 in host_info['open_ports'], # SNMP
-                any(port in host_info['open_ports'] for port in [80, 443, 830])  # Web/NETCONF
-            ]
+            known = inventory_scan.fresh(ip, open_ports) if inventory_scan else None
+            if known is not None:
+                logger.debug(f"Reusing inventory details for {ip}")
+                host_info = known
+            else:
+                logger.debug(f"Getting details for {ip}")
+                host_info = self._probe_host_details(ip, open_ports, banners, resolve_names)
             
-            if any(switch_indicators):
-                host_info['is_switch_candidate'] = True
+            if inventory_scan:
+                inventory_scan.record(host_info, probed=known is None)
             
+            if on_host:
+                on_host(host_info)
             return host_info
             
         except Exception as e:
             logger.debug(f"Error getting details for {ip}: {e}")
+            # Alive all the same: not to be reported as gone
+            if inventory_scan:
+                inventory_scan.keep(ip)
             return None
     
-    def _get_hostname(self, ip):
-        """Try to resolve hostname for IP"""
+    def _probe_host_details(self, ip, open_ports, banners=None, resolve_names=True):
+        """
+        Fingerprint a host: reverse DNS (cached, bounded wait), SSH/NETCONF
+        banners (those the sweep did not already read) and SNMP sysDescr,
+        all at once
+        """
+        fingerprint = fingerprinter.fingerprint(ip, open_ports, banners, resolve_names)
+        return {
+            'ip': ip,
+            'hostname': fingerprint['hostname'],
+            'open_ports': open_ports,
+            'is_switch_candidate': fingerprint['is_switch_candidate'],
+            'ssh_available': 22 in open_ports,
+            'device_type': fingerprint['device_type'],
+            'banner': fingerprint['banner'],
+            'confidence': fingerprint['confidence'],
+            'evidence': fingerprint['evidence'],
+            'sysdescr': fingerprint['sysdescr']
+        }
+    
+    def _scan_ports(self, ip, timeout=None):
+        """Scan common switch ports, all at once"""
         try:
-            hostname = socket.gethostbyaddr(ip)[0]
-            return hostname
-        except:
-            return ip
+            return tcp_sweeper.scan_ports(ip, self.open_ports, timeout or self.timeout)
+        except Exception as e:
+            logger.debug(f"Port scan failed for {ip}: {e}")
+            return []
+    
+    def test_switch_connectivity(self, ip, username='kali', password=None, deadline=None):
+        """Test if we can connect to a switch and run OVS commands"""
+        return self.verify_switches([ip], username, password, deadline=deadline)[0]
     
-    def _scan_ports(self, ip, timeout=2):
-        """Scan common switch ports"""
-        open_ports = []
+    def verify_switches(self, ips, username='kali', password=None, deadline=None, on_result=None,
+                        max_workers=VERIFY_CONCURRENCY):
+        """
+        Check SSH authentication, sudo and Open vSwitch on many switches at once
         
-        for port in self.open_ports:
-            try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(timeout)
-                result = sock.connect_ex((ip, port))
-                if result == 0:
-                    open_ports.append(port)
-                sock.close()
-            except:
-                pass
+        Each switch runs "sudo ovs-vsctl show" on the asyncio SSH engine,
+        whose output is read as it arrives; at most max_workers switches are
+        checked at a time, each within VERIFY_HOST_TIMEOUT.
         
-        return open_ports
+        Args:
+            ips (list): Switch addresses
+            username (str): SSH username
+            password (str): SSH and sudo password
+            deadline (Deadline): Budget of the whole batch; cancelling it
+                interrupts the checks in progress
+            on_result (callable): on_result(result), called from the engine's
+                event loop as soon as each switch has been checked
+            max_workers (int): Switches checked concurrently
+        Returns:
+            list: One result per ip, in the same order: {'ip', 'success',
+                  'ssh_works', 'sudo_works', 'ovs_available', 'bridges',
+                  'ovs_version', 'elapsed', and 'message' or 'error'}
+        """
+        deadline = deadline or Deadline()
+        return ssh_engine.run_sync(self._verify_all(ips, username, password, deadline, on_result, max_workers),
+                                   deadline=deadline)
     
-    def _identify_device_type(self, ip):
-        """Try to identify device type via SSH banner"""
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(5)
-            sock.connect((ip, 22))
-            
-            # Get SSH banner
-            banner = sock.recv(1024).decode('utf-8', errors='ignore').lower()
-            sock.close()
-            
-            # Identify based on SSH banner
-            if 'openssh' in banner:
-                if any(keyword in banner for keyword in ['linux', 'ubuntu', 'debian']):
-                    return 'Linux Server/Switch'
-                else:
-                    return 'SSH Server'
-            elif 'cisco' in banner:
-                return 'Cisco Device'
-            elif 'juniper' in banner:
-                return 'Juniper Device'
-            else:
-                return 'Network Device'
-                
-        except:
-            return 'Unknown'
+    async def _verify_all(self, ips, username, password, deadline, on_result, max_workers):
+        slots = asyncio.Semaphore(max(1, max_workers))
+        
+        async def verify(ip):
+            async with slots:
+                result = await self._verify_switch(ip, username, password, deadline)
+            if on_result:
+                on_result(result)
+            return result
+        
+        return await asyncio.gather(*(verify(ip) for ip in ips))
     
-    def test_switch_connectivity(self, ip, username='kali', password=None):
-        """Test if we can connect to a switch and run OVS commands"""
+    async def _verify_switch(self, ip, username, password, batch_deadline):
+        """Check one switch; never raises"""
+        started = time.monotonic()
+        deadline = Deadline(min(VERIFY_HOST_TIMEOUT, batch_deadline.remaining()))
+        unregister = batch_deadline.on_cancel(deadline.cancel)
+        result = {
+            'ip': ip,
+            'success': False,
+            'ssh_works': False,
+            'sudo_works': False,
+            'ovs_available': False,
+            'bridges': 0,
+            'ovs_version': None
+        }
         try:
             logger.info(f"Testing switch connectivity to {ip}")
-            
-            ssh = paramiko.SSHClient()
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            
-            # Try to connect
-            ssh.connect(ip, username=username, password=password, timeout=10)
-            
-            # Test basic connectivity first
-            stdin, stdout, stderr = ssh.exec_command('echo "test"', get_pty=True)
-            output = stdout.read().decode().strip()
-            
-            if 'test' not in output:
-                ssh.close()
-                return {'success': False, 'error': 'SSH connection failed - no response'}
-            
-            # Test OVS command
-            stdin, stdout, stderr = ssh.exec_command('sudo ovs-vsctl show', get_pty=True)
-            
-            if password:
-                stdin.write(password + '\n')
-                stdin.flush()
-            
-            # Wait a bit for command to execute
-            time.sleep(2)
-            
-            output = stdout.read().decode()
-            error = stderr.read().decode()
-            
-            ssh.close()
-            
-            # Check if OVS is available
-            if 'command not found' in error or 'ovs-vsctl: not found' in error:
-                return {
-                    'success': False, 
-                    'error': 'Open vSwitch not found on this host',
-                    'ssh_works': True
-                }
-            elif 'permission denied' in error.lower():
-                return {
-                    'success': False, 
-                    'error': 'Permission denied - check sudo access',
-                    'ssh_works': True
-                }
-            elif output or not error:
-                return {
-                    'success': True, 
-                    'message': 'OVS connection successful',
-                    'ssh_works': True
-                }
+            # Under a PTY (needed by sudo) everything the command prints is in output
+            output, error, _ = await ssh_engine.run(ip, 'ovs-vsctl --timeout=5 show', username=username,
+                                                 password=password, deadline=deadline)
+            result['ssh_works'] = True
+            if 'Command interrupted' in error:
+                result['error'] = f'Timed out: {deadline.reason()}'
             else:
-                return {
-                    'success': False, 
-                    'error': f'OVS test failed: {error}',
-                    'ssh_works': True
-                }
-                
+                result.update(self._parse_verification(output + error))
         except paramiko.AuthenticationException:
-            return {'success': False, 'error': 'Authentication failed'}
+            result['error'] = 'Authentication failed'
         except paramiko.SSHException as e:
-            return {'success': False, 'error': f'SSH error: {str(e)}'}
+            result['error'] = f'SSH error: {str(e)}'
+        except (socket.timeout, TimeoutError, asyncio.TimeoutError) as e:
+            result['error'] = f'Timed out: {str(e) or deadline.reason()}'
         except Exception as e:
             logger.error(f"Switch connectivity test error: {str(e)}")
-            return {'success': False, 'error': f'Connection error: {str(e)}'}
+            result['error'] = f'Connection error: {str(e)}'
+        finally:
+            unregister()
+        result['elapsed'] = round(time.monotonic() - started, 2)
+        return result
+    
+    def _parse_verification(self, output):
+        """Fields of a verification result from the output of sudo ovs-vsctl show"""
+        text = output.lower()
+        if any(failure in text for failure in _SUDO_FAILURES):
+            return {'error': 'Permission denied - check sudo access'}
+        if 'command not found' in text or 'ovs-vsctl: not found' in text:
+            return {'sudo_works': True, 'error': 'Open vSwitch not found on this host'}
+        if 'database connection failed' in text:
+            return {'sudo_works': True, 'error': 'Open vSwitch is installed but ovsdb-server is not running'}
+        
+        errors = [line.strip() for line in output.splitlines() if line.strip().startswith('ovs-vsctl:')]
+        if errors:
+            return {'sudo_works': True, 'error': f'OVS test failed: {errors[0]}'}
+        
+        version = re.search(r'ovs_version:\s*"?([^"\s]+)', output)
+        return {
+            'success': True,
+            'message': 'OVS connection successful',
+            'sudo_works': True,
+            'ovs_available': True,
+            'bridges': len(re.findall(r'^\s*Bridge\s', output, re.MULTILINE)),
+            'ovs_version': version.group(1) if version else None
+        }
     
-    def quick_scan(self, base_ip='192.168.1.1'):
-        """Quick scan based on provided base IP"""
+    def quick_scan(self, base_ip='192.168.1.1', prefix=24, exclude=None, on_host=None, incremental=True,
+                   resolve_names=True):
+        """Quick scan of the /prefix network around the provided base IP"""
         try:
-            logger.info(f"Quick scan from base IP: {base_ip}")
+            logger.info(f"Quick scan from base IP: {base_ip}/{prefix}")
             
             # Extract subnet from base IP
-            ip_parts = base_ip.split('.')
-            if len(ip_parts) != 4:
+            try:
+                network = ipaddress.IPv4Network(f"{base_ip}/{int(prefix)}", strict=False)
+            except ValueError:
                 return {'error': 'Format IP invalide'}
 
-            network_range = f"{'.'.join(ip_parts[:3])}.0/24"
+            network_range = str(network)
             
             # Perform the scan
-            result = self.scan_network(network_range)
+            result = self.scan_network(network_range, on_host=on_host, exclude=exclude, incremental=incremental,
+                                       resolve_names=resolve_names)
             
             if 'error' in result:
                 return result
@@ -356,7 +553,9 @@ class NetworkScanner:
                 'total_found': len(result['hosts']),
                 'switch_candidates': len([
                     h for h in result['hosts'] if h.get('is_switch_candidate')
-                ])
+                ]),
+                'delta': result.get('delta'),
+                'shared_with': result.get('shared_with')
             }
             
         except Exception as e:
@@ -0,0 +1,95 @@
+# services/nmap_xml.py
+
+import xml.etree.ElementTree as ET
+
+
+def _service(port):
+    service = port.find('service')
+    if service is None:
+        return {}
+    return {key: service.get(key) for key in ('name', 'product', 'version', 'extrainfo', 'ostype', 'devicetype')
+            if service.get(key)}
+
+
+def _host_record(host):
+    """Plain dict for one <host> element"""
+    record = {'ip': None, 'mac': None, 'vendor': None, 'hostname': None, 'state': None, 'ports': {}}
+
+    status = host.find('status')
+    if status is not None:
+        record['state'] = status.get('state')
+
+    for address in host.findall('address'):
+        if address.get('addrtype') == 'ipv4':
+            record['ip'] = address.get('addr')
+        elif address.get('addrtype') == 'mac':
+            record['mac'] = address.get('addr')
+            record['vendor'] = address.get('vendor')
+
+    for hostname in host.findall('hostnames/hostname'):
+        # The PTR record, else whatever name the target was given as
+        if hostname.get('type') == 'PTR' or record['hostname'] is None:
+            record['hostname'] = hostname.get('name')
+
+    for port in host.findall('ports/port'):
+        state = port.find('state')
+        record['ports'][int(port.get('portid'))] = {
+            'protocol': port.get('protocol'),
+            'state': state.get('state') if state is not None else None,
+            'service': _service(port),
+        }
+    return record
+
+
+def _read_chunks(stream, size=65536):
+    """Whatever the pipe holds, as soon as it holds something (not size bytes)"""
+    read = getattr(stream, 'read1', stream.read)
+    while True:
+        data = read(size)
+        if not data:
+            return
+        yield data
+
+
+def iter_nmap_hosts(stream, on_progress=None):
+    """
+    Stream-parse nmap XML output (-oX -) as nmap writes it.
+
+    Incremental iterparse: each <host> is turned into a record and dropped
+    from the tree as soon as it is complete, so hosts are reported while
+    nmap is still running and memory stays flat whatever their number.
+
+    Args:
+        stream: Binary file object (nmap's stdout)
+        on_progress (callable): on_progress(task, percent) for each
+            <taskprogress> element (nmap --stats-every)
+    Yields:
+        dict: {'ip', 'mac', 'vendor', 'hostname', 'state',
+               'ports': {port: {'protocol', 'state', 'service': {...}}}}
+    Raises:
+        xml.etree.ElementTree.ParseError: if the output is not valid XML
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    root = None
+    for data in _read_chunks(stream):
+        parser.feed(data)
+        for event, element in parser.read_events():
+            if event == 'start':
+                if root is None:
+                    root = element
+                continue
+            if element.tag == 'host':
+                record = _host_record(element)
+                # Hosts are children of <nmaprun>: forget the ones already handled
+                root.clear()
+                if record['ip']:
+                    yield record
+            elif element.tag == 'taskprogress':
+                if on_progress:
+                    try:
+                        percent = float(element.get('percent', 0))
+                    except ValueError:
+                        percent = 0.0
+                    on_progress(element.get('task'), percent)
+                root.clear()
+    parser.close()
@@ -0,0 +1,270 @@
+# services/ovs_cache.py
+
+import logging
+import shlex
+import threading
+import time
+from collections import OrderedDict
+
+from services.deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+# ovs-vsctl sub-commands that only read the database, grouped by how long
+# their answer may be served from cache (seconds)
+TOPOLOGY_COMMANDS = {'list-br', 'list-ports', 'list-ifaces', 'br-exists', 'port-to-br',
+                     'iface-to-br', 'br-to-vlan', 'br-to-parent'}
+RECORD_COMMANDS = {'show', 'list', 'find', 'get'}
+
+DEFAULT_TTLS = {
+    'topology': 10.0,
+    'records': 5.0,
+}
+
+# Global options that change what a read returns, not whether it is one
+_READ_OPTIONS = ('--format', '--columns', '--data', '--no-headings', '--pretty', '--bare', '--timeout', '-t')
+
+
+def normalize_command(cmd):
+    """Canonical form of a command: same tokens, single spaces, no leading sudo"""
+    try:
+        tokens = shlex.split(cmd)
+    except ValueError:
+        tokens = cmd.split()
+    if tokens and tokens[0] == 'sudo':
+        tokens = tokens[1:]
+    return ' '.join(shlex.quote(t) for t in tokens)
+
+
+def command_class(cmd):
+    """
+    TTL class of a read-only ovs-vsctl command.
+
+    Returns:
+        str: 'topology' or 'records', or None if the command is not a plain
+             ovs-vsctl read (mutations, other tools, shell constructs)
+    """
+    try:
+        tokens = shlex.split(cmd)
+    except ValueError:
+        return None
+    if tokens and tokens[0] == 'sudo':
+        tokens = tokens[1:]
+    if not tokens or tokens[0] != 'ovs-vsctl':
+        return None
+    if any(t in ('|', ';', '&&', '||', '>', '<') for t in tokens):
+        return None
+
+    parts = [[]]
+    for token in tokens[1:]:
+        if token == '--':
+            parts.append([])
+        else:
+            parts[-1].append(token)
+
+    # Every '--'-separated sub-command must be a read
+    classes = set()
+    for words in parts:
+        verbs = [w for w in words if not w.startswith('-')]
+        options = [w for w in words if w.startswith('-')]
+        if not verbs:
+            continue
+        if any(not o.startswith(_READ_OPTIONS) for o in options):
+            return None
+        if verbs[0] in TOPOLOGY_COMMANDS:
+            classes.add('topology')
+        elif verbs[0] in RECORD_COMMANDS:
+            classes.add('records')
+        else:
+            return None
+    if not classes:
+        return None
+    return 'records' if 'records' in classes else 'topology'
+
+
+def is_ovs_mutation(cmd):
+    """True for OVS commands that may change the switch configuration"""
+    return 'ovs-' in cmd and command_class(cmd) is None
+
+
+def _size_of(value):
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_size_of(v) for v in value) + 8 * len(value)
+    return 64
+
+
+class _Flight:
+    """One load in progress; concurrent callers for the same key wait on it"""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self, deadline):
+        """The loaded value; DeadlineExceeded if deadline runs out (or is cancelled) first"""
+        # Short slices, so that a cancelled request stops waiting too
+        while not self.done.wait(deadline.timeout(cap=0.5)):
+            pass
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class OvsQueryCache:
+    """
+    Read-through cache for read-only ovs-vsctl queries, keyed by
+    (host, credentials, normalized command): an answer is only served to
+    callers presenting the credentials that loaded it.
+
+    - entries expire after the TTL of their command class
+    - least recently used entries are evicted above max_bytes
+    - concurrent misses on the same key share one load (single-flight)
+    - invalidate_host() drops a host's entries; loads that were in flight
+      while it happened are returned to their callers but not stored
+    """
+
+    def __init__(self, ttls=None, max_bytes=8 * 1024 * 1024):
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (expires_at, size, value)
+        self._inflight = {}             # key -> _Flight
+        self._generations = {}          # host -> invalidation counter
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, hostname, cmd, loader, cacheable=None, auth=None, deadline=None):
+        """
+        Cached result of cmd on hostname, or loader() on a miss.
+
+        Args:
+            loader (callable): runs the command, returns the value to cache
+            cacheable (callable): value -> bool; values it rejects (errors)
+                are returned but not stored
+            auth (hashable): Credentials the loader runs with (see
+                Transport.auth_key); entries are not shared across them
+            deadline (Deadline): Caller's deadline, bounding the wait for
+                a load started by another caller (DeadlineExceeded)
+
+        Commands that are not read-only go straight to loader().
+        """
+        return self.get_or_load_many(hostname, [cmd], lambda cmds: {cmds[0]: loader()},
+                                     cacheable, auth, deadline)[cmd]
+
+    def get_or_load_many(self, hostname, commands, loader, cacheable=None, auth=None, deadline=None):
+        """
+        Like get_or_load() for several commands; the misses this caller is
+        responsible for are loaded with one loader(list of commands) call.
+
+        Returns:
+            dict: {cmd: value}
+        """
+        results = {}
+        waiting = {}
+        leading = {}
+        uncached = []
+        now = time.monotonic()
+
+        with self._lock:
+            generation = self._generations.get(hostname, 0)
+            for cmd in commands:
+                ttl_class = command_class(cmd)
+                if ttl_class is None:
+                    uncached.append(cmd)
+                    continue
+                key = (hostname, auth, normalize_command(cmd))
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results[cmd] = entry[2]
+                elif key in self._inflight:
+                    self.hits += 1
+                    waiting[cmd] = self._inflight[key]
+                else:
+                    if entry is not None:
+                        self._drop(key)
+                    self.misses += 1
+                    flight = self._inflight[key] = _Flight()
+                    leading[cmd] = (key, ttl_class, flight)
+
+        to_load = uncached + list(leading)
+        if to_load:
+            try:
+                loaded = loader(to_load)
+            except BaseException as e:
+                with self._lock:
+                    for key, _, flight in leading.values():
+                        self._inflight.pop(key, None)
+                        flight.error = e
+                        flight.done.set()
+                raise
+            results.update((cmd, loaded[cmd]) for cmd in uncached)
+
+            with self._lock:
+                current = self._generations.get(hostname, 0) == generation
+                for cmd, (key, ttl_class, flight) in leading.items():
+                    value = loaded[cmd]
+                    results[cmd] = value
+                    if current and (cacheable is None or cacheable(value)):
+                        self._store(key, value, time.monotonic() + self.ttls[ttl_class])
+                    self._inflight.pop(key, None)
+                    flight.value = value
+                    flight.done.set()
+
+        if waiting:
+            deadline = deadline or Deadline()
+            for cmd, flight in waiting.items():
+                results[cmd] = flight.wait(deadline)
+        return results
+
+    def invalidate_host(self, hostname):
+        """Forget everything cached for a host (call on any configuration change)"""
+        with self._lock:
+            self._generations[hostname] = self._generations.get(hostname, 0) + 1
+            for key in [k for k in self._entries if k[0] == hostname]:
+                self._drop(key)
+        logger.debug(f"Invalidated OVS query cache for {hostname}")
+
+    def clear(self):
+        with self._lock:
+            for hostname in {k[0] for k in self._entries}:
+                self._generations[hostname] = self._generations.get(hostname, 0) + 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'in_flight': len(self._inflight),
+            }
+
+    def _store(self, key, value, expires_at):
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (expires_at, size, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+# Global cache instance
+ovs_cache = OvsQueryCache()
@@ -1,7 +1,220 @@
+import re
+import shlex
 import yaml
 from services.ssh_utils import run_ovs_command
 
-def apply_configuration_from_yaml(config, switch_host, ssh_password):
+# Keep a single ovs-vsctl invocation well below typical ARG_MAX / sshd limits.
+# Configs larger than this are applied in several transactions, so only one
+# that fits is all-or-nothing (see apply_configuration_batch).
+MAX_BATCH_LENGTH = 64 * 1024
+
+# What the transports put in stderr for a command failing without a word there
+_EXIT_STATUS = re.compile(r"Command exited with status -?\d+")
+
+def has_interface_type(value):
+    return bool(value and value.strip() and value != '""' and value != "''")
+
+def build_configuration_commands(config):
+    """
+    Compile a configuration dict into ovs-vsctl sub-commands, in the order
+    they must be applied.
+
+    Args:
+        config (dict): dictionnaire de configuration YAML déjà chargé.
+
+    Returns:
+        list: liste d'arguments ovs-vsctl (sans le préfixe 'ovs-vsctl'),
+              un élément par sous-commande.
+    """
+    commands = []
+
+    # Bridges and their ports
+    for bridge in config.get('bridges', []):
+        bridge_name = bridge.get('name')
+        if not bridge_name:
+            continue
+        # Add the bridge (ignore if it already exists)
+        commands.append(['--may-exist', 'add-br', bridge_name])
+
+        for port in bridge.get('ports', []):
+            port_name = port.get('name')
+            port_type = port.get('type', '')
+            if not port_name:
+                continue
+            # Add port to bridge (ignore if it already exists)
+            commands.append(['--may-exist', 'add-port', bridge_name, port_name])
+            # Set interface type if specified and not empty
+            if has_interface_type(port_type):
+                commands.append(['set', 'Interface', port_name, f'type={port_type}'])
+
+    # Interfaces configuration if available
+    for interface in config.get('interfaces', []):
+        iface_name = interface.get('name')
+        iface_type = interface.get('type', '')
+        if iface_name and has_interface_type(iface_type):
+            commands.append(['set', 'Interface', iface_name, f'type={iface_type}'])
+
+    return commands
+
+def format_command(args):
+    """Shell-safe 'ovs-vsctl ...' string for a single sub-command"""
+    return 'ovs-vsctl ' + ' '.join(shlex.quote(a) for a in args)
+
+def format_batch(commands):
+    """Chain sub-commands with '--' so ovs-vsctl runs them in one OVSDB transaction"""
+    return 'ovs-vsctl ' + ' -- '.join(' '.join(shlex.quote(a) for a in args) for args in commands)
+
+def _split_batches(commands):
+    batches, current, length = [], [], 0
+    for args in commands:
+        size = sum(len(a) + 3 for a in args) + 4
+        if current and length + size > MAX_BATCH_LENGTH:
+            batches.append(current)
+            current, length = [], 0
+        current.append(args)
+        length += size
+    if current:
+        batches.append(current)
+    return batches
+
+def _transaction_error(out, err):
+    """
+    ovs-vsctl reports a failed transaction on stderr, which lands in stdout
+    when the command runs under a PTY. A non-zero exit status (reported in
+    err by the transport) fails it whatever it printed: sudo refusing the
+    password or ovs-vsctl missing do not say 'ovs-vsctl:'. Returns the
+    error text or ''.
+    """
+    if err and _EXIT_STATUS.fullmatch(err.strip()) and (out or '').strip():
+        # Under a PTY the diagnostic is in stdout
+        return f"{out.strip()}\n{err.strip()}"
+    if err:
+        return err
+    errors = [line.strip() for line in (out or '').splitlines() if line.strip().startswith('ovs-vsctl:')]
+    return '\n'.join(errors)
+
+def _error_summary(error):
+    """The ovs-vsctl diagnostic line of an error, without sudo/PTY noise"""
+    lines = [line.strip() for line in error.splitlines() if line.strip()]
+    # The exit status line says less than what the command printed
+    lines = [line for line in lines if not _EXIT_STATUS.fullmatch(line)] or lines
+    for line in lines:
+        if 'ovs-vsctl:' in line:
+            return line[line.index('ovs-vsctl:'):]
+    return lines[-1] if lines else error
+
+def _find_failed_command(batch, error):
+    """Best-effort: the first sub-command whose target name appears in the error"""
+    for args in batch:
+        target = [a for a in args if not a.startswith('-') and '=' not in a][-1]
+        if re.search(r'(?<![\w.-])' + re.escape(target) + r'(?![\w.-])', error):
+            return args
+    return None
+
+def _not_applied(batch, reason):
+    return [(format_command(args), "", f"Not applied: {reason}") for args in batch]
+
+def _report(results, start, on_result):
+    """Hand the results appended since index start to on_result(cmd, out, err)"""
+    if on_result:
+        for cmd, out, err in results[start:]:
+            on_result(cmd, out, err)
+
+def apply_configuration_batch(commands, switch_host, ssh_password, deadline=None, on_result=None):
+    """
+    Apply compiled sub-commands as one ovs-vsctl invocation per batch.
+    Each batch is a single OVSDB transaction: if any sub-command fails,
+    none of the batch is applied.
+
+    A plan longer than MAX_BATCH_LENGTH takes several batches, applied in
+    order. When one fails, only that batch is rolled back: the batches
+    before it stay committed (and are reported as applied), the ones after
+    it are not sent.
+
+    Batches left when the deadline runs out are not sent. A batch cut
+    short by it is reported with an unknown outcome: the switch may have
+    committed the transaction before the channel was closed.
+
+    on_result(cmd, out, err) is called for each sub-command as soon as the
+    outcome of its batch is known.
+
+    Returns:
+        list: liste des tuples (commande, sortie, erreur), un par sous-commande.
+    """
+    results = []
+    failed = False
+    for batch in _split_batches(commands):
+        start = len(results)
+        if failed:
+            results.extend(_not_applied(batch, "an earlier transaction failed"))
+        else:
+            failed = not _apply_batch(batch, switch_host, ssh_password, deadline, results,
+                                      committed=start)
+        _report(results, start, on_result)
+    return results
+
+def _apply_batch(batch, switch_host, ssh_password, deadline, results, committed=0):
+    """
+    Apply one batch, appending one result per sub-command to results.
+    committed is the number of sub-commands earlier batches applied.
+
+    Returns:
+        bool: True if the batch is known to be applied
+    """
+    if deadline is not None and deadline.expired:
+        results.extend(_not_applied(batch, deadline.reason()))
+        return False
+
+    out, err = run_ovs_command(format_batch(batch), hostname=switch_host, password=ssh_password,
+                               deadline=deadline)
+    error = _transaction_error(out, err)
+
+    if error and deadline is not None and deadline.expired:
+        unknown = f"Unknown outcome: {deadline.reason()} while applying"
+        results.extend((format_command(args), out, unknown) for args in batch)
+        return False
+
+    if not error:
+        for index, args in enumerate(batch):
+            results.append((format_command(args), out if index == 0 else "", ""))
+        return True
+
+    failed = _find_failed_command(batch, error)
+    rollback_msg = f"Not applied: transaction rolled back ({_error_summary(error)})"
+    if committed:
+        rollback_msg += f"; the {committed} commands of earlier transactions remain applied"
+    for args in batch:
+        if args is failed:
+            results.append((format_command(args), out, error))
+        else:
+            results.append((format_command(args), "", rollback_msg))
+    return False
+
+def apply_configuration_commands(commands, switch_host, ssh_password, batch=True, deadline=None, on_result=None):
+    """
+    Apply compiled sub-commands, as transactions (batch, see
+    apply_configuration_batch) or with one ovs-vsctl invocation each.
+
+    Returns:
+        list: liste des tuples (commande, sortie, erreur), un par sous-commande.
+    """
+    if batch:
+        return apply_configuration_batch(commands, switch_host, ssh_password, deadline=deadline,
+                                         on_result=on_result)
+
+    results = []
+    for args in commands:
+        start = len(results)
+        if deadline is not None and deadline.expired:
+            results.extend(_not_applied([args], deadline.reason()))
+        else:
+            cmd = format_command(args)
+            out, err = run_ovs_command(cmd, hostname=switch_host, password=ssh_password, deadline=deadline)
+            results.append((cmd, out, err))
+        _report(results, start, on_result)
+    return results
+
+def apply_configuration_from_yaml(config, switch_host, ssh_password, batch=True, deadline=None, on_result=None):
     """
     Applique la configuration OVS depuis un dict 'config' sur le switch distant.
 
@@ -9,50 +222,18 @@ def apply_configuration_from_yaml(config, switch_host, ssh_password):
         config (dict): dictionnaire de configuration YAML déjà chargé.
         switch_host (str): hostname ou IP du switch distant.
         ssh_password (str): mot de passe SSH.
+        batch (bool): appliquer toute la configuration en une seule transaction
+            ovs-vsctl (True) ou une commande SSH par sous-commande (False).
+        deadline (Deadline): budget de la requête; les commandes restantes
+            à son expiration ne sont pas envoyées.
+        on_result (callable): on_result(commande, sortie, erreur), appelé
+            dès que le résultat de chaque commande est connu.
 
     Returns:
         list: liste des tuples (commande, sortie, erreur).
     """
-    results = []
-    
     try:
-        # Apply bridges
-        for bridge in config.get('bridges', []):
-            bridge_name = bridge.get('name')
-            if bridge_name:
-                # First, try to add the bridge (ignore if it already exists)
-                cmd = f"ovs-vsctl --may-exist add-br {bridge_name}"
-                out, err = run_ovs_command(cmd, hostname=switch_host, password=ssh_password)
-                results.append((cmd, out, err))
-
-                # Then add ports to the bridge
-                for port in bridge.get('ports', []):
-                    port_name = port.get('name')
-                    port_type = port.get('type', '')
-                    
-                    if port_name:
-                        # Add port to bridge (ignore if it already exists)
-                        cmd_port = f"ovs-vsctl --may-exist add-port {bridge_name} {port_name}"
-                        out, err = run_ovs_command(cmd_port, hostname=switch_host, password=ssh_password)
-                        results.append((cmd_port, out, err))
-                        
-                        # Set interface type if specified and not empty
-                        if port_type and port_type.strip() and port_type != '""' and port_type != "''":
-                            cmd_type = f"ovs-vsctl set Interface {port_name} type={port_type}"
-                            out, err = run_ovs_command(cmd_type, hostname=switch_host, password=ssh_password)
-                            results.append((cmd_type, out, err))
-
-        # Apply interfaces configuration if available
-        for interface in config.get('interfaces', []):
-            iface_name = interface.get('name')
-            iface_type = interface.get('type', '')
-            
-            if iface_name and iface_type and iface_type.strip() and iface_type != '""' and iface_type != "''":
-                cmd_iface = f"ovs-vsctl set Interface {iface_name} type={iface_type}"
-                out, err = run_ovs_command(cmd_iface, hostname=switch_host, password=ssh_password)
-                results.append((cmd_iface, out, err))
-
+        return apply_configuration_commands(build_configuration_commands(config), switch_host, ssh_password,
+                                            batch=batch, deadline=deadline, on_result=on_result)
     except Exception as e:
-        results.append((f"ERROR", f"Exception occurred: {str(e)}", str(e)))
-
-    return results
\ No newline at end of file
+        return [(f"ERROR", f"Exception occurred: {str(e)}", str(e))]
@@ -0,0 +1,121 @@
+# services/ovs_planner.py
+
+from services.ovs_configurator import has_interface_type, apply_configuration_commands, format_command
+from services.ovs_state import read_switch_state
+
+def desired_state(config):
+    """
+    Bridges, ports and interface types described by a backup dict.
+
+    Returns:
+        tuple: (dict bridge -> {port: type}, dict interface -> type)
+    """
+    bridges = {}
+    for bridge in config.get('bridges', []):
+        bridge_name = bridge.get('name')
+        if not bridge_name:
+            continue
+        ports = bridges.setdefault(bridge_name, {})
+        for port in bridge.get('ports', []):
+            if port.get('name'):
+                ports[port['name']] = port.get('type', '') or ''
+
+    interface_types = {}
+    for interface in config.get('interfaces', []):
+        if interface.get('name') and has_interface_type(interface.get('type', '')):
+            interface_types[interface['name']] = interface['type']
+    return bridges, interface_types
+
+def plan_restore(config, current, prune=False):
+    """
+    Diff a backup dict against the current switch state.
+
+    Args:
+        config (dict): parsed backup YAML
+        current (Topology): state from services.ovs_state.read_switch_state
+        prune (bool): remove ports present on a backed-up bridge but not in the backup
+
+    Returns:
+        tuple: (list of ovs-vsctl sub-commands, summary dict)
+    """
+    wanted, interface_types = desired_state(config)
+    current_types = {name: port.type for name, port in current.ports_by_name.items()}
+
+    commands = []
+    summary = {
+        'bridges_added': [],
+        'ports_added': [],
+        'ports_removed': [],
+        'types_changed': [],
+    }
+
+    for bridge_name, ports in wanted.items():
+        existing = current.bridge(bridge_name)
+        if existing is None:
+            commands.append(['--may-exist', 'add-br', bridge_name])
+            summary['bridges_added'].append(bridge_name)
+            existing_ports = set()
+        else:
+            existing_ports = {port.name for port in existing.ports}
+
+        if prune:
+            for port_name in sorted(existing_ports):
+                # The bridge's own internal port is never part of a backup
+                if port_name != bridge_name and port_name not in ports:
+                    commands.append(['--if-exists', 'del-port', bridge_name, port_name])
+                    summary['ports_removed'].append(f"{bridge_name}/{port_name}")
+
+        for port_name, port_type in ports.items():
+            added = port_name not in existing_ports
+            if added:
+                port = current.port(port_name)
+                owner = port.bridge.name if port is not None and port.bridge is not None else None
+                if owner and owner != bridge_name:
+                    # Port lives on another bridge: move it
+                    commands.append(['--if-exists', 'del-port', owner, port_name])
+                    summary['ports_removed'].append(f"{owner}/{port_name}")
+                commands.append(['--may-exist', 'add-port', bridge_name, port_name])
+                summary['ports_added'].append(f"{bridge_name}/{port_name}")
+
+            # A port (re)added here comes back as a system interface, whatever its type was
+            target_type = interface_types.get(port_name, port_type)
+            current_type = current_types.get(port_name, '')
+            if has_interface_type(target_type) and (added or current_type != target_type):
+                commands.append(['set', 'Interface', port_name, f'type={target_type}'])
+                if current_type != target_type:
+                    summary['types_changed'].append(f"{port_name}: {current_type or 'system'} -> {target_type}")
+
+    # Interfaces listed outside any backed-up bridge
+    planned_ports = {port for ports in wanted.values() for port in ports}
+    for iface_name, iface_type in interface_types.items():
+        if iface_name not in planned_ports and iface_name in current_types and current_types[iface_name] != iface_type:
+            commands.append(['set', 'Interface', iface_name, f'type={iface_type}'])
+            summary['types_changed'].append(f"{iface_name}: {current_types[iface_name] or 'system'} -> {iface_type}")
+
+    summary['in_sync'] = not commands
+    return commands, summary
+
+def restore_configuration(config, switch_host, ssh_password, dry_run=False, prune=False, deadline=None,
+                          on_result=None, batch=True):
+    """
+    Restore a backup by pushing only what differs from the switch, as one
+    transaction (batch) or one ovs-vsctl invocation per command.
+    on_result(cmd, out, err) is called as each command's outcome is known.
+
+    Returns:
+        dict: {'plan': [commands], 'summary': {...}, 'results': [(cmd, out, err)]}
+              or {'error': message} if the current state could not be read.
+    """
+    current, err = read_switch_state(switch_host, ssh_password, deadline=deadline)
+    if err:
+        return {'error': f"Impossible de lire l'état du switch: {err}"}
+
+    commands, summary = plan_restore(config, current, prune=prune)
+    plan = [format_command(args) for args in commands]
+
+    results = []
+    if commands and not dry_run:
+        results = apply_configuration_commands(commands, switch_host, ssh_password, batch=batch,
+                                               deadline=deadline, on_result=on_result)
+
+    return {'plan': plan, 'summary': summary, 'results': results}
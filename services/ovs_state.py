@@ -0,0 +1,70 @@
+# services/ovs_state.py
+
+from services.ovsdb_parser import parse_tables
+from services.ovs_topology import Topology
+from services.deadline import DeadlineExceeded
+from services.ssh_utils import stream_ovs_command, clean_ovs_output
+
+# Output kept to report ovs-vsctl errors (stderr is merged into the stream)
+ERROR_EXCERPT_LENGTH = 2048
+
+# Columns needed to rebuild bridge -> port -> interface membership
+STATE_COLUMNS = {
+    'Bridge': ['_uuid', 'name', 'ports', 'datapath_id'],
+    'Port': ['_uuid', 'name', 'interfaces', 'tag'],
+    'Interface': ['_uuid', 'name', 'type'],
+}
+
+def build_list_command(tables):
+    """
+    Single ovs-vsctl invocation listing several tables as JSON.
+
+    Args:
+        tables (dict): table name -> list of columns
+    """
+    parts = [f"--columns={','.join(columns)} list {table}" for table, columns in tables.items()]
+    return 'ovs-vsctl --format=json ' + ' -- '.join(parts)
+
+def fetch_tables(hostname, password, tables=None, deadline=None):
+    """
+    Read several OVSDB tables in one SSH round-trip.
+
+    Returns:
+        tuple: (dict table -> list of OvsRecord, error message or None)
+    """
+    tables = tables or STATE_COLUMNS
+    excerpt = []
+
+    def chunks():
+        # Rows are decoded while the output arrives; only the start is kept
+        size = 0
+        for chunk in stream_ovs_command(build_list_command(tables), hostname=hostname,
+                                        password=password, lines=False, deadline=deadline):
+            if size < ERROR_EXCERPT_LENGTH:
+                excerpt.append(chunk[:ERROR_EXCERPT_LENGTH - size])
+                size += len(excerpt[-1])
+            yield chunk
+
+    try:
+        parsed = parse_tables(chunks(), list(tables.items()))
+    except ValueError as e:
+        return {}, clean_ovs_output(''.join(excerpt)) or str(e)
+    except DeadlineExceeded as e:
+        return {}, f"Timed out reading switch state: {str(e)}"
+    except Exception as e:
+        return {}, f"SSH connection error: {str(e)}"
+    if len(parsed) != len(tables):
+        return {}, clean_ovs_output(''.join(excerpt)) or "Unexpected ovs-vsctl output"
+    return parsed, None
+
+def read_switch_state(hostname, password, deadline=None):
+    """
+    Current bridges, ports and interface types of a switch, read in bulk.
+
+    Returns:
+        tuple: (Topology, error message or None)
+    """
+    tables, err = fetch_tables(hostname, password, deadline=deadline)
+    if err:
+        return None, err
+    return Topology.from_tables(tables), None
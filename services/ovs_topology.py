@@ -0,0 +1,137 @@
+# services/ovs_topology.py
+
+
+def _as_list(value):
+    """Single-element OVSDB sets decode to a bare value, empty ones to []"""
+    return value if isinstance(value, list) else [value]
+
+
+def _scalar(value, default=''):
+    """Optional OVSDB columns decode to [] when unset"""
+    return default if isinstance(value, (list, dict)) else value
+
+
+class Interface:
+    __slots__ = ('uuid', 'name', 'type', 'port')
+
+    def __init__(self, uuid, name, type=''):
+        self.uuid = uuid
+        self.name = name
+        self.type = type
+        self.port = None
+
+    def to_dict(self):
+        return {'name': self.name, 'type': self.type}
+
+
+class Port:
+    __slots__ = ('uuid', 'name', 'tag', 'interfaces', 'bridge')
+
+    def __init__(self, uuid, name, tag=None):
+        self.uuid = uuid
+        self.name = name
+        self.tag = tag
+        self.interfaces = []
+        self.bridge = None
+
+    @property
+    def type(self):
+        """Type of the port's main interface (same name; first one for bonds)"""
+        for interface in self.interfaces:
+            if interface.name == self.name:
+                return interface.type
+        return self.interfaces[0].type if self.interfaces else ''
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'type': self.type,
+            'tag': '' if self.tag is None else str(self.tag),
+            'interfaces': [i.to_dict() for i in self.interfaces],
+        }
+
+
+class Bridge:
+    __slots__ = ('uuid', 'name', 'datapath_id', 'ports')
+
+    def __init__(self, uuid, name, datapath_id=''):
+        self.uuid = uuid
+        self.name = name
+        self.datapath_id = datapath_id
+        self.ports = []
+
+    def port_names(self, include_local=False):
+        """Port names as 'ovs-vsctl list-ports' reports them (sorted, no local port)"""
+        return sorted(p.name for p in self.ports if include_local or p.name != self.name)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'datapath_id': self.datapath_id,
+            'ports': [p.to_dict() for p in sorted(self.ports, key=lambda p: p.name)],
+        }
+
+
+class Topology:
+    """
+    Bridge -> Port -> Interface graph of one switch, indexed by UUID and name.
+
+    Built in a single pass over the Bridge, Port and Interface rows using the
+    UUID references stored in Bridge.ports and Port.interfaces.
+    """
+
+    __slots__ = ('bridges', 'ports', 'interfaces',
+                 'bridges_by_name', 'ports_by_name', 'interfaces_by_name')
+
+    def __init__(self):
+        self.bridges = {}
+        self.ports = {}
+        self.interfaces = {}
+        self.bridges_by_name = {}
+        self.ports_by_name = {}
+        self.interfaces_by_name = {}
+
+    @classmethod
+    def from_tables(cls, tables):
+        """
+        Args:
+            tables (dict): 'Bridge', 'Port', 'Interface' -> records (OvsRecord or dict)
+                with at least _uuid/name and the ports/interfaces reference columns
+        """
+        topology = cls()
+
+        for row in tables.get('Interface', []):
+            interface = Interface(row.get('_uuid'), row.get('name'), _scalar(row.get('type', '')))
+            topology.interfaces[interface.uuid] = interface
+            topology.interfaces_by_name[interface.name] = interface
+
+        for row in tables.get('Port', []):
+            port = Port(row.get('_uuid'), row.get('name'), _scalar(row.get('tag'), None))
+            for uuid in _as_list(row.get('interfaces', [])):
+                interface = topology.interfaces.get(uuid)
+                if interface is not None:
+                    interface.port = port
+                    port.interfaces.append(interface)
+            topology.ports[port.uuid] = port
+            topology.ports_by_name[port.name] = port
+
+        for row in tables.get('Bridge', []):
+            bridge = Bridge(row.get('_uuid'), row.get('name'), _scalar(row.get('datapath_id', '')))
+            for uuid in _as_list(row.get('ports', [])):
+                port = topology.ports.get(uuid)
+                if port is not None:
+                    port.bridge = bridge
+                    bridge.ports.append(port)
+            topology.bridges[bridge.uuid] = bridge
+            topology.bridges_by_name[bridge.name] = bridge
+
+        return topology
+
+    def bridge(self, name):
+        return self.bridges_by_name.get(name)
+
+    def port(self, name):
+        return self.ports_by_name.get(name)
+
+    def to_dict(self):
+        return {'bridges': [b.to_dict() for b in self.bridges_by_name.values()]}
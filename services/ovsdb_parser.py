@@ -0,0 +1,268 @@
+# services/ovsdb_parser.py
+
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_SEPARATORS = re.compile(r'[\s,]*')
+_BARE_STRING = re.compile(r'^[A-Za-z0-9_.:/-]+$')
+
+# Consumed input is dropped from the buffer once it grows past this size
+_COMPACT_AT = 64 * 1024
+
+
+def decode_datum(value):
+    """Convert an OVSDB JSON datum (["uuid",..], ["set",..], ["map",..]) to Python"""
+    if value.__class__ is list and len(value) == 2:
+        kind, payload = value
+        if kind == 'uuid' or kind == 'named-uuid':
+            return payload
+        if kind == 'set':
+            return [decode_datum(v) for v in payload]
+        if kind == 'map':
+            return {decode_datum(k): decode_datum(v) for k, v in payload}
+    return value
+
+
+class ColumnIndex:
+    """Column name -> position, computed once per table and shared by its records"""
+
+    __slots__ = ('table', 'columns', 'positions')
+
+    def __init__(self, table, columns):
+        self.table = table
+        self.columns = tuple(columns)
+        self.positions = {column: i for i, column in enumerate(self.columns)}
+
+
+class OvsRecord:
+    """One decoded row; values are stored positionally against a ColumnIndex"""
+
+    __slots__ = ('index', 'values')
+
+    def __init__(self, index, values):
+        self.index = index
+        self.values = values
+
+    @property
+    def table(self):
+        return self.index.table
+
+    def __getitem__(self, column):
+        return self.values[self.index.positions[column]]
+
+    def __contains__(self, column):
+        return column in self.index.positions
+
+    def get(self, column, default=None):
+        position = self.index.positions.get(column)
+        return default if position is None else self.values[position]
+
+    def to_dict(self):
+        return dict(zip(self.index.columns, self.values))
+
+    def __repr__(self):
+        return f"OvsRecord({self.index.table}, {self.to_dict()!r})"
+
+
+class OvsdbJsonParser:
+    """
+    Incremental parser for ``ovs-vsctl --format=json`` output.
+
+    ovs-vsctl prints one ``{"data": [...], "headings": [...]}`` document per
+    listed table. Text can be fed in arbitrary chunks; each row is decoded
+    and returned as soon as it is complete, so memory stays bounded by one
+    row plus one chunk rather than by the table size. Because "data" comes
+    before "headings", rows are only streamed when the caller passes the
+    columns it asked for (--columns=...); otherwise they are held until the
+    headings arrive. Non-JSON noise before a document (sudo prompts) is skipped.
+    """
+
+    def __init__(self, tables=()):
+        """
+        Args:
+            tables (list): (table name, columns or None) for each document, in order
+        """
+        self._tables = list(tables)
+        self._buffer = ''
+        self._pos = 0
+        self._state = 'seek'
+        self._key = None
+        self._index = None
+        self._pending = []
+        self.documents = 0
+        self.table_names = []
+
+    def feed(self, text):
+        """Add text and return the list of records completed by it"""
+        if self._pos > _COMPACT_AT:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        self._buffer += text
+        records = []
+        self._parse(records)
+        return records
+
+    def close(self):
+        """Signal end of input; raises ValueError on a truncated document"""
+        records = []
+        self._parse(records)
+        if self._state != 'seek':
+            raise ValueError(f"Truncated ovs-vsctl JSON output in table '{self._current_table()}'")
+        return records
+
+    def _current_table(self):
+        if self.documents <= len(self._tables):
+            return self._tables[self.documents - 1][0]
+        return f"table{self.documents}"
+
+    def _start_document(self):
+        self.documents += 1
+        columns = None
+        if self.documents <= len(self._tables):
+            columns = self._tables[self.documents - 1][1]
+        name = self._current_table()
+        self.table_names.append(name)
+        self._index = ColumnIndex(name, columns) if columns else None
+        self._pending = []
+
+    def _parse(self, records):
+        buffer = self._buffer
+        end = len(buffer)
+        while True:
+            state = self._state
+            if state == 'seek':
+                start = buffer.find('{', self._pos)
+                if start == -1:
+                    self._pos = end
+                    return
+                self._pos = start + 1
+                self._start_document()
+                self._state = 'key'
+                continue
+
+            pos = _SEPARATORS.match(buffer, self._pos).end()
+            if pos >= end:
+                self._pos = pos
+                return
+
+            if state == 'key':
+                if buffer[pos] == '}':
+                    self._pos = pos + 1
+                    if self._pending:
+                        raise ValueError(f"No headings for table '{self._current_table()}'")
+                    self._state = 'seek'
+                    continue
+                if self._key is None:
+                    try:
+                        self._key, pos = _decoder.raw_decode(buffer, pos)
+                    except ValueError:
+                        return
+                    self._pos = pos
+                    pos = _SEPARATORS.match(buffer, pos).end()
+                    if pos >= end:
+                        return
+                if buffer[pos] != ':':
+                    raise ValueError(f"Malformed ovs-vsctl JSON output near offset {pos}")
+                pos = _SEPARATORS.match(buffer, pos + 1).end()
+                if pos >= end:
+                    return
+                if self._key == 'data':
+                    if buffer[pos] != '[':
+                        raise ValueError("ovs-vsctl JSON 'data' is not a list")
+                    self._pos = pos + 1
+                    self._state = 'rows'
+                else:
+                    self._pos = pos
+                    self._state = 'value'
+
+            elif state == 'rows':
+                if buffer[pos] == ']':
+                    self._pos = pos + 1
+                    self._key = None
+                    self._state = 'key'
+                    continue
+                try:
+                    row, pos = _decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    self._pos = pos
+                    return
+                self._pos = pos
+                values = [decode_datum(v) for v in row]
+                if self._index is not None:
+                    records.append(OvsRecord(self._index, values))
+                else:
+                    self._pending.append(values)
+
+            else:  # 'value'
+                try:
+                    value, pos = _decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    self._pos = pos
+                    return
+                self._pos = pos
+                if self._key == 'headings':
+                    self._index = ColumnIndex(self._current_table(), value)
+                    records.extend(OvsRecord(self._index, values) for values in self._pending)
+                    self._pending = []
+                self._key = None
+                self._state = 'key'
+
+
+def iter_records(source, tables=()):
+    """
+    Yield OvsRecord objects from ``ovs-vsctl --format=json`` output.
+
+    Args:
+        source: the whole output as a str, or an iterable of text chunks
+        tables (list): (table name, columns or None) for each listed table
+    """
+    parser = OvsdbJsonParser(tables)
+    chunks = (source,) if isinstance(source, str) else source
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def parse_tables(source, tables=()):
+    """
+    Parse every listed table.
+
+    Returns:
+        dict: table name -> list of OvsRecord, one entry per document found
+    """
+    parser = OvsdbJsonParser(tables)
+    result = {}
+
+    def collect(records):
+        for name in parser.table_names[len(result):]:
+            result[name] = []
+        for record in records:
+            result[record.table].append(record)
+
+    chunks = (source,) if isinstance(source, str) else source
+    for chunk in chunks:
+        collect(parser.feed(chunk))
+    collect(parser.close())
+    return result
+
+
+def _format_value(value):
+    if isinstance(value, str):
+        return value if _BARE_STRING.match(value) else json.dumps(value)
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, list):
+        return '[' + ', '.join(_format_value(v) for v in value) + ']'
+    if isinstance(value, dict):
+        return '{' + ', '.join(f"{_format_value(k)}={_format_value(v)}" for k, v in value.items()) + '}'
+    return str(value)
+
+
+def format_records(records):
+    """Render records the way plain 'ovs-vsctl list <table>' prints them"""
+    blocks = []
+    for record in records:
+        blocks.append('\n'.join(f"{column:<20}: {_format_value(value)}"
+                                for column, value in zip(record.index.columns, record.values)))
+    return '\n\n'.join(blocks)
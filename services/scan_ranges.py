@@ -0,0 +1,125 @@
+# services/scan_ranges.py
+
+import ipaddress
+import itertools
+import os
+
+# Largest number of addresses a single scan may cover (OVS_SCAN_MAX_ADDRESSES)
+MAX_SCAN_ADDRESSES = int(os.environ.get('OVS_SCAN_MAX_ADDRESSES', 65536))
+
+
+def parse_exclusions(exclude):
+    """
+    Parse an exclusion list.
+
+    Args:
+        exclude (str|list): Addresses, CIDR blocks or 'first-last' ranges,
+            as a list or a comma/space separated string
+    Returns:
+        list: IPv4Network blocks, merged and sorted
+    Raises:
+        ValueError: if an entry is not a valid address, block or range
+    """
+    if not exclude:
+        return []
+    if isinstance(exclude, str):
+        exclude = exclude.replace(',', ' ').split()
+
+    blocks = []
+    for entry in exclude:
+        entry = str(entry).strip()
+        if not entry:
+            continue
+        if '-' in entry:
+            first, last = (ipaddress.IPv4Address(part.strip()) for part in entry.split('-', 1))
+            if last < first:
+                raise ValueError(f"Plage d'exclusion inversée : {entry}")
+            blocks.extend(ipaddress.summarize_address_range(first, last))
+        else:
+            blocks.append(ipaddress.IPv4Network(entry, strict=False))
+    return list(ipaddress.collapse_addresses(blocks))
+
+
+def remaining_blocks(network, exclusions):
+    """Sub-blocks of network not covered by the exclusions, in address order"""
+    blocks = [network]
+    for excluded in exclusions:
+        if not excluded.overlaps(network):
+            continue
+        remaining = []
+        for block in blocks:
+            if block.subnet_of(excluded):
+                continue
+            if excluded.subnet_of(block):
+                remaining.extend(block.address_exclude(excluded))
+            else:
+                remaining.append(block)
+        blocks = remaining
+    return sorted(blocks)
+
+
+def _skipped(network):
+    """Network and broadcast addresses, which network.hosts() leaves out"""
+    if network.prefixlen >= network.max_prefixlen - 1:
+        return set()
+    return {network.network_address, network.broadcast_address}
+
+
+def iter_addresses(network, exclusions=()):
+    """
+    Host addresses of network (as network.hosts()) minus the exclusions,
+    lazily, in address order: nothing is materialised, whatever the size.
+
+    Args:
+        network (IPv4Network): Range to scan
+        exclusions (list): IPv4Network blocks, from parse_exclusions()
+    """
+    skipped = _skipped(network)
+    for block in remaining_blocks(network, exclusions):
+        first = int(block.network_address)
+        for value in range(first, first + block.num_addresses):
+            address = ipaddress.IPv4Address(value)
+            if address not in skipped:
+                yield address
+
+
+def is_scanned(address, network, exclusions=()):
+    """True if iter_addresses(network, exclusions) yields address"""
+    address = ipaddress.IPv4Address(address)
+    return (address in network and address not in _skipped(network)
+            and not any(address in block for block in exclusions))
+
+
+def count_addresses(network, exclusions=()):
+    """Number of addresses iter_addresses() yields, computed without iterating"""
+    skipped = _skipped(network)
+    total = 0
+    for block in remaining_blocks(network, exclusions):
+        total += block.num_addresses - sum(1 for address in skipped if address in block)
+    return total
+
+
+def iter_chunks(iterable, size):
+    """Consecutive lists of at most size items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def is_host_address(ip, network=None):
+    """
+    True if ip is a scannable unicast host address, inside network (and not
+    its network or broadcast address) when one is given.
+    """
+    try:
+        address = ipaddress.IPv4Address(ip)
+    except ValueError:
+        return False
+    if address.is_loopback or address.is_multicast or address.is_unspecified or address.is_reserved:
+        return False
+    if network is not None:
+        return address in network and address not in _skipped(network)
+    return True
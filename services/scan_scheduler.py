@@ -0,0 +1,240 @@
+# services/scan_scheduler.py
+
+import asyncio
+import collections
+import ipaddress
+import logging
+import os
+import threading
+import time
+
+from services.scan_ranges import is_host_address, remaining_blocks
+
+logger = logging.getLogger(__name__)
+
+# Connection attempts and probe datagrams per second, all scans included;
+# 0 for no limit (OVS_SCAN_RATE)
+SCAN_RATE = float(os.environ.get('OVS_SCAN_RATE', 5000))
+
+# Scans running at once; the others wait their turn in order (OVS_MAX_CONCURRENT_SCANS)
+MAX_CONCURRENT_SCANS = int(os.environ.get('OVS_MAX_CONCURRENT_SCANS', 2))
+
+# Seconds between two progress reports of a scan that waits
+WAIT_POLL = 0.5
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        """
+        Rate limit shared by threads and event loops: each caller reserves
+        its tokens and is told how long to wait for them, so one lock is
+        enough whatever loop or thread the caller runs in.
+
+        Args:
+            rate (float): Tokens per second (0 or less: unlimited)
+            burst (float): Tokens available at once (defaults to one second's worth)
+        """
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._granted = 0
+        self._delayed = 0
+
+    def reserve(self, tokens=1):
+        """Take tokens, returning the seconds to wait before using them"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            self._granted += tokens
+            if self._tokens >= 0:
+                return 0.0
+            self._delayed += tokens
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens=1):
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens=1):
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            return {'rate': self.rate, 'granted': self._granted, 'delayed': self._delayed}
+
+
+def _coverage(network, exclusions):
+    """Blocks of addresses a scan of network minus exclusions probes"""
+    return list(ipaddress.collapse_addresses(remaining_blocks(network, exclusions)))
+
+
+class _Follower:
+    def __init__(self, network, exclusions, on_host):
+        self.network = network
+        self.exclusions = exclusions
+        self.on_host = on_host
+
+    def wants(self, ip):
+        return is_host_address(ip, self.network) and not any(
+            ipaddress.IPv4Address(ip) in block for block in self.exclusions)
+
+
+class _ActiveScan:
+    def __init__(self, network, exclusions, key):
+        self.network = network
+        self.exclusions = exclusions
+        self.key = key
+        self.coverage = _coverage(network, exclusions)
+        self.state = 'queued'
+        self.followers = []
+        self.result = None
+        self.done = threading.Event()
+
+    def covers(self, coverage, key):
+        return key == self.key and all(any(block.subnet_of(mine) for mine in self.coverage) for block in coverage)
+
+    def relay(self, on_host, lock):
+        """on_host for the scan itself, also forwarding each host to the followers that want it"""
+        def relayed(host_info):
+            if on_host:
+                on_host(host_info)
+            with lock:
+                followers = list(self.followers)
+            for follower in followers:
+                if follower.on_host and follower.wants(host_info['ip']):
+                    try:
+                        follower.on_host(host_info)
+                    except Exception as e:
+                        logger.debug(f"Failed to forward host to a shared scan: {e}")
+        return relayed
+
+
+class ScanScheduler:
+    def __init__(self, max_concurrent=MAX_CONCURRENT_SCANS):
+        """
+        Admission control of network scans, process-wide.
+
+        At most max_concurrent scans run at once, the others wait in order
+        of arrival. A scan whose addresses are all covered by a scan already
+        queued or running (same options) does not probe anything: it shares
+        that scan's result, restricted to its own range, and receives its
+        hosts as they are found.
+
+        Args:
+            max_concurrent (int): Scans running at once
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self._cond = threading.Condition()
+        self._queue = collections.deque()
+        self._active = []
+        self._running = 0
+        self._shared = 0
+
+    def run(self, network, exclusions, scan, key=(), on_host=None, progress=None, total=0):
+        """
+        Run scan(on_host) when admitted, or share the result of a covering scan.
+
+        Args:
+            network (IPv4Network): Range to scan
+            exclusions (list): IPv4Network blocks left out
+            scan (callable): scan(on_host) -> result dict ({'hosts', ...} or {'error'})
+            key (tuple): Options that must match for two scans to be shared
+            on_host (callable): on_host(host_info) for each host found
+            progress (callable): progress(done, total, message) while
+                waiting; an exception it raises abandons the scan
+            total (int): Addresses of the scan, for progress reports
+        Returns:
+            dict: the scan's result
+        """
+        coverage = _coverage(network, exclusions)
+        with self._cond:
+            leader = next((active for active in self._active if active.covers(coverage, key)), None)
+            if leader is not None:
+                follower = _Follower(network, exclusions, on_host)
+                leader.followers.append(follower)
+                self._shared += 1
+            else:
+                entry = _ActiveScan(network, exclusions, key)
+                self._active.append(entry)
+                self._queue.append(entry)
+
+        if leader is not None:
+            logger.info(f"Scan of {network} shares the scan of {leader.network} in progress")
+            return self._follow(leader, follower, progress, total)
+
+        try:
+            self._wait_turn(entry, progress, total)
+            entry.result = scan(entry.relay(on_host, self._cond))
+            return entry.result
+        except BaseException as e:
+            entry.result = {'error': f'Scan interrompu : {str(e) or type(e).__name__}'}
+            raise
+        finally:
+            with self._cond:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                if entry.state == 'running':
+                    self._running -= 1
+                self._active.remove(entry)
+                self._cond.notify_all()
+            entry.done.set()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'running': [str(active.network) for active in self._active if active.state == 'running'],
+                'queued': [str(active.network) for active in self._queue],
+                'shared_total': self._shared,
+                'probe_budget': probe_budget.stats()
+            }
+
+    def _wait_turn(self, entry, progress, total):
+        while True:
+            with self._cond:
+                if self._queue[0] is entry and self._running < self.max_concurrent:
+                    self._queue.popleft()
+                    self._running += 1
+                    entry.state = 'running'
+                    return
+                ahead = self._queue.index(entry) + self._running
+            if progress:
+                progress(0, total, f'En attente : {ahead} scans en cours ou avant celui-ci')
+            with self._cond:
+                self._cond.wait(WAIT_POLL)
+
+    def _follow(self, leader, follower, progress, total):
+        try:
+            while not leader.done.wait(WAIT_POLL):
+                if progress:
+                    progress(0, total, f'Plage déjà en cours de scan ({leader.network}) : résultats partagés')
+        finally:
+            with self._cond:
+                leader.followers.remove(follower)
+
+        result = leader.result or {'error': 'Scan partagé interrompu'}
+        if 'error' in result:
+            return {'error': result['error']}
+        shared = dict(result, hosts=[host for host in result['hosts'] if follower.wants(host['ip'])],
+                      shared_with=str(leader.network))
+        if result.get('delta'):
+            delta = result['delta']
+            shared['delta'] = dict(delta, **{kind: [ip for ip in delta[kind] if follower.wants(ip)]
+                                             for kind in ('new', 'changed', 'gone')})
+        return shared
+
+
+# Global probe rate budget, shared by the TCP sweep and the fingerprinting probes
+probe_budget = TokenBucket(SCAN_RATE)
+
+# Global scheduler instance
+scan_scheduler = ScanScheduler()
@@ -0,0 +1,443 @@
+# services/ssh_async.py
+
+import asyncio
+import codecs
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import paramiko
+
+from services.deadline import Deadline, DeadlineExceeded
+from services.ssh_pool import ssh_pool
+from services.ssh_scheduler import ssh_scheduler
+
+logger = logging.getLogger(__name__)
+
+# sshd refuses more than MaxSessions (10 by default) channels per connection
+MAX_CHANNELS_PER_CONNECTION = 8
+
+# Extra time run_sync() gives a deadline-aware coroutine to hand back its
+# partial results once the deadline has passed
+RESULT_GRACE = 2
+
+# Seconds to wait after EOF for the exit-status message, which may trail it
+EXIT_STATUS_WAIT = 5
+
+
+def _start_channel(conn, command, get_pty, stdin_data, timeout=None):
+    """Blocking part of a command start: channel open + exec request round-trips"""
+    channel = conn.transport.open_session(timeout=timeout)
+    try:
+        if timeout is not None:
+            channel.settimeout(timeout)
+        if get_pty:
+            channel.get_pty()
+        channel.exec_command(command)
+        if stdin_data:
+            channel.sendall(stdin_data.encode())
+        channel.settimeout(None)
+    except Exception:
+        channel.close()
+        raise
+    return channel
+
+
+def _step_timeout(deadline):
+    return None if deadline is None else deadline.timeout()
+
+
+def _label(commands):
+    """Short description of a batch for scheduler metrics"""
+    label = '; '.join(commands)
+    return label if len(label) <= 120 else label[:117] + '...'
+
+
+class AsyncSSHEngine:
+    """
+    asyncio execution engine for commands on pooled SSH connections.
+
+    Only the SSH handshake and the channel open/exec round-trips are blocking
+    in paramiko; those run in thread pools. Connection leases (which may
+    include a handshake) get one thread per scheduler slot, so a bulk verify
+    of many switches never leaves channel starts queued behind its connects;
+    channel starts share a small bounded pool. Everything else, waiting for
+    output included, happens on the event loop: each channel's fileno() is
+    registered with loop.add_reader(), so thousands of commands in flight
+    cost no thread each. (paramiko still runs one reader thread per open
+    transport.)
+
+    Each run_many()/stream() call holds one scheduler slot for its host
+    (services/ssh_scheduler.py) while it uses its connection, so bursts
+    queue instead of overrunning the switch's sshd.
+
+    The engine owns a background event loop so that blocking code (Flask
+    request threads) can use it through run_sync().
+    """
+
+    def __init__(self, pool=ssh_pool, max_blocking_threads=16, scheduler=ssh_scheduler):
+        self.pool = pool
+        self.scheduler = scheduler
+        self._executor = ThreadPoolExecutor(max_workers=max_blocking_threads,
+                                            thread_name_prefix='ssh-async')
+        # Every lease happens under a scheduler slot: max_in_flight bounds them
+        self._connect_executor = ThreadPoolExecutor(max_workers=scheduler.max_in_flight,
+                                                    thread_name_prefix='ssh-connect')
+        self._loop = None
+        self._loop_thread = None
+        self._lock = threading.Lock()
+
+    async def run(self, hostname, cmd, username='kali', password=None, key_path=None,
+                  sudo=True, get_pty=None, timeout=None, deadline=None):
+        """
+        Run one command. Raises on connection failure; a command cut by the
+        deadline returns its partial output (see run_many()).
+
+        Returns:
+            tuple: (stdout, stderr, exit_status)
+        """
+        results = await self.run_many(hostname, [cmd], username=username, password=password,
+                                      key_path=key_path, sudo=sudo, get_pty=get_pty, timeout=timeout,
+                                      deadline=deadline)
+        return results[cmd]
+
+    async def run_many(self, hostname, commands, username='kali', password=None, key_path=None,
+                       sudo=True, get_pty=None, timeout=None, deadline=None):
+        """
+        Run several commands concurrently on channels of one pooled connection.
+
+        Args:
+            key_path (str): private key to authenticate with when password is None
+            sudo (bool): prefix with sudo and answer its password prompt
+            get_pty (bool): request a PTY (defaults to sudo)
+            timeout (float): seconds for the whole operation (shorthand for
+                deadline=Deadline(timeout))
+            deadline (Deadline): bounds the scheduler queue, connect, channel
+                opens and reads. Raises DeadlineExceeded if it runs out before
+                the commands are started; once they are, the ones still
+                running when it expires or is cancelled have their channel
+                closed and report what they printed so far, with the reason
+                appended to stderr.
+
+        Returns:
+            dict: {cmd: (stdout, stderr, exit_status)}; exit_status is None
+                  when the command was interrupted or the server sent none.
+                  Under a PTY, stderr is merged into stdout: check the status.
+        """
+        commands = list(dict.fromkeys(commands))
+        if deadline is None and timeout is not None:
+            deadline = Deadline(timeout)
+        return await self._run_many(hostname, commands, username, password, key_path, sudo,
+                                    sudo if get_pty is None else get_pty, deadline)
+
+    async def gather(self, jobs, timeout=None):
+        """
+        Fan out over many hosts.
+
+        Args:
+            jobs (list): dicts of run_many() keyword arguments
+                (hostname, commands, username, password, ...)
+            timeout (float): deadline for the whole fan-out
+
+        Returns:
+            list: per job, the {cmd: (stdout, stderr, exit_status)} dict or the exception
+                  raised (asyncio.TimeoutError for jobs cut by the deadline)
+        """
+        tasks = [asyncio.ensure_future(self.run_many(**job)) for job in jobs]
+        if not tasks:
+            return []
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        results = []
+        for task in tasks:
+            if task in pending:
+                results.append(asyncio.TimeoutError(f"Deadline of {timeout}s exceeded"))
+            elif task.exception() is not None:
+                results.append(task.exception())
+            else:
+                results.append(task.result())
+        return results
+
+    def run_sync(self, coro, timeout=None, deadline=None):
+        """
+        Run a coroutine on the engine loop from blocking code and wait for it.
+        With a deadline, the wait is capped at its remaining time plus
+        RESULT_GRACE, as a safety net behind the coroutine's own handling.
+        """
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._loop_thread:
+            raise RuntimeError("run_sync() called from the engine's own event loop")
+        if deadline is not None:
+            cap = deadline.remaining() + RESULT_GRACE
+            timeout = cap if timeout is None else min(timeout, cap)
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    async def _blocking(self, func, *args, cleanup=None, executor=None):
+        """
+        Run a blocking call in one of the engine's thread pools (channel
+        starts by default). If the caller is cancelled meanwhile, cleanup()
+        receives the result once it arrives so that nothing (leased
+        connection, open channel) is leaked.
+        """
+        future = asyncio.get_running_loop().run_in_executor(executor or self._executor, func, *args)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if cleanup is not None:
+                def on_done(f):
+                    if not f.cancelled() and f.exception() is None:
+                        cleanup(f.result())
+                future.add_done_callback(on_done)
+            raise
+
+    async def _wait_all(self, tasks, deadline):
+        """
+        Wait for tasks until they are all done or the deadline expires or is
+        cancelled.
+
+        Returns:
+            set: the tasks still pending
+        """
+        pending = set(tasks)
+        if deadline is None:
+            if pending:
+                await asyncio.wait(pending)
+            return set()
+
+        loop = asyncio.get_running_loop()
+        cancelled = loop.create_future()
+        unregister = deadline.on_cancel(
+            lambda: loop.call_soon_threadsafe(lambda: cancelled.done() or cancelled.set_result(None)))
+        try:
+            while pending and not cancelled.done():
+                remaining = deadline.remaining()
+                if remaining <= 0:
+                    break
+                _, pending = await asyncio.wait(pending | {cancelled}, timeout=remaining,
+                                                return_when=asyncio.FIRST_COMPLETED)
+                pending.discard(cancelled)
+        finally:
+            unregister()
+            cancelled.cancel()
+        return pending
+
+    async def _within(self, aw, deadline):
+        """Await aw, cancelling it with DeadlineExceeded when the deadline runs out"""
+        task = asyncio.ensure_future(aw)
+        try:
+            if not await self._wait_all([task], deadline):
+                return task.result()
+        except BaseException:
+            task.cancel()
+            raise
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        deadline.check()
+        raise DeadlineExceeded(deadline.reason())
+
+    async def _open(self, hostname, command, username, password, key_path, get_pty, stdin_data,
+                    deadline=None):
+        """
+        Lease a connection and start the first command on it. A reused
+        transport that turns out to be dead fails here and is replaced once.
+
+        Returns:
+            tuple: (PooledConnection, channel)
+        """
+        for attempt in range(2):
+            conn = await self._blocking(self.pool.acquire, hostname, username, password, key_path,
+                                        _step_timeout(deadline), cleanup=self.pool.release,
+                                        executor=self._connect_executor)
+            try:
+                channel = await self._blocking(_start_channel, conn, command, get_pty, stdin_data,
+                                               _step_timeout(deadline), cleanup=paramiko.Channel.close)
+            except (paramiko.SSHException, EOFError, OSError):
+                self.pool.release(conn, discard=True)
+                if conn.reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                self.pool.release(conn, discard=True)
+                raise
+            return conn, channel
+
+    async def _run_many(self, hostname, commands, username, password, key_path, sudo, get_pty,
+                        deadline):
+        async with self.scheduler.slot_async(hostname, _label(commands), timeout=_step_timeout(deadline)):
+            return await self._run_many_now(hostname, commands, username, password, key_path,
+                                            sudo, get_pty, deadline)
+
+    async def _run_many_now(self, hostname, commands, username, password, key_path, sudo, get_pty,
+                            deadline):
+        stdin_data = password + '\n' if sudo and password else None
+        prefix = 'sudo ' if sudo else ''
+
+        conn, first = await self._within(
+            self._open(hostname, prefix + commands[0], username, password, key_path, get_pty,
+                       stdin_data, deadline),
+            deadline)
+
+        slots = asyncio.Semaphore(MAX_CHANNELS_PER_CONNECTION - 1)
+        # Output read so far, kept outside the tasks for partial results
+        buffers = {cmd: ([], []) for cmd in commands}
+
+        async def execute(cmd):
+            async with slots:
+                channel = await self._blocking(_start_channel, conn, prefix + cmd, get_pty, stdin_data,
+                                               _step_timeout(deadline), cleanup=paramiko.Channel.close)
+                return await self._read_channel(channel, *buffers[cmd])
+
+        tasks = [asyncio.ensure_future(self._read_channel(first, *buffers[commands[0]]))]
+        tasks += [asyncio.ensure_future(execute(cmd)) for cmd in commands[1:]]
+        try:
+            pending = await self._wait_all(tasks, deadline)
+            for task in tasks:
+                if task not in pending and task.exception() is not None:
+                    raise task.exception()
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.pool.release(conn, discard=True)
+            raise
+
+        if pending:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        # A switch that missed the deadline may be stuck: do not reuse its connection
+        self.pool.release(conn, discard=bool(pending))
+
+        results = {}
+        for cmd, task in zip(commands, tasks):
+            if task in pending:
+                out, err = (b''.join(b).decode(errors='replace') for b in buffers[cmd])
+                err = (err + '\n' if err else '') + f"Command interrupted: {deadline.reason()}"
+                results[cmd] = (out, err, None)
+            else:
+                results[cmd] = task.result()
+        return results
+
+    async def stream(self, hostname, cmd, username='kali', password=None, key_path=None,
+                     sudo=True, get_pty=None, encoding='utf-8', deadline=None):
+        """
+        Async generator yielding a command's output as decoded text chunks as
+        they arrive, without buffering the whole output. stderr is merged
+        into the stream (under a PTY it already is). A multi-byte character
+        split across two packets is decoded once complete. The deadline
+        bounds the start of the command; iter_sync() enforces it on reads.
+        """
+        stdin_data = password + '\n' if sudo and password else None
+        get_pty = sudo if get_pty is None else get_pty
+        ticket = await self.scheduler.acquire_async(hostname, _label([cmd]), timeout=_step_timeout(deadline))
+        try:
+            conn, channel = await self._within(
+                self._open(hostname, ('sudo ' if sudo else '') + cmd, username, password, key_path,
+                           get_pty, stdin_data, deadline),
+                deadline)
+        except BaseException:
+            self.scheduler.release(ticket)
+            raise
+        decoders = (codecs.getincrementaldecoder(encoding)(errors='replace'),
+                    codecs.getincrementaldecoder(encoding)(errors='replace'))
+        failed = False
+        try:
+            async for is_stderr, data in self._iter_channel(channel):
+                text = decoders[is_stderr].decode(data)
+                if text:
+                    yield text
+            for decoder in decoders:
+                tail = decoder.decode(b'', final=True)
+                if tail:
+                    yield tail
+        except Exception:
+            failed = True
+            raise
+        finally:
+            # Stopping early (aclose/cancel) only closes the channel
+            channel.close()
+            self.pool.release(conn, discard=failed)
+            self.scheduler.release(ticket)
+
+    def iter_sync(self, agen, timeout=None, deadline=None):
+        """
+        Consume an async generator from blocking code, one item per round-trip
+        to the engine loop (the channel is only read as fast as the caller
+        consumes). Closing the returned generator early closes the command;
+        so does the deadline expiring or being cancelled, which raises
+        DeadlineExceeded after the items already received.
+        """
+        try:
+            while True:
+                try:
+                    yield self.run_sync(self._within(agen.__anext__(), deadline), timeout, deadline)
+                except StopAsyncIteration:
+                    return
+        finally:
+            try:
+                self.run_sync(agen.aclose(), RESULT_GRACE)
+            except Exception as e:
+                logger.debug(f"Failed to close SSH stream: {e}")
+
+    async def _iter_channel(self, channel):
+        """Yield (is_stderr, bytes) from a channel until EOF without blocking the loop"""
+        loop = asyncio.get_running_loop()
+        readable = asyncio.Event()
+        fd = channel.fileno()
+        loop.add_reader(fd, readable.set)
+        try:
+            while True:
+                while channel.recv_ready():
+                    yield False, channel.recv(65536)
+                while channel.recv_stderr_ready():
+                    yield True, channel.recv_stderr(65536)
+                if channel.eof_received and not channel.recv_ready() and not channel.recv_stderr_ready():
+                    break
+                readable.clear()
+                await readable.wait()
+        finally:
+            loop.remove_reader(fd)
+
+    async def _read_channel(self, channel, out=None, err=None):
+        """
+        Collect a channel's stdout/stderr until EOF (into out/err if given)
+        and its exit status.
+
+        Returns:
+            tuple: (stdout, stderr, exit_status or None)
+        """
+        out = [] if out is None else out
+        err = [] if err is None else err
+        try:
+            async for is_stderr, data in self._iter_channel(channel):
+                (err if is_stderr else out).append(data)
+            if not channel.exit_status_ready():
+                await self._blocking(channel.status_event.wait, EXIT_STATUS_WAIT)
+            # paramiko reports -1 when the channel closed without a status
+            exit_status = channel.exit_status if channel.exit_status_ready() else -1
+        finally:
+            channel.close()
+        return (b''.join(out).decode(errors='replace'), b''.join(err).decode(errors='replace'),
+                None if exit_status == -1 else exit_status)
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever,
+                                                     name='ssh-async-loop', daemon=True)
+                self._loop_thread.start()
+            return self._loop
+
+
+# Global engine instance
+ssh_engine = AsyncSSHEngine()
@@ -0,0 +1,300 @@
+# services/ssh_pool.py
+
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import paramiko
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhausted(Exception):
+    """Raised when no connection to a host could be leased in time"""
+
+
+class PooledConnection:
+    """An authenticated SSHClient leased out by the pool"""
+
+    def __init__(self, key, client):
+        self.key = key
+        self.client = client
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+        self.in_use = False
+        self.reused = False
+
+    @property
+    def hostname(self):
+        return self.key[0]
+
+    @property
+    def transport(self):
+        return self.client.get_transport()
+
+    def is_alive(self):
+        transport = self.transport
+        return transport is not None and transport.is_active()
+
+    def check_health(self):
+        """Cheap liveness probe: transport still active and accepts an SSH_MSG_IGNORE"""
+        if not self.is_alive():
+            return False
+        try:
+            self.transport.send_ignore()
+        except Exception:
+            return False
+        self.last_checked = time.monotonic()
+        return True
+
+    def close(self):
+        try:
+            self.client.close()
+        except Exception:
+            pass
+
+
+class SSHConnectionPool:
+    def __init__(self, idle_timeout=300, max_per_host=4, health_check_interval=30,
+                 connect_timeout=10, acquire_timeout=30):
+        """
+        Pool of authenticated SSH transports.
+
+        Connections are keyed by (host, username, auth method) and leased
+        exclusively: a caller gets a connection, opens as many channels on it
+        as it needs and gives it back. Idle connections are closed after
+        ``idle_timeout`` seconds.
+
+        Args:
+            idle_timeout (int): Seconds an unused connection is kept open
+            max_per_host (int): Maximum open connections per host
+            health_check_interval (int): Seconds after which an idle connection
+                is probed before being handed out again
+            connect_timeout (int): TCP connect timeout for new connections
+            acquire_timeout (int): Seconds to wait for a free slot on a busy host
+        """
+        self.idle_timeout = idle_timeout
+        self.max_per_host = max_per_host
+        self.health_check_interval = health_check_interval
+        self.connect_timeout = connect_timeout
+        self.acquire_timeout = acquire_timeout
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._idle = {}        # key -> [PooledConnection] (most recently used last)
+        self._host_count = {}  # hostname -> open + connecting connections
+        self._reaper = None
+
+    @staticmethod
+    def make_key(hostname, username, password=None, key_path=None):
+        """
+        Build the pool key. Password-authenticated connections are keyed by a
+        digest of the password so that a request with a different password
+        never borrows a transport it could not have opened itself.
+        """
+        if password is None and key_path:
+            auth = ('key', key_path)
+        elif password is not None:
+            auth = ('password', hashlib.sha256(password.encode()).hexdigest())
+        else:
+            auth = ('default', None)
+        return (hostname, username, auth)
+
+    def acquire(self, hostname, username='kali', password=None, key_path=None, timeout=None):
+        """
+        Lease a connection, reusing an idle one when possible.
+
+        Returns:
+            PooledConnection: connection marked in use; give it back with release()
+        """
+        key = self.make_key(hostname, username, password, key_path)
+        wait = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + wait
+        self._ensure_reaper()
+
+        with self._available:
+            while True:
+                conn = self._take_idle(key)
+                if conn is not None:
+                    break
+                if self._host_count.get(hostname, 0) < self.max_per_host:
+                    self._host_count[hostname] = self._host_count.get(hostname, 0) + 1
+                    conn = None
+                    break
+                # Host is at capacity: try to free an idle slot held by another key
+                if self._evict_one_idle(hostname):
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhausted(
+                        f"No SSH connection available to {hostname} "
+                        f"(max {self.max_per_host} per host)"
+                    )
+                self._available.wait(remaining)
+
+        if conn is not None:
+            # Reuse path: probe connections that have been idle for a while
+            if time.monotonic() - conn.last_checked < self.health_check_interval or conn.check_health():
+                conn.reused = True
+                return conn
+            logger.debug(f"Pooled SSH connection to {hostname} failed health check, reconnecting")
+            conn.close()
+            # The slot stays reserved for the replacement connection below
+
+        try:
+            client = self._connect(hostname, username, password, key_path,
+                                   max(1, min(self.connect_timeout, deadline - time.monotonic())))
+        except Exception:
+            with self._available:
+                self._host_count[hostname] -= 1
+                self._available.notify_all()
+            raise
+
+        conn = PooledConnection(key, client)
+        conn.in_use = True
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return a leased connection, closing it if discarded or dead"""
+        with self._available:
+            conn.in_use = False
+            conn.last_used = time.monotonic()
+            if discard or not conn.is_alive():
+                conn.close()
+                self._host_count[conn.hostname] -= 1
+            else:
+                self._idle.setdefault(conn.key, []).append(conn)
+            self._available.notify_all()
+
+    @contextmanager
+    def connection(self, hostname, username='kali', password=None, key_path=None, timeout=None):
+        """Context manager around acquire()/release(); errors discard the connection"""
+        conn = self.acquire(hostname, username, password, key_path, timeout)
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def evict_idle(self):
+        """Close connections idle for longer than idle_timeout"""
+        now = time.monotonic()
+        expired = []
+        with self._available:
+            for key, conns in list(self._idle.items()):
+                keep = []
+                for conn in conns:
+                    if now - conn.last_used > self.idle_timeout or not conn.is_alive():
+                        expired.append(conn)
+                        self._host_count[conn.hostname] -= 1
+                    else:
+                        keep.append(conn)
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+            if expired:
+                self._available.notify_all()
+        for conn in expired:
+            conn.close()
+        return len(expired)
+
+    def close_host(self, hostname):
+        """Close every idle connection to a host"""
+        closed = []
+        with self._available:
+            for key in [k for k in self._idle if k[0] == hostname]:
+                closed.extend(self._idle.pop(key))
+            self._host_count[hostname] = self._host_count.get(hostname, 0) - len(closed)
+            self._available.notify_all()
+        for conn in closed:
+            conn.close()
+
+    def close_all(self):
+        with self._available:
+            conns = [c for conns in self._idle.values() for c in conns]
+            for conn in conns:
+                self._host_count[conn.hostname] -= 1
+            self._idle.clear()
+            self._available.notify_all()
+        for conn in conns:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'open_per_host': {h: n for h, n in self._host_count.items() if n},
+                'idle': sum(len(c) for c in self._idle.values()),
+            }
+
+    def _take_idle(self, key):
+        conns = self._idle.get(key)
+        while conns:
+            conn = conns.pop()
+            if not conns:
+                del self._idle[key]
+            if conn.is_alive():
+                conn.in_use = True
+                return conn
+            conn.close()
+            self._host_count[conn.hostname] -= 1
+            conns = self._idle.get(key)
+        return None
+
+    def _evict_one_idle(self, hostname):
+        for key, conns in self._idle.items():
+            if key[0] == hostname and conns:
+                conn = conns.pop(0)
+                if not conns:
+                    del self._idle[key]
+                self._host_count[hostname] -= 1
+                conn.close()
+                return True
+        return False
+
+    def _connect(self, hostname, username, password, key_path, timeout):
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            if password is None and key_path:
+                private_key = paramiko.RSAKey.from_private_key_file(key_path)
+                ssh.connect(hostname, username=username, pkey=private_key, timeout=timeout,
+                            banner_timeout=timeout, auth_timeout=timeout)
+            else:
+                ssh.connect(hostname, username=username, password=password, timeout=timeout,
+                            banner_timeout=timeout, auth_timeout=timeout)
+        except Exception:
+            ssh.close()
+            raise
+        transport = ssh.get_transport()
+        if transport is not None:
+            transport.set_keepalive(max(1, self.health_check_interval))
+        logger.debug(f"Opened pooled SSH connection to {username}@{hostname}")
+        return ssh
+
+    def _ensure_reaper(self):
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        with self._lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name='ssh-pool-reaper', daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        interval = max(1, self.idle_timeout / 2)
+        while True:
+            time.sleep(interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.debug(f"SSH pool eviction failed: {e}")
+
+
+# Global pool instance
+ssh_pool = SSHConnectionPool()
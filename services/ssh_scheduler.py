@@ -0,0 +1,240 @@
+# services/ssh_scheduler.py
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+# Concurrent SSH operations per switch and in total. Keep the per-host value
+# below sshd's MaxStartups (10 by default) and at most the pool's max_per_host.
+MAX_PER_HOST = int(os.environ.get('OVS_SSH_MAX_PER_HOST', 4))
+MAX_IN_FLIGHT = int(os.environ.get('OVS_SSH_MAX_IN_FLIGHT', 32))
+
+# Per-command samples kept for stats()
+RECENT_SAMPLES = 200
+
+
+class QueueTimeout(Exception):
+    """Raised when an operation waited longer than allowed for its turn"""
+
+
+class Ticket:
+    """One queued or running operation"""
+
+    __slots__ = ('hostname', 'label', 'enqueued_at', 'started_at', 'granted', '_notify')
+
+    def __init__(self, hostname, label, notify):
+        self.hostname = hostname
+        self.label = label
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        self.granted = False
+        self._notify = notify
+
+    @property
+    def queue_time(self):
+        return (self.started_at or time.monotonic()) - self.enqueued_at
+
+
+class _HostStats:
+    __slots__ = ('completed', 'queue_total', 'queue_max', 'exec_total', 'exec_max')
+
+    def __init__(self):
+        self.completed = 0
+        self.queue_total = 0.0
+        self.queue_max = 0.0
+        self.exec_total = 0.0
+        self.exec_max = 0.0
+
+    def to_dict(self):
+        completed = self.completed or 1
+        return {
+            'completed': self.completed,
+            'avg_queue_ms': round(self.queue_total / completed * 1000, 1),
+            'max_queue_ms': round(self.queue_max * 1000, 1),
+            'avg_exec_ms': round(self.exec_total / completed * 1000, 1),
+            'max_exec_ms': round(self.exec_max * 1000, 1),
+        }
+
+
+class SSHScheduler:
+    """
+    Admission control for SSH work.
+
+    Every operation (one pooled connection running a batch of commands, a
+    stream, a session command...) takes a slot before touching a switch.
+    At most ``max_per_host`` operations run against one host and
+    ``max_in_flight`` overall; the rest wait in per-host FIFO queues that are
+    served round-robin, so a burst on one switch cannot starve the others.
+    Both threads (acquire/slot) and coroutines (acquire_async/slot_async)
+    can wait for a slot.
+    """
+
+    def __init__(self, max_per_host=MAX_PER_HOST, max_in_flight=MAX_IN_FLIGHT, queue_timeout=120):
+        """
+        Args:
+            max_per_host (int): Concurrent operations per host
+            max_in_flight (int): Concurrent operations over all hosts
+            queue_timeout (float): Default seconds an operation may wait for a slot
+        """
+        self.max_per_host = max_per_host
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+
+        self._lock = threading.Lock()
+        self._queues = {}         # hostname -> deque of waiting Tickets
+        self._rotation = deque()  # hosts with waiting Tickets, next to serve first
+        self._running = {}        # hostname -> running operations
+        self._in_flight = 0
+        self._host_stats = {}
+        self._recent = deque(maxlen=RECENT_SAMPLES)
+
+    def acquire(self, hostname, label='', timeout=None):
+        """
+        Block until an operation on hostname may start.
+
+        Returns:
+            Ticket: give it back with release()
+        """
+        granted = threading.Event()
+        ticket = self._enqueue(hostname, label, granted.set)
+        wait = self.queue_timeout if timeout is None else timeout
+        if not granted.wait(wait):
+            self._abandon(ticket)
+            raise QueueTimeout(f"Timed out after {wait}s waiting for an SSH slot on {hostname}")
+        return ticket
+
+    async def acquire_async(self, hostname, label='', timeout=None):
+        """Coroutine version of acquire(); cancelling it gives up the place in the queue"""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        ticket = self._enqueue(hostname, label, notify)
+        wait = self.queue_timeout if timeout is None else timeout
+        try:
+            await asyncio.wait_for(granted, wait)
+        except asyncio.TimeoutError:
+            self._abandon(ticket)
+            raise QueueTimeout(f"Timed out after {wait}s waiting for an SSH slot on {hostname}")
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        return ticket
+
+    def release(self, ticket):
+        """End an operation started with acquire()/acquire_async()"""
+        finished_at = time.monotonic()
+        with self._lock:
+            self._running[ticket.hostname] -= 1
+            self._in_flight -= 1
+            self._record(ticket, finished_at)
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, hostname, label='', timeout=None):
+        ticket = self.acquire(hostname, label, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def slot_async(self, hostname, label='', timeout=None):
+        ticket = await self.acquire_async(hostname, label, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self):
+        """Queue depth, running operations and queue/exec times per host"""
+        with self._lock:
+            hosts = set(self._host_stats) | {h for h, q in self._queues.items() if q} | \
+                {h for h, n in self._running.items() if n}
+            per_host = {}
+            for hostname in sorted(hosts):
+                entry = self._host_stats.get(hostname, _HostStats()).to_dict()
+                entry['queued'] = len(self._queues.get(hostname, ()))
+                entry['running'] = self._running.get(hostname, 0)
+                per_host[hostname] = entry
+            return {
+                'max_per_host': self.max_per_host,
+                'max_in_flight': self.max_in_flight,
+                'in_flight': self._in_flight,
+                'queued': sum(len(q) for q in self._queues.values()),
+                'hosts': per_host,
+                'recent': list(self._recent),
+            }
+
+    def _enqueue(self, hostname, label, notify):
+        ticket = Ticket(hostname, label, notify)
+        with self._lock:
+            queue = self._queues.setdefault(hostname, deque())
+            if not queue:
+                self._rotation.append(hostname)
+            queue.append(ticket)
+            self._dispatch()
+        return ticket
+
+    def _abandon(self, ticket):
+        """Withdraw a ticket whose waiter gave up; release it if it was granted meanwhile"""
+        with self._lock:
+            if not ticket.granted:
+                queue = self._queues.get(ticket.hostname)
+                if queue and ticket in queue:
+                    queue.remove(ticket)
+                    if not queue:
+                        self._rotation.remove(ticket.hostname)
+                return
+        self.release(ticket)
+
+    def _dispatch(self):
+        """Grant slots round-robin over hosts with waiters (lock held)"""
+        blocked = 0
+        while self._rotation and self._in_flight < self.max_in_flight and blocked < len(self._rotation):
+            hostname = self._rotation.popleft()
+            queue = self._queues[hostname]
+            if self._running.get(hostname, 0) >= self.max_per_host:
+                # Host at capacity: keep its place for when a slot frees up
+                self._rotation.append(hostname)
+                blocked += 1
+                continue
+            blocked = 0
+            ticket = queue.popleft()
+            if queue:
+                self._rotation.append(hostname)
+            ticket.granted = True
+            ticket.started_at = time.monotonic()
+            self._running[hostname] = self._running.get(hostname, 0) + 1
+            self._in_flight += 1
+            ticket._notify()
+
+    def _record(self, ticket, finished_at):
+        queue_time = ticket.started_at - ticket.enqueued_at
+        exec_time = finished_at - ticket.started_at
+        stats = self._host_stats.setdefault(ticket.hostname, _HostStats())
+        stats.completed += 1
+        stats.queue_total += queue_time
+        stats.queue_max = max(stats.queue_max, queue_time)
+        stats.exec_total += exec_time
+        stats.exec_max = max(stats.exec_max, exec_time)
+        self._recent.append({
+            'host': ticket.hostname,
+            'command': ticket.label,
+            'queue_ms': round(queue_time * 1000, 1),
+            'exec_ms': round(exec_time * 1000, 1),
+        })
+        logger.debug(f"SSH {ticket.hostname} '{ticket.label}': "
+                     f"queued {queue_time * 1000:.0f} ms, ran {exec_time * 1000:.0f} ms")
+
+
+# Global scheduler instance
+ssh_scheduler = SSHScheduler()
@@ -0,0 +1,286 @@
+# services/ssh_session.py
+
+import logging
+import select
+import threading
+import time
+import uuid
+
+import paramiko
+
+from services.ssh_pool import ssh_pool
+from services.ssh_scheduler import ssh_scheduler
+
+logger = logging.getLogger(__name__)
+
+SUDO_PROMPT = '__OVS_SUDO_PROMPT__'
+
+
+class SessionError(Exception):
+    """Raised when the privileged shell cannot be opened or has died"""
+
+
+class SessionClosed(SessionError):
+    """The shell was found dead before the command was sent: nothing ran"""
+
+
+class PrivilegedSession:
+    """
+    A long-lived root shell on one switch.
+
+    The shell is started once with ``sudo sh`` over a pooled SSH connection
+    (no PTY, so stdout and stderr stay separate and the password is never
+    echoed). Each command is followed by a unique sentinel carrying its exit
+    code, which is how run() knows where one command's output ends.
+    """
+
+    def __init__(self, conn, password=None, timeout=30, ticket=None):
+        self.conn = conn
+        self.ticket = ticket
+        self.password = password
+        self.timeout = timeout
+        self.channel = None
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        self._out = b''
+        self._err = b''
+
+    @property
+    def hostname(self):
+        return self.conn.hostname
+
+    def is_alive(self):
+        return (self.channel is not None and not self.channel.closed
+                and not self.channel.exit_status_ready())
+
+    def open(self):
+        """Start the root shell, answering the sudo prompt at most once"""
+        ready = f"__OVS_READY_{uuid.uuid4().hex}__"
+        channel = self.conn.transport.open_session()
+        channel.exec_command(f"sudo -S -p '{SUDO_PROMPT}' sh -c 'echo {ready}; exec sh'")
+        self.channel = channel
+
+        password_sent = False
+        deadline = time.monotonic() + self.timeout
+        while ready.encode() not in self._out:
+            if SUDO_PROMPT.encode() in self._err:
+                if password_sent or not self.password:
+                    self.close()
+                    raise SessionError("sudo authentication failed")
+                self._err = self._err.replace(SUDO_PROMPT.encode(), b'', 1)
+                channel.sendall((self.password + '\n').encode())
+                password_sent = True
+            self._read_some(deadline)
+
+        # Drop the readiness marker and any sudo chatter ("Sorry, try again." etc.)
+        self._out = self._out.split(ready.encode() + b'\n', 1)[-1]
+        self._err = b''
+        logger.debug(f"Opened privileged shell session on {self.hostname}")
+
+    def run(self, cmd, timeout=None):
+        """
+        Run a command in the shell.
+
+        Returns:
+            tuple: (stdout, stderr, exit_code)
+        """
+        with self.lock:
+            marker = f"__OVS_END_{uuid.uuid4().hex}__"
+            # Group the command so that the stdin redirect covers all of it and
+            # nothing it runs can swallow the framing lines that follow
+            script = (
+                f"{{ {cmd}\n}} </dev/null\n"
+                f"printf '\\n{marker} %d\\n' $?\n"
+                f"printf '\\n{marker}\\n' >&2\n"
+            )
+            if not self.is_alive():
+                raise SessionClosed(f"Privileged shell on {self.hostname} is closed")
+            try:
+                self.channel.sendall(script.encode())
+            except (paramiko.SSHException, EOFError, OSError) as e:
+                raise SessionClosed(f"Privileged shell on {self.hostname} is closed: {e}")
+
+            out_marker = f"\n{marker} ".encode()
+            err_marker = f"\n{marker}\n".encode()
+            deadline = time.monotonic() + (timeout or self.timeout)
+            while True:
+                out_end = self._out.find(out_marker)
+                if out_end != -1:
+                    line_end = self._out.find(b'\n', out_end + len(out_marker))
+                    if line_end != -1 and err_marker in self._err:
+                        break
+                self._read_some(deadline)
+
+            output = self._out[:out_end]
+            exit_code = int(self._out[out_end + len(out_marker):line_end])
+            self._out = self._out[line_end + 1:]
+
+            err_end = self._err.find(err_marker)
+            error = self._err[:err_end]
+            self._err = self._err[err_end + len(err_marker):]
+
+            self.last_used = time.monotonic()
+            return (output.decode('utf-8', errors='replace'),
+                    error.decode('utf-8', errors='replace'),
+                    exit_code)
+
+    def close(self):
+        if self.channel is not None:
+            try:
+                self.channel.close()
+            except Exception:
+                pass
+
+    def _read_some(self, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise SessionError(f"Timed out waiting for shell on {self.hostname}")
+        readable, _, _ = select.select([self.channel], [], [], remaining)
+        if not readable:
+            return
+        got_data = False
+        while self.channel.recv_ready():
+            self._out += self.channel.recv(65536)
+            got_data = True
+        while self.channel.recv_stderr_ready():
+            self._err += self.channel.recv_stderr(65536)
+            got_data = True
+        if not got_data and (self.channel.closed or self.channel.eof_received):
+            raise SessionError(f"Privileged shell on {self.hostname} exited")
+
+
+class SessionManager:
+    def __init__(self, idle_timeout=300, command_timeout=60, scheduler=ssh_scheduler):
+        """
+        Keeps one PrivilegedSession per (host, username, auth method).
+
+        A session holds its pooled SSH connection for as long as it lives and
+        is closed after ``idle_timeout`` seconds without a command. It also
+        holds one of the host's scheduler slots (services/ssh_scheduler.py)
+        all that time, so that sessions and other SSH operations together
+        never want more connections than the pool allows per host. Commands
+        of a session run one at a time under that slot.
+        """
+        self.idle_timeout = idle_timeout
+        self.command_timeout = command_timeout
+        self.scheduler = scheduler
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._key_locks = {}
+        self._reaper = None
+
+    def run(self, cmd, hostname, username='kali', password=None, key_path=None, timeout=None):
+        """
+        Run a command as root through the host's shared session, opening it
+        on first use and transparently reopening it if it has died.
+
+        A reused session found dead when the command is sent is replaced
+        once. Once the command has been sent it is never run again: a
+        failure while waiting for its output (timeout, shell exiting) is
+        raised, since the command may have taken effect.
+
+        Args:
+            timeout (float): Seconds for the whole call, reopening included
+
+        Returns:
+            tuple: (stdout, stderr, exit_code)
+        """
+        key = ssh_pool.make_key(hostname, username, password, key_path)
+        self._ensure_reaper()
+        end = time.monotonic() + (timeout or self.command_timeout)
+
+        with self._key_lock(key):
+            for attempt in range(2):
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    raise SessionError(f"Timed out waiting for shell on {hostname}")
+                session = self._sessions.get(key)
+                reused = session is not None and session.is_alive()
+                if session is not None and not reused:
+                    self._drop(key, discard=True)
+                if not reused:
+                    session = self._open(key, hostname, username, password, key_path, remaining)
+                    remaining = end - time.monotonic()
+                try:
+                    return session.run(cmd, max(remaining, 0.001))
+                except SessionClosed:
+                    self._drop(key, discard=True)
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except (SessionError, paramiko.SSHException, EOFError, OSError):
+                    self._drop(key, discard=True)
+                    raise
+
+    def close_host(self, hostname):
+        for key in [k for k in list(self._sessions) if k[0] == hostname]:
+            with self._key_lock(key):
+                self._drop(key)
+
+    def close_all(self):
+        for key in list(self._sessions):
+            with self._key_lock(key):
+                self._drop(key)
+
+    def evict_idle(self):
+        now = time.monotonic()
+        for key, session in list(self._sessions.items()):
+            if now - session.last_used > self.idle_timeout and session.lock.acquire(blocking=False):
+                try:
+                    if self._sessions.get(key) is session:
+                        self._drop(key)
+                finally:
+                    session.lock.release()
+
+    def _open(self, key, hostname, username, password, key_path, timeout=None):
+        end = time.monotonic() + (timeout or self.command_timeout)
+        ticket = self.scheduler.acquire(hostname, 'privileged session', timeout)
+        try:
+            conn = ssh_pool.acquire(hostname, username=username, password=password, key_path=key_path,
+                                    timeout=max(end - time.monotonic(), 0.001))
+        except BaseException:
+            self.scheduler.release(ticket)
+            raise
+        session = PrivilegedSession(conn, password=password, timeout=max(end - time.monotonic(), 0.001),
+                                    ticket=ticket)
+        try:
+            session.open()
+        except Exception:
+            ssh_pool.release(conn, discard=True)
+            self.scheduler.release(ticket)
+            raise
+        self._sessions[key] = session
+        return session
+
+    def _drop(self, key, discard=False):
+        session = self._sessions.pop(key, None)
+        if session is None:
+            return
+        session.close()
+        ssh_pool.release(session.conn, discard=discard)
+        if session.ticket is not None:
+            self.scheduler.release(session.ticket)
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _ensure_reaper(self):
+        with self._lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name='ssh-session-reaper', daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        interval = max(1, self.idle_timeout / 2)
+        while True:
+            time.sleep(interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.debug(f"SSH session eviction failed: {e}")
+
+
+# Global session manager instance
+session_manager = SessionManager()
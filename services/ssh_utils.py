@@ -2,61 +2,195 @@
 
 import paramiko
 import os
+import re
+from services.deadline import Deadline, DeadlineExceeded
+from services.ssh_async import ssh_engine
+from services.ovs_cache import ovs_cache, is_ovs_mutation
+from services.transports import SSHTransport, select_transport
 
 key_path = os.path.expanduser("~/.ssh/id_rsa")
 
-def run_ovs_command(cmd, hostname=None, username='kali', password=None):
+# Route commands through one persistent root shell per switch instead of
+# "sudo <cmd>" per command (see services/ssh_session.py)
+SESSION_MODE = os.environ.get('OVS_SESSION_MODE', '').lower() in ('1', 'true', 'yes')
+
+def _auth_key_path(password):
+    """Private key to authenticate with, or None to use the password"""
+    if password is None and os.path.exists(key_path):
+        return key_path
+    return None
+
+def _run_sync(hostname, commands, username, password, sudo=True, deadline=None):
+    """Blocking wrapper around the asyncio engine (see services/ssh_async.py)"""
+    deadline = deadline or Deadline()
+    return ssh_engine.run_sync(ssh_engine.run_many(
+        hostname, commands, username=username, password=password,
+        key_path=_auth_key_path(password), sudo=sudo, deadline=deadline), deadline=deadline)
+
+def _transport_for(hostname, username, password, use_session=None):
+    """Transport for a target (see services/transports.py)"""
+    if use_session is None:
+        use_session = SESSION_MODE
+    return select_transport(hostname, username=username, password=password,
+                            key_path=_auth_key_path(password), use_session=use_session)
+
+def _execution_error(transport, e):
+    if transport.name == 'ssh':
+        return f"SSH connection error: {str(e)}"
+    return f"Execution error ({transport.name}): {str(e)}"
+
+def _split_ovs_error(output, error):
+    """Under a PTY, ovs-vsctl errors land in stdout: move them to stderr"""
+    # Check if the output contains error messages
+    if "ovs-vsctl:" in output and ("error" in output.lower() or "does not exist" in output.lower() or "no bridge named" in output.lower()):
+        # Move error messages from stdout to stderr
+        error = output if not error else error + "\n" + output
+        output = ""
+    return output, error
+
+def _is_cacheable(result):
+    """Only successful reads are cached"""
+    output, error = result
+    return not error
+
+def run_ovs_command(cmd, hostname=None, username='kali', password=None, use_session=None, use_cache=True,
+                    deadline=None):
     """
-    Connects via SSH and runs a command prefixed with sudo on the given host.
-    Uses private key authentication if available, otherwise password.
+    Runs a command with root privileges on the given host through the
+    transport selected for it (services/transports.py): sudo over a pooled
+    SSH connection, or a local subprocess when the controller runs on the
+    switch itself. Uses private key authentication if available, otherwise
+    password.
+    Read-only ovs-vsctl queries are served from services/ovs_cache.py;
+    any other OVS command invalidates the host's cached answers.
     Returns (stdout, stderr).
     
     Args:
         cmd (str): Command to execute
-        hostname (str): Target hostname/IP (if None, uses default)
+        hostname (str): Target hostname/IP (if None, this machine when it
+            runs Open vSwitch, the default switch otherwise)
         username (str): SSH username
         password (str): SSH password
+        use_session (bool): Run inside the switch's persistent root shell
+            (defaults to OVS_SESSION_MODE)
+        use_cache (bool): Allow a cached answer for read-only queries
+        deadline (Deadline): Request deadline (defaults to a fresh
+            OVS_REQUEST_BUDGET one); a command it cuts short returns its
+            partial output and the reason in stderr
     """
-    # Use provided hostname or fall back to default
-    if hostname is None:
-        hostname = '192.168.116.135'  # Default fallback
-    
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    transport = _transport_for(hostname, username, password, use_session)
+    target = transport.target
 
+    def execute():
+        try:
+            output, error = transport.run_many([cmd], deadline=deadline)[cmd]
+            
+            # Under a PTY (SSH + sudo), errors may land in stdout
+            output, error = _split_ovs_error(output, error)
+            
+            return output, error
+            
+        except Exception as e:
+            return "", _execution_error(transport, e)
+
+    if is_ovs_mutation(cmd):
+        # Drop cached reads before and after, so that none started meanwhile survives
+        ovs_cache.invalidate_host(target)
+        try:
+            return execute()
+        finally:
+            ovs_cache.invalidate_host(target)
+    if not use_cache:
+        return execute()
     try:
-        if os.path.exists(key_path) and password is None:
-            private_key = paramiko.RSAKey.from_private_key_file(key_path)
-            ssh.connect(hostname, username=username, pkey=private_key)
-        else:
-            ssh.connect(hostname, username=username, password=password)
+        return ovs_cache.get_or_load(target, cmd, execute, cacheable=_is_cacheable, auth=transport.auth_key,
+                                     deadline=deadline)
+    except DeadlineExceeded as e:
+        # Gave up waiting for the same read started by another request
+        return "", f"Command interrupted: {str(e)}"
+
+def run_ovs_commands(commands, hostname=None, username='kali', password=None, use_cache=True,
+                     deadline=None):
+    """
+    Runs several root commands on one host concurrently (over SSH, each on
+    its own channel of a single pooled connection, at most
+    MAX_CHANNELS_PER_CONNECTION at a time), so the total time is that of
+    the slowest command rather than the sum of all of them. Read-only
+    ovs-vsctl queries go through the query cache like in run_ovs_command().
+    Returns {cmd: (stdout, stderr)}.
 
-        full_cmd = f"sudo {cmd}"
-        stdin, stdout, stderr = ssh.exec_command(full_cmd, get_pty=True)
+    Args:
+        commands (list): Commands to execute (duplicates run once)
+        hostname (str): Target hostname/IP (if None, uses default)
+        username (str): SSH username
+        password (str): SSH password
+        use_cache (bool): Allow cached answers for read-only queries
+        deadline (Deadline): Request deadline; the commands still running
+            when it expires keep their partial output (see run_ovs_command())
+    """
+    transport = _transport_for(hostname, username, password, use_session=False)
+    target = transport.target
+    commands = list(dict.fromkeys(commands))
 
-        if password:
-            # Send sudo password if needed
-            stdin.write(password + '\n')
-            stdin.flush()
+    def execute(to_run):
+        try:
+            results = transport.run_many(to_run, deadline=deadline)
+            return {cmd: _split_ovs_error(out, err) for cmd, (out, err) in results.items()}
+        except Exception as e:
+            return {cmd: ("", _execution_error(transport, e)) for cmd in to_run}
 
-        output = stdout.read().decode()
-        error = stderr.read().decode()
-        
-        # Check if the output contains error messages
-        if "ovs-vsctl:" in output and ("error" in output.lower() or "does not exist" in output.lower() or "no bridge named" in output.lower()):
-            # Move error messages from stdout to stderr
-            error = output if not error else error + "\n" + output
-            output = ""
-        
-        ssh.close()
-        return output, error
-        
+    mutating = any(is_ovs_mutation(cmd) for cmd in commands)
+    if mutating:
+        ovs_cache.invalidate_host(target)
+    try:
+        if mutating or not use_cache:
+            return execute(commands)
+        return ovs_cache.get_or_load_many(target, commands, execute, cacheable=_is_cacheable,
+                                          auth=transport.auth_key, deadline=deadline)
+    except DeadlineExceeded as e:
+        return {cmd: ("", f"Command interrupted: {str(e)}") for cmd in commands}
+    finally:
+        if mutating:
+            ovs_cache.invalidate_host(target)
+
+def run_privileged_command(cmd, hostname, username='kali', password=None, deadline=None):
+    """
+    Runs a command in the persistent root shell of the host. sudo is paid for
+    once per session, and stdout/stderr come back without prompts or echo.
+    Returns (stdout, stderr, exit_code); exit_code is None on connection errors
+    and timeouts (a command cut by the deadline takes its shell down with it).
+    """
+    try:
+        transport = SSHTransport(hostname, username=username, password=password,
+                                 key_path=_auth_key_path(password), use_session=True)
+        return transport.run_privileged(cmd, deadline=deadline)
     except Exception as e:
-        try:
-            ssh.close()
-        except:
-            pass
-        return "", f"SSH connection error: {str(e)}"
+        return "", f"SSH session error: {str(e)}", None
+
+def _is_noise_line(line):
+    """True for lines clean_ovs_output() drops"""
+    stripped = line.strip()
+
+    # Skip common noise
+    if stripped == "kali" or stripped.startswith("[sudo]"):
+        return True
+
+    # Skip UUID lines
+    if len(stripped) == 36 and all(c in "0123456789abcdef-" for c in stripped.lower()):
+        return True
+
+    # Skip empty lines
+    if stripped == "":
+        return True
+
+    # Skip error messages that might appear in stdout
+    return any(error_marker in stripped.lower() for error_marker in [
+        "ovs-vsctl: no bridge named",
+        "ovs-vsctl: no port named", 
+        "ovs-vsctl: no interface named",
+        "does not exist",
+        "does not contain a column"
+    ])
 
 def clean_ovs_output(raw_output: str) -> str:
     """
@@ -69,59 +203,77 @@ def clean_ovs_output(raw_output: str) -> str:
     """
     if not raw_output:
         return ""
-        
-    lines = raw_output.splitlines()
-    cleaned_lines = []
-    
+
+    return "\n".join(iter_clean_ovs_output(raw_output.splitlines()))
+
+def iter_clean_ovs_output(lines):
+    """Streaming form of clean_ovs_output(): filters an iterable of lines lazily"""
     for line in lines:
-        stripped = line.strip()
-        
-        # Skip common noise
-        if stripped == "kali" or stripped.startswith("[sudo]"):
-            continue
-            
-        # Skip UUID lines
-        if len(stripped) == 36 and all(c in "0123456789abcdef-" for c in stripped.lower()):
-            continue
-            
-        # Skip empty lines
-        if stripped == "":
-            continue
-            
-        # Skip error messages that might appear in stdout
-        if any(error_marker in stripped.lower() for error_marker in [
-            "ovs-vsctl: no bridge named",
-            "ovs-vsctl: no port named", 
-            "ovs-vsctl: no interface named",
-            "does not exist",
-            "does not contain a column"
-        ]):
+        if not _is_noise_line(line):
+            yield line.rstrip("\r\n")
+
+_LINE_END = re.compile(r"\r\n|\r|\n")
+
+def iter_lines(chunks):
+    """
+    Split a stream of text chunks into lines (without line endings).
+    Only the new chunk is scanned each time; the start of an incomplete
+    line is kept aside until its end arrives.
+    """
+    pending = []
+    after_cr = False
+    for chunk in chunks:
+        if not chunk:
             continue
-            
-        cleaned_lines.append(line)
-    
-    return "\n".join(cleaned_lines)
+        # A "\r\n" split across chunks: its line was already yielded at the "\r"
+        if after_cr and chunk.startswith("\n"):
+            chunk = chunk[1:]
+        after_cr = False
+        start = 0
+        for match in _LINE_END.finditer(chunk):
+            pending.append(chunk[start:match.start()])
+            yield "".join(pending)
+            pending = []
+            start = match.end()
+        if start < len(chunk):
+            pending.append(chunk[start:])
+        elif chunk.endswith("\r"):
+            after_cr = True
+    if pending:
+        yield "".join(pending)
 
-def test_connection(hostname, username='kali', password=None):
+def stream_ovs_command(cmd, hostname=None, username='kali', password=None, lines=True, deadline=None,
+                       use_session=None):
+    """
+    Runs a command prefixed with sudo and yields its output while it is
+    produced instead of returning it at EOF, so memory stays flat on large
+    outputs (dump-flows, interface statistics). Connection errors are raised.
+
+    Args:
+        cmd (str): Command to execute
+        hostname (str): Target hostname/IP (if None, uses default)
+        username (str): SSH username
+        password (str): SSH password
+        lines (bool): Yield complete lines (True) or raw decoded chunks (False)
+        deadline (Deadline): Request deadline; DeadlineExceeded is raised
+            when it runs out, after the output received until then
+        use_session (bool): Run inside the switch's persistent root shell
+            (defaults to OVS_SESSION_MODE); the output then comes at once
+    """
+    transport = _transport_for(hostname, username, password, use_session)
+    chunks = transport.stream(cmd, deadline=deadline or Deadline())
+    return iter_lines(chunks) if lines else chunks
+
+def test_connection(hostname, username='kali', password=None, deadline=None):
     """
     Test SSH connection to a host
     Returns (success, message)
     """
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    
     try:
-        if os.path.exists(key_path) and password is None:
-            private_key = paramiko.RSAKey.from_private_key_file(key_path)
-            ssh.connect(hostname, username=username, pkey=private_key, timeout=10)
-        else:
-            ssh.connect(hostname, username=username, password=password, timeout=10)
-        
         # Test basic command
-        stdin, stdout, stderr = ssh.exec_command('echo "Connection test"')
-        output = stdout.read().decode().strip()
-        
-        ssh.close()
+        cmd = 'echo "Connection test"'
+        output, _, _ = _run_sync(hostname, [cmd], username, password, sudo=False, deadline=deadline)[cmd]
+        output = output.strip()
         
         if output == "Connection test":
             return True, "Connection successful"
@@ -0,0 +1,214 @@
+# services/tcp_sweep.py
+
+import asyncio
+import errno
+import itertools
+import logging
+import os
+import queue
+import threading
+
+from services.scan_scheduler import probe_budget
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds a single connection attempt may take (OVS_SCAN_TIMEOUT)
+PROBE_TIMEOUT = float(os.environ.get('OVS_SCAN_TIMEOUT', 2))
+
+# Connection attempts in flight at once, all hosts included (OVS_SCAN_CONCURRENCY).
+# Silent addresses hold their slot for a whole timeout, so a sweep takes
+# about hosts x ports / CONCURRENCY timeouts: with the defaults, a silent
+# /24 on 6 ports (1524 probes) takes about 6 timeouts, ~12 s. Raising it
+# (with ulimit -n) shortens that, down to one timeout at 1524.
+CONCURRENCY = int(os.environ.get('OVS_SCAN_CONCURRENCY', 256))
+
+# Longest line read as a banner (SSH identification strings are at most 255 bytes)
+BANNER_LIMIT = 1024
+
+# Descriptors kept free for the rest of the application (SSH, files, sockets)
+RESERVED_FDS = 128
+
+# The host answered but no route/host behind the address: not worth waiting for
+_UNREACHABLE = {errno.EHOSTUNREACH, errno.ENETUNREACH, errno.EHOSTDOWN}
+
+_DONE = object()
+
+
+def _fd_budget(wanted):
+    """
+    Concurrency that fits in the current open-file limit. The limit itself
+    is left alone: it is the operator's to raise (ulimit -n) along with
+    OVS_SCAN_CONCURRENCY.
+    """
+    if resource is None:
+        return wanted
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY or soft >= wanted + RESERVED_FDS:
+        return wanted
+    budget = max(1, soft - RESERVED_FDS)
+    logger.warning(f"Open-file limit {soft} too low for {wanted} concurrent probes, using {budget}")
+    return budget
+
+
+class TCPSweeper:
+    def __init__(self, concurrency=CONCURRENCY, timeout=PROBE_TIMEOUT, budget=probe_budget):
+        """
+        Host discovery and port check over TCP connect() for a whole range
+        at once, in a single asyncio event loop.
+
+        A host is alive when one of the probed ports accepts the connection
+        or refuses it (RST); addresses where every probe times out or is
+        unreachable are considered down. All probes of all hosts run
+        concurrently, bounded by concurrency: a range costs about one
+        timeout per concurrency probes (hosts x ports). Every connection
+        attempt also takes a token from the process-wide probe budget, which
+        caps the rate of all scans together.
+
+        On banner ports (SSH, NETCONF), the server speaks first: the line it
+        sends is read on the probe's own connection, so identifying the host
+        later needs no second connect.
+
+        Args:
+            concurrency (int): Connection attempts in flight at most
+            timeout (float): Seconds per connection attempt
+            budget (TokenBucket): Probe rate limit
+        """
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.budget = budget
+
+    async def probe(self, ip, port, semaphore, timeout=None, read_banner=False):
+        """
+        Returns:
+            tuple: (state, banner). state is 'open', 'closed' (refused: the
+                   host is up), 'filtered' (no answer) or 'unreachable';
+                   banner the first line the server sent when read_banner
+                   is set, else None
+        """
+        timeout = timeout or self.timeout
+        async with semaphore:
+            await self.budget.acquire_async()
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+            except asyncio.TimeoutError:
+                return 'filtered', None
+            except ConnectionRefusedError:
+                return 'closed', None
+            except OSError as e:
+                return ('unreachable' if e.errno in _UNREACHABLE else 'filtered'), None
+            banner = None
+            if read_banner:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), timeout)
+                    banner = line[:BANNER_LIMIT].decode('utf-8', errors='ignore').strip() or None
+                except (asyncio.TimeoutError, OSError, ValueError):
+                    pass
+            # Reset rather than close: nothing to say, no TIME_WAIT left behind
+            writer.transport.abort()
+            return 'open', banner
+
+    async def probe_host(self, ip, ports, semaphore, timeout=None, banner_ports=()):
+        """
+        Returns:
+            tuple: (alive, open ports in the order of ports,
+                    {port: banner or None} of the open banner ports)
+        """
+        results = await asyncio.gather(*(self.probe(ip, port, semaphore, timeout, port in banner_ports)
+                                         for port in ports))
+        open_ports = [port for port, (state, _) in zip(ports, results) if state == 'open']
+        banners = {port: banner for port, (state, banner) in zip(ports, results)
+                   if state == 'open' and port in banner_ports}
+        alive = any(state in ('open', 'closed') for state, _ in results)
+        return alive, open_ports, banners
+
+    async def sweep_async(self, ips, ports, on_result, timeout=None, banner_ports=()):
+        """
+        Probe every host, calling on_result((ip, alive, open_ports, banners))
+        as each one completes.
+
+        ips may be a lazy iterable of any size: addresses are pulled from it
+        in chunks, only as many hosts as keep every probe slot busy are in
+        flight, and nothing is kept once a host is reported.
+        """
+        # Checked per sweep, against the limit in force now
+        concurrency = _fd_budget(self.concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        # Twice what the probe slots can hold, so that slots freed by fast
+        # answers are refilled at once
+        window = max(1, 2 * concurrency // max(1, len(ports)))
+        addresses = iter(ips)
+        pending = set()
+
+        async def sweep_host(ip):
+            on_result((ip, *await self.probe_host(ip, ports, semaphore, timeout, banner_ports)))
+
+        try:
+            while True:
+                for ip in itertools.islice(addresses, window - len(pending)):
+                    pending.add(asyncio.ensure_future(sweep_host(str(ip))))
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def iter_sweep(self, ips, ports, timeout=None, banner_ports=()):
+        """
+        Sweep from synchronous code. The event loop runs in a helper thread;
+        results are yielded as hosts complete, in completion order. Closing
+        the generator early (or an exception in the caller) cancels the
+        probes still in flight.
+
+        Yields:
+            tuple: (ip, alive, open_ports, {port: banner} for banner_ports)
+        """
+        results = queue.Queue()
+        loop = asyncio.new_event_loop()
+        main = loop.create_task(self.sweep_async(ips, ports, results.put, timeout, banner_ports))
+
+        def run():
+            try:
+                loop.run_until_complete(main)
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                results.put(e)
+            finally:
+                loop.close()
+                results.put(_DONE)
+
+        thread = threading.Thread(target=run, name='tcp-sweep', daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            if thread.is_alive():
+                try:
+                    loop.call_soon_threadsafe(main.cancel)
+                except RuntimeError:
+                    pass  # Loop already closed
+            thread.join()
+
+    def scan_ports(self, ip, ports, timeout=None):
+        """Open ports of one host, all probed at once"""
+        for _, _, open_ports, _ in self.iter_sweep([ip], ports, timeout):
+            return open_ports
+        return []
+
+
+# Global sweeper instance
+tcp_sweeper = TCPSweeper()
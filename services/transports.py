@@ -0,0 +1,366 @@
+# services/transports.py
+
+import abc
+import codecs
+import logging
+import os
+import select
+import shutil
+import signal
+import socket
+import subprocess
+import threading
+
+from services.deadline import Deadline, DeadlineExceeded
+from services.ssh_async import ssh_engine
+from services.ssh_pool import SSHConnectionPool
+from services.ssh_session import SessionError, session_manager
+
+logger = logging.getLogger(__name__)
+
+# How commands reach a target: 'auto' runs them locally when the target is
+# this machine and Open vSwitch is installed here, over SSH otherwise;
+# 'ssh' and 'local' force one transport for every target (OVS_TRANSPORT)
+TRANSPORT_MODE = os.environ.get('OVS_TRANSPORT', 'auto').lower()
+
+# Switch used when no target is given and OVS is not local (OVS_DEFAULT_HOST)
+DEFAULT_HOST = os.environ.get('OVS_DEFAULT_HOST', '192.168.116.135')
+
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+
+
+def _with_exit_status(out, err, exit_code):
+    """(stdout, stderr) of a finished command; a failing one always has stderr"""
+    # A command failing silently (or on stdout, under a PTY) must not read as a success
+    if exit_code and not err.strip():
+        err = f"Command exited with status {exit_code}"
+    return out, err
+
+
+class Transport(abc.ABC):
+    """
+    How commands are executed on one target.
+
+    Implementations run commands with root privileges and return text the
+    same way whatever the channel: run_many() gives {cmd: (stdout, stderr)},
+    stderr never empty for a command that exited with a non-zero status,
+    and stream() yields decoded output chunks. Both honour a Deadline:
+    commands still running when it runs out are stopped, run_many() keeps
+    their partial output, stream() raises DeadlineExceeded.
+    """
+
+    name = 'base'
+
+    def __init__(self, target):
+        self.target = target
+
+    @property
+    def auth_key(self):
+        """Credentials commands run with; cached answers are scoped to them"""
+        return None
+
+    @abc.abstractmethod
+    def run_many(self, commands, deadline=None):
+        """{cmd: (stdout, stderr)} of commands run concurrently"""
+
+    @abc.abstractmethod
+    def stream(self, cmd, deadline=None):
+        """Iterator of cmd's decoded output chunks, stderr merged"""
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.target!r})"
+
+
+class SSHTransport(Transport):
+    """sudo over pooled SSH connections (services/ssh_async.py), or the
+    persistent root shell of services/ssh_session.py in session mode"""
+
+    name = 'ssh'
+
+    def __init__(self, hostname, username='kali', password=None, key_path=None, use_session=False):
+        super().__init__(hostname)
+        self.username = username
+        self.password = password
+        self.key_path = key_path
+        self.use_session = use_session
+
+    @property
+    def auth_key(self):
+        # Same scope as the connection pool: user and auth method (password digest)
+        return SSHConnectionPool.make_key(self.target, self.username, self.password, self.key_path)[1:]
+
+    def run_many(self, commands, deadline=None):
+        deadline = deadline or Deadline()
+        if self.use_session:
+            return {cmd: _with_exit_status(*self.run_privileged(cmd, deadline)) for cmd in commands}
+        results = ssh_engine.run_sync(ssh_engine.run_many(
+            self.target, commands, username=self.username, password=self.password,
+            key_path=self.key_path, deadline=deadline), deadline=deadline)
+        return {cmd: _with_exit_status(*result) for cmd, result in results.items()}
+
+    def run_privileged(self, cmd, deadline=None):
+        """Run in the host's persistent root shell; returns (stdout, stderr, exit_code)"""
+        deadline = deadline or Deadline()
+        # The session holds a scheduler slot of its own while it lives
+        return session_manager.run(cmd, self.target, username=self.username, password=self.password,
+                                   key_path=self.key_path, timeout=deadline.timeout())
+
+    def stream(self, cmd, deadline=None):
+        deadline = deadline or Deadline()
+        if self.use_session:
+            return self._stream_session(cmd, deadline)
+        return ssh_engine.iter_sync(ssh_engine.stream(
+            self.target, cmd, username=self.username, password=self.password,
+            key_path=self.key_path, deadline=deadline), deadline=deadline)
+
+    def _stream_session(self, cmd, deadline):
+        # The shell frames whole commands: its output comes in one piece,
+        # stderr after stdout as a PTY would have merged it
+        try:
+            out, err, _ = self.run_privileged(cmd, deadline)
+        except SessionError:
+            if deadline.expired:
+                raise DeadlineExceeded(deadline.reason())
+            raise
+        if out:
+            yield out
+        if err:
+            yield err
+
+
+def _kill(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        proc.kill()
+
+
+class LocalTransport(Transport):
+    """
+    Commands run on this machine with subprocess: no SSH handshake, no PTY.
+    Privileges come from running as root or from passwordless sudo; the
+    password is only fed to 'sudo -S' when neither is available.
+    """
+
+    name = 'local'
+
+    _sudo_lock = threading.Lock()
+    _sudo_mode = None   # 'root', 'nopasswd' or 'password', probed once
+
+    def __init__(self, password=None):
+        super().__init__('localhost')
+        self.password = password
+
+    @property
+    def auth_key(self):
+        # The password only matters when it is fed to sudo
+        if self.sudo_mode() != 'password':
+            return None
+        return SSHConnectionPool.make_key(self.target, None, self.password or '')[2]
+
+    def run_many(self, commands, deadline=None):
+        deadline = deadline or Deadline()
+        procs = {cmd: self._spawn(cmd) for cmd in commands}
+        killed = set()
+
+        def kill_all():
+            for cmd, proc in procs.items():
+                if proc.poll() is None:
+                    killed.add(cmd)
+                    _kill(proc)
+
+        unregister = deadline.on_cancel(kill_all)
+        results = {}
+        try:
+            # All commands already run in parallel; collect them one by one
+            for cmd, proc in procs.items():
+                try:
+                    out, err = proc.communicate(timeout=deadline.remaining())
+                except subprocess.TimeoutExpired:
+                    killed.add(cmd)
+                    _kill(proc)
+                    out, err = proc.communicate()
+                out = out.decode(errors='replace')
+                err = err.decode(errors='replace')
+                if cmd in killed:
+                    err = (err + '\n' if err else '') + f"Command interrupted: {deadline.reason()}"
+                results[cmd] = _with_exit_status(out, err, None if cmd in killed else proc.returncode)
+        finally:
+            unregister()
+            kill_all()
+        return results
+
+    def stream(self, cmd, deadline=None):
+        deadline = deadline or Deadline()
+        proc = self._spawn(cmd, merge_stderr=True)
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        fd = proc.stdout.fileno()
+        # Killing the process ends the read loop below with EOF
+        unregister = deadline.on_cancel(lambda: _kill(proc))
+        try:
+            while True:
+                readable, _, _ = select.select([fd], [], [], deadline.timeout())
+                if not readable:
+                    deadline.check()
+                    continue
+                data = os.read(fd, 65536)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    yield text
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+            if deadline.cancelled:
+                raise DeadlineExceeded(deadline.reason())
+        finally:
+            unregister()
+            if proc.poll() is None:
+                _kill(proc)
+            proc.stdout.close()
+            proc.wait()
+
+    def _spawn(self, cmd, merge_stderr=False):
+        mode = self.sudo_mode()
+        argv = ['sh', '-c', cmd]
+        if mode == 'nopasswd':
+            argv = ['sudo', '-n'] + argv
+        elif mode == 'password':
+            argv = ['sudo', '-S', '-p', ''] + argv
+
+        # Own process group, so that stopping the command also stops its children
+        proc = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+                                start_new_session=True)
+        if mode == 'password' and self.password:
+            try:
+                proc.stdin.write((self.password + '\n').encode())
+            except BrokenPipeError:
+                pass
+        proc.stdin.close()
+        # Nothing more to send: keep communicate() away from the closed pipe
+        proc.stdin = None
+        return proc
+
+    @classmethod
+    def sudo_mode(cls):
+        with cls._sudo_lock:
+            if cls._sudo_mode is None:
+                if os.geteuid() == 0:
+                    cls._sudo_mode = 'root'
+                else:
+                    try:
+                        probe = subprocess.run(['sudo', '-n', 'true'], stdin=subprocess.DEVNULL,
+                                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                               timeout=5)
+                        cls._sudo_mode = 'nopasswd' if probe.returncode == 0 else 'password'
+                    except (OSError, subprocess.TimeoutExpired):
+                        cls._sudo_mode = 'password'
+                logger.debug(f"Local transport privilege mode: {cls._sudo_mode}")
+            return cls._sudo_mode
+
+
+class FakeTransport(Transport):
+    """
+    In-process transport for tests: answers from a table instead of a switch.
+
+    Responses map a command to its stdout, to an (stdout, stderr) or
+    (stdout, stderr, exit_status) tuple or to a callable(cmd) returning one
+    of those. Every command run is recorded in
+    ``calls``.
+    """
+
+    name = 'fake'
+
+    def __init__(self, responses=None, target='fake'):
+        super().__init__(target)
+        self.responses = dict(responses or {})
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def run_many(self, commands, deadline=None):
+        return {cmd: self._respond(cmd, deadline) for cmd in commands}
+
+    def stream(self, cmd, deadline=None):
+        out, err = self._respond(cmd, deadline)
+        text = out + err
+        for start in range(0, len(text), 4096):
+            yield text[start:start + 4096]
+
+    def _respond(self, cmd, deadline):
+        """(stdout, stderr) of cmd"""
+        if deadline is not None:
+            deadline.check()
+        with self._lock:
+            self.calls.append(cmd)
+        response = self.responses.get(cmd)
+        if response is None:
+            return "", f"fake transport: no response for '{cmd}'"
+        if callable(response):
+            response = response(cmd)
+        if isinstance(response, str):
+            return response, ""
+        return _with_exit_status(*response) if len(response) == 3 else tuple(response)
+
+
+# Transports registered for specific targets (tests, special deployments)
+_registered = {}
+_registered_lock = threading.Lock()
+
+
+def register_transport(target, transport):
+    """Route every command for target (None for the default target) through transport"""
+    with _registered_lock:
+        _registered[target] = transport
+
+
+def unregister_transport(target):
+    with _registered_lock:
+        _registered.pop(target, None)
+
+
+def ovs_installed_locally():
+    return shutil.which('ovs-vsctl') is not None
+
+
+_local_names = None
+_local_names_lock = threading.Lock()
+
+
+def _own_names():
+    """This machine's names, looked up once (getfqdn() may wait on DNS)"""
+    global _local_names
+    with _local_names_lock:
+        if _local_names is None:
+            _local_names = {socket.gethostname(), socket.getfqdn()}
+        return _local_names
+
+
+def is_local_target(hostname):
+    """True if hostname designates the machine the controller runs on"""
+    if hostname is None:
+        return True
+    return hostname in LOCAL_HOSTS or hostname in _own_names()
+
+
+def select_transport(hostname, username='kali', password=None, key_path=None, use_session=False):
+    """
+    Transport to reach a target.
+
+    Args:
+        hostname (str): Target hostname/IP, or None for the default target
+            (this machine if it runs Open vSwitch, DEFAULT_HOST otherwise)
+    """
+    with _registered_lock:
+        if hostname in _registered:
+            return _registered[hostname]
+
+    if TRANSPORT_MODE == 'local' or (
+            TRANSPORT_MODE == 'auto' and ovs_installed_locally() and is_local_target(hostname)):
+        return LocalTransport(password=password)
+
+    if hostname is None:
+        hostname = DEFAULT_HOST  # Default fallback
+    return SSHTransport(hostname, username=username, password=password, key_path=key_path,
+                        use_session=use_session)
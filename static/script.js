@@ -7,6 +7,7 @@ document.addEventListener('DOMContentLoaded', () => {
   const quickScanBtn = document.getElementById('btn-quick-scan');
   const scanNetworkBtn = document.getElementById('btn-scan-network');
   const clearResultsBtn = document.getElementById('btn-clear-results');
+  const verifyCandidatesBtn = document.getElementById('btn-verify-candidates');
   const testConnectionBtn = document.getElementById('btn-test-connection');
   const listBridgesBtn = document.getElementById('btn-list-bridges');
   const loadConfigBtn = document.getElementById('btn-load-config');
@@ -69,6 +70,136 @@ document.addEventListener('DOMContentLoaded', () => {
     }
   }
 
+  // Console line for progress pushed by the server: already known there, not logged back
+  function consoleLine(message) {
+    if (!consoleOutput) return;
+    consoleOutput.value += `\n  ${message}`;
+    consoleOutput.scrollTop = consoleOutput.scrollHeight;
+  }
+
+  // Live progress (/api/events): one stream per operation started here,
+  // with its handlers by topic
+  const liveOperations = new Map();
+  const jobWaiters = new Map();
+  // Hosts currently shown in the results table
+  let shownHosts = [];
+
+  function newOperationId() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `op-${Date.now()}-${Math.random().toString(16).slice(2)}`;
+  }
+
+  function trackOperation(handlers) {
+    const operationId = newOperationId();
+    liveOperations.set(operationId, { handlers, stream: null, lastEventId: null });
+    connectEvents(operationId);
+    return operationId;
+  }
+
+  function untrackOperation(operationId) {
+    const operation = liveOperations.get(operationId);
+    if (operation && operation.stream) operation.stream.close();
+    liveOperations.delete(operationId);
+  }
+
+  function handleServerEvent(operation, topic, message) {
+    operation.lastEventId = message.lastEventId || operation.lastEventId;
+    const event = JSON.parse(message.data);
+    if (topic === 'job') {
+      const waiter = jobWaiters.get(event.data.id);
+      if (waiter) waiter(event.data);
+      return;
+    }
+    if (operation.handlers[topic]) operation.handlers[topic](event.data);
+  }
+
+  // The server replays the events of the operation published before the
+  // stream opened, so the request can be sent right away
+  function connectEvents(operationId) {
+    const operation = liveOperations.get(operationId);
+    if (!window.EventSource || !operation) return;
+    const resume = operation.lastEventId ? `&last_event_id=${encodeURIComponent(operation.lastEventId)}` : '';
+    const stream = new EventSource(`/api/events?operation=${encodeURIComponent(operationId)}${resume}`);
+    operation.stream = stream;
+    ['scan.host', 'apply.result', 'backup.port', 'verify.result', 'job'].forEach(topic => {
+      stream.addEventListener(topic, message => handleServerEvent(operation, topic, message));
+    });
+    // Too slow to keep up: the server dropped us, resume from the last event received
+    stream.addEventListener('dropped', () => {
+      stream.close();
+      setTimeout(() => connectEvents(operationId), 1000);
+    });
+  }
+
+  function eventsLive() {
+    return [...liveOperations.values()].some(op => op.stream && op.stream.readyState === EventSource.OPEN);
+  }
+
+  // Wait for a background job (/api/jobs) to finish; resolves with its result.
+  // Job events on /api/events drive it; polling is the fallback.
+  function waitForJob(jobId, onProgress) {
+    return new Promise((resolve, reject) => {
+      let timer = null;
+      const finish = job => {
+        clearTimeout(timer);
+        jobWaiters.delete(jobId);
+        if (job.result) {
+          resolve(job.result);
+        } else {
+          resolve({ success: false, error: job.error || `Tâche ${job.status}` });
+        }
+      };
+      const poll = () => {
+        fetch(`/api/jobs/${jobId}`)
+          .then(res => res.json())
+          .then(data => {
+            if (!data.success) throw new Error(data.error);
+            const job = data.job;
+            if (onProgress) onProgress(job);
+            if (job.status === 'queued' || job.status === 'running') {
+              timer = setTimeout(poll, eventsLive() ? 5000 : 1000);
+            } else {
+              finish(job);
+            }
+          })
+          .catch(err => {
+            jobWaiters.delete(jobId);
+            reject(err);
+          });
+      };
+      jobWaiters.set(jobId, job => {
+        if (onProgress) onProgress(job);
+        // Finished: fetch the result now rather than at the next poll
+        if (job.status !== 'queued' && job.status !== 'running') {
+          clearTimeout(timer);
+          poll();
+        }
+      });
+      poll();
+    });
+  }
+
+  // Show job progress in the status bar, and each new step in the console
+  function jobProgressReporter(label) {
+    let lastMessage = null;
+    return job => {
+      const { done, total, message } = job.progress;
+      if (statusAction) {
+        const counter = total ? ` (${done}/${total})` : '';
+        statusAction.textContent = `Dernière action : ${label} - ${message || job.status}${counter}`;
+      }
+      if (message && message !== lastMessage) {
+        lastMessage = message;
+        consoleLine(`… ${message}`);
+      }
+    };
+  }
+
+  // Response of an endpoint called with async: true -> final result of its job
+  function jobResult(data, label) {
+    return data.job_id ? waitForJob(data.job_id, jobProgressReporter(label)) : data;
+  }
+
   // Load backup files into dropdown
   function loadBackupFiles() {
     if(!backupSelect) return;
@@ -93,6 +224,35 @@ document.addEventListener('DOMContentLoaded', () => {
       });
   }
 
+  // Devices known from previous scans, shown until a new scan is run
+  function loadInventory() {
+    fetch('/api/inventory')
+      .then(res => {
+        if (!res.ok) throw new Error(`HTTP error! Status: ${res.status}`);
+        return res.json();
+      })
+      .then(data => {
+        if (!data.success || data.hosts.length === 0) return;
+        displayScanResults(data.hosts);
+        logToConsole(`📋 Inventaire chargé : ${data.total_found} équipements connus`);
+      })
+      .catch(err => console.error('Erreur chargement inventaire:', err));
+  }
+
+  // What changed since the previous scan of the range
+  function logScanDelta(delta) {
+    if (!delta) return;
+    const parts = [];
+    if (delta.new.length) parts.push(`nouveaux : ${delta.new.join(', ')}`);
+    if (delta.changed.length) parts.push(`modifiés : ${delta.changed.join(', ')}`);
+    if (delta.gone.length) parts.push(`disparus : ${delta.gone.join(', ')}`);
+    logToConsole(parts.length ? `🔄 Changements depuis le dernier scan — ${parts.join(' | ')}`
+                              : '🔄 Aucun changement depuis le dernier scan');
+    if (delta.reused) {
+      logToConsole(`♻️ ${delta.reused} hôtes inchangés repris de l'inventaire sans nouvelle identification`);
+    }
+  }
+
   // Helper function to display scan results in the hosts table
   function displayScanResults(hosts) {
     const tbody = document.getElementById('hosts-table-body');
@@ -101,6 +261,7 @@ document.addEventListener('DOMContentLoaded', () => {
     
     if (!tbody || !scanResultsDiv) return;
 
+    shownHosts = hosts;
     tbody.innerHTML = '';
 
     if (hosts.length === 0) {
@@ -122,11 +283,21 @@ document.addEventListener('DOMContentLoaded', () => {
           <td>${host.ip}</td>
           <td>${host.hostname || host.ip}</td>
           <td>${portTags}</td>
-          <td>${host.device_type || 'Inconnu'}</td>
+          <td class="device-type"></td>
           <td>
             <button class="select-switch-btn" data-ip="${host.ip}">Sélectionner</button>
           </td>
         `;
+
+        // Banners and SNMP descriptions come from the hosts themselves: text only
+        const typeCell = tr.querySelector('.device-type');
+        typeCell.textContent = host.device_type || 'Inconnu';
+        if (host.confidence != null) {
+          typeCell.textContent += ` (${Math.round(host.confidence * 100)} %)`;
+        }
+        if (host.evidence && host.evidence.length) {
+          typeCell.title = host.evidence.join('\n');
+        }
         tbody.appendChild(tr);
       });
     }
@@ -182,6 +353,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
   // Initialize
   loadBackupFiles();
+  loadInventory();
 
   // Add download logs button functionality if it exists
   const downloadLogsBtn = document.getElementById('btn-download-logs');
@@ -215,6 +387,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
         logToConsole(`✅ Scan rapide terminé. Réseau scanné: ${data.network_scanned}`);
         logToConsole(`📊 Hôtes détectés: ${data.total_found} | Candidats switches: ${data.switch_candidates}`);
+        if (data.shared_with) {
+          logToConsole(`🔗 Résultats partagés avec le scan déjà en cours de ${data.shared_with}`);
+        }
+        logScanDelta(data.delta);
         updateStatus('Connecté', 'Scan terminé');
 
         displayScanResults(data.hosts || []);
@@ -238,15 +414,38 @@ document.addEventListener('DOMContentLoaded', () => {
       logToConsole(`🔍 Scan réseau lancé sur ${networkRange}...`);
       updateStatus('En cours', 'Scan réseau');
 
+      // Hosts are shown as soon as the server has analysed them, redrawn at most once per frame
+      const liveHosts = [];
+      let redrawPending = false;
+      const operationId = trackOperation({
+        'scan.host': host => {
+          liveHosts.push(host);
+          if (redrawPending) return;
+          redrawPending = true;
+          requestAnimationFrame(() => {
+            redrawPending = false;
+            liveHosts.sort((a, b) => a.ip.localeCompare(b.ip, undefined, { numeric: true }));
+            displayScanResults(liveHosts);
+          });
+        }
+      });
+
+      const exclude = document.getElementById('scan-exclude')?.value.trim();
+      const requestBody = { network_range: networkRange, async: true, operation_id: operationId };
+      if (exclude) {
+        requestBody.exclude = exclude;
+      }
+
       fetch('/api/scan_network', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ network_range: networkRange })
+        body: JSON.stringify(requestBody)
       })
       .then(res => {
         if (!res.ok) throw new Error(`HTTP error! Status: ${res.status}`);
         return res.json();
       })
+      .then(data => jobResult(data, 'Scan réseau'))
       .then(data => {
         if (!data.success) {
           logToConsole(`❌ Erreur lors du scan : ${data.error}`, false);
@@ -256,6 +455,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
         logToConsole(`✅ Scan réseau terminé. Hôtes détectés: ${data.total_found}`);
         logToConsole(`📊 Candidats switches: ${data.switch_candidates}`);
+        if (data.shared_with) {
+          logToConsole(`🔗 Résultats partagés avec le scan déjà en cours de ${data.shared_with}`);
+        }
+        logScanDelta(data.delta);
         updateStatus('Connecté', 'Scan terminé');
 
         displayScanResults(data.hosts || []);
@@ -263,7 +466,8 @@ document.addEventListener('DOMContentLoaded', () => {
       .catch(err => {
         logToConsole(`❌ Erreur réseau pendant le scan: ${err.message || err}`, false);
         updateStatus('Erreur', 'Scan échoué');
-      });
+      })
+      .finally(() => untrackOperation(operationId));
     });
   }
 
@@ -275,11 +479,71 @@ document.addEventListener('DOMContentLoaded', () => {
       
       if (tbody) tbody.innerHTML = '';
       if (scanResultsDiv) scanResultsDiv.classList.add('hidden');
+      shownHosts = [];
       
       logToConsole('🗑️ Résultats effacés');
     });
   }
 
+  // Verify Candidates button: SSH, sudo and OVS checked on every switch candidate at once
+  if (verifyCandidatesBtn) {
+    verifyCandidatesBtn.addEventListener('click', () => {
+      const password = sshPassword?.value.trim();
+      const candidates = shownHosts.filter(h => h.is_switch_candidate).map(h => h.ip);
+
+      if (!password) {
+        logToConsole('❌ Veuillez entrer le mot de passe SSH', false);
+        return;
+      }
+      if (candidates.length === 0) {
+        logToConsole('❌ Aucun candidat switch à vérifier', false);
+        return;
+      }
+
+      logToConsole(`🔌 Vérification de ${candidates.length} candidats switches...`);
+      updateStatus('En cours', 'Vérification des switches');
+
+      // Each switch is reported as soon as it has been checked
+      const operationId = trackOperation({
+        'verify.result': result => {
+          if (result.success) {
+            logToConsole(`✅ ${result.ip} : OVS ${result.ovs_version || ''} (${result.bridges} bridges, ${result.elapsed} s)`);
+          } else {
+            logToConsole(`❌ ${result.ip} : ${result.error}`, false);
+          }
+        }
+      });
+
+      fetch('/api/verify_switches', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          hosts: candidates,
+          username: 'kali',
+          password: password,
+          async: true,
+          operation_id: operationId
+        })
+      })
+      .then(res => res.json())
+      .then(data => jobResult(data, 'Vérification des switches'))
+      .then(data => {
+        if (!data.success) {
+          logToConsole(`❌ Erreur lors de la vérification : ${data.error}`, false);
+          updateStatus('Erreur', 'Vérification échouée');
+          return;
+        }
+        logToConsole(`📊 Switches vérifiés : ${data.verified}/${data.total}`);
+        updateStatus('Connecté', 'Vérification terminée');
+      })
+      .catch(err => {
+        logToConsole(`❌ Erreur lors de la vérification: ${err.message || err}`, false);
+        updateStatus('Erreur', 'Vérification échouée');
+      })
+      .finally(() => untrackOperation(operationId));
+    });
+  }
+
   // Test Connection button
   if (testConnectionBtn) {
     testConnectionBtn.addEventListener('click', () => {
@@ -403,7 +667,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
       logToConsole('🔄 Sauvegarde en cours...');
 
-      const requestBody = { password, switch: switchName };
+      const operationId = trackOperation({
+        'backup.port': port => consoleLine(`💾 ${port.port} (${port.type || 'system'}) ${port.done}/${port.total}`)
+      });
+      const requestBody = { password, switch: switchName, async: true, operation_id: operationId };
       if (selectedSwitch) {
         requestBody.target_host = selectedSwitch;
       }
@@ -414,6 +681,7 @@ document.addEventListener('DOMContentLoaded', () => {
         body: JSON.stringify(requestBody)
       })
       .then(response => response.json())
+      .then(data => jobResult(data, 'Sauvegarde'))
       .then(data => {
         if (data.success) {
           logToConsole(`✅ Sauvegarde terminée ! Fichier: ${data.file}`);
@@ -426,7 +694,8 @@ document.addEventListener('DOMContentLoaded', () => {
       .catch(err => {
         console.error('Backup error:', err);
         logToConsole(`❌ Erreur réseau lors de la sauvegarde: ${err.message || err}`, false);
-      });
+      })
+      .finally(() => untrackOperation(operationId));
     });
   }
 
@@ -485,6 +754,15 @@ document.addEventListener('DOMContentLoaded', () => {
 
       logToConsole(`🔄 Chargement de la configuration sur ${switchIP}...`);
 
+      // Each command is shown as soon as its outcome is known
+      let streamed = 0;
+      const operationId = trackOperation({
+        'apply.result': ({ command, error }) => {
+          streamed++;
+          consoleLine(error && error.trim() ? `❌ ${command} : ${error}` : `✅ ${command}`);
+        }
+      });
+
       try {
         const response = await fetch('/api/load_config', {
           method: 'POST',
@@ -492,7 +770,9 @@ document.addEventListener('DOMContentLoaded', () => {
           body: JSON.stringify({
             backup_file: backupFile,
             switch_name: switchIP,
-            password
+            password,
+            async: true,
+            operation_id: operationId
           })
         });
 
@@ -504,12 +784,16 @@ document.addEventListener('DOMContentLoaded', () => {
           return;
         }
 
-        const result = await response.json();
+        const result = await jobResult(await response.json(), 'Chargement de configuration');
 
         if (result.success) {
           logToConsole(`✅ Configuration "${backupFile}" appliquée à ${switchIP} avec succès.`);
 
-          if (result.results && result.results.length > 0) {
+          if (result.results && result.results.length > 0 && streamed >= result.results.length) {
+            // Already shown one by one while they ran
+            const errorCount = result.results.filter(([, , error]) => error && error.trim()).length;
+            logToConsole(`📊 Résumé: ${result.results.length - errorCount} succès, ${errorCount} erreurs`, errorCount === 0);
+          } else if (result.results && result.results.length > 0) {
             consoleOutput.value += '\n--- Détails des commandes exécutées ---\n';
             let successCount = 0;
             let errorCount = 0;
@@ -533,6 +817,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
             consoleOutput.value += `\n📊 Résumé: ${successCount} succès, ${errorCount} erreurs\n`;
             consoleOutput.scrollTop = consoleOutput.scrollHeight;
+          } else if (result.summary && result.summary.in_sync) {
+            logToConsole(`ℹ️ ${switchIP} est déjà synchronisé avec "${backupFile}", aucune commande envoyée.`);
           }
         } else {
           logToConsole(`❌ Erreur lors du chargement : ${result.error}`, false);
@@ -540,6 +826,8 @@ document.addEventListener('DOMContentLoaded', () => {
       } catch (error) {
         console.error('Load config error:', error);
         logToConsole(`❌ Erreur réseau ou serveur : ${error.message}`, false);
+      } finally {
+        untrackOperation(operationId);
       }
     });
   }
@@ -0,0 +1,27 @@
+# tests/test_event_bus.py
+
+from services.event_bus import EventBus
+
+
+def test_subscriber_only_gets_its_operation():
+    bus = EventBus()
+    subscription = bus.subscribe(operation='op1')
+    bus.publish('scan.host', 1, operation='op2')
+    bus.publish('scan.host', 2, operation='op1')
+    assert subscription.get(timeout=0)['data'] == 2
+    assert subscription.get(timeout=0) is None
+
+
+def test_replay_overflow_flags_the_subscriber_dropped():
+    bus = EventBus()
+    for i in range(10):
+        bus.publish('scan.host', i, operation='op1')
+    subscription = bus.subscribe(operation='op1', last_event_id=0, max_queue=4)
+    assert subscription.dropped
+    assert [subscription.get(timeout=0)['data'] for _ in range(4)] == [0, 1, 2, 3]
+    assert bus.stats()['subscribers'] == 0
+
+    # Resuming from the last event received gets the rest
+    resumed = bus.subscribe(operation='op1', last_event_id=4, max_queue=16)
+    assert not resumed.dropped
+    assert resumed.pending == 6
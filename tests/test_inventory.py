@@ -0,0 +1,64 @@
+# tests/test_inventory.py
+
+import ipaddress
+
+from services.inventory import DeviceInventory
+
+NETWORK = ipaddress.IPv4Network('10.0.0.0/24')
+
+
+def host(ip, hostname=None, open_ports=(22,)):
+    return {'ip': ip, 'hostname': hostname or ip, 'open_ports': list(open_ports), 'device_type': 'SSH Server'}
+
+
+def scan(inventory, hosts, resolve_names=True):
+    inventory_scan = inventory.begin_scan(NETWORK, resolve_names=resolve_names)
+    for host_info in hosts:
+        inventory_scan.record(host_info)
+    return inventory_scan.finish()
+
+
+def test_delta_of_successive_scans(tmp_path):
+    inventory = DeviceInventory(str(tmp_path / 'inventory.db'))
+    assert scan(inventory, [host('10.0.0.1'), host('10.0.0.2')])['new'] == ['10.0.0.1', '10.0.0.2']
+
+    delta = scan(inventory, [host('10.0.0.1', open_ports=(22, 830)), host('10.0.0.3')])
+    assert (delta['new'], delta['changed'], delta['gone']) == (['10.0.0.3'], ['10.0.0.1'], ['10.0.0.2'])
+
+
+def test_scan_without_name_resolution_keeps_known_names(tmp_path):
+    inventory = DeviceInventory(str(tmp_path / 'inventory.db'))
+    scan(inventory, [host('10.0.0.1', 'sw1.lab')])
+
+    delta = scan(inventory, [host('10.0.0.1'), host('10.0.0.2')], resolve_names=False)
+    assert delta['changed'] == []
+    assert delta['new'] == ['10.0.0.2']
+    assert [h['hostname'] for h in inventory.hosts(NETWORK)] == ['sw1.lab', '10.0.0.2']
+
+    delta = scan(inventory, [host('10.0.0.1', 'sw1-new.lab'), host('10.0.0.2')])
+    assert delta['changed'] == ['10.0.0.1']
+
+
+def test_hosts_whose_details_failed_are_not_gone(tmp_path):
+    inventory = DeviceInventory(str(tmp_path / 'inventory.db'))
+    scan(inventory, [host('10.0.0.1', 'sw1.lab'), host('10.0.0.2')])
+
+    inventory_scan = inventory.begin_scan(NETWORK)
+    inventory_scan.record(host('10.0.0.2'))
+    inventory_scan.keep('10.0.0.1')
+    delta = inventory_scan.finish()
+    assert delta['gone'] == []
+    assert delta['reused'] == 0
+    assert [h['hostname'] for h in inventory.hosts(NETWORK)] == ['sw1.lab', '10.0.0.2']
+
+
+def test_addresses_the_scan_skips_are_not_gone(tmp_path):
+    inventory = DeviceInventory(str(tmp_path / 'inventory.db'))
+    # Recorded as hosts by a scan of a wider range
+    wide = inventory.begin_scan(ipaddress.IPv4Network('10.0.0.0/16'))
+    for ip in ('10.0.0.0', '10.0.0.5', '10.0.0.255'):
+        wide.record(host(ip))
+    wide.finish()
+
+    assert scan(inventory, [])['gone'] == ['10.0.0.5']
+    assert [h['ip'] for h in inventory.hosts(NETWORK)] == ['10.0.0.0', '10.0.0.255']
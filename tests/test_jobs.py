@@ -0,0 +1,36 @@
+# tests/test_jobs.py
+
+import threading
+import time
+
+from flask import Flask
+
+from routes.jobs import jobs_bp
+from services.job_engine import CANCELLED, JobEngine, job_engine
+
+
+def test_results_only_come_with_the_job_itself():
+    app = Flask(__name__)
+    app.register_blueprint(jobs_bp)
+    client = app.test_client()
+
+    job = job_engine.submit('test', lambda job: {'success': True, 'hosts': ['10.0.0.1'] * 1000})
+    job._future.result(5)
+
+    listed = [j for j in client.get('/api/jobs?kind=test').get_json()['jobs'] if j['id'] == job.id]
+    assert listed and 'result' not in listed[0]
+    assert client.get(f'/api/jobs/{job.id}').get_json()['job']['result']['hosts'][0] == '10.0.0.1'
+
+
+def test_budget_starts_when_the_job_runs():
+    engine = JobEngine(max_workers=1)
+    release = threading.Event()
+    engine.submit('test', lambda job: release.wait(5))
+    queued = engine.submit('test', lambda job: job.deadline.remaining(), budget=0.5)
+    cancelled = engine.submit('test', lambda job: 'ran', budget=0.5)
+    time.sleep(0.6)
+    assert engine.cancel(cancelled.id)
+    release.set()
+
+    assert queued._future.result(5) is None and queued.result > 0.3
+    assert cancelled.status == CANCELLED and cancelled.result is None
@@ -0,0 +1,29 @@
+# tests/test_ovs_cache.py
+
+import threading
+
+import pytest
+
+from services.deadline import Deadline, DeadlineExceeded
+from services.ovs_cache import OvsQueryCache
+
+
+def test_follower_stops_waiting_at_its_deadline():
+    cache = OvsQueryCache()
+    started, release = threading.Event(), threading.Event()
+
+    def slow_loader():
+        started.set()
+        release.wait(5)
+        return 'br0\n', ''
+
+    leader = threading.Thread(target=cache.get_or_load, args=('sw', 'ovs-vsctl list-br', slow_loader))
+    leader.start()
+    try:
+        assert started.wait(5)
+        with pytest.raises(DeadlineExceeded):
+            cache.get_or_load('sw', 'ovs-vsctl list-br', slow_loader, deadline=Deadline(0.2))
+    finally:
+        release.set()
+        leader.join()
+    assert cache.get_or_load('sw', 'ovs-vsctl list-br', slow_loader, deadline=Deadline(0.2)) == ('br0\n', '')
@@ -0,0 +1,71 @@
+# tests/test_ovs_configurator.py
+
+from services import ovs_configurator
+from services.ovs_configurator import apply_configuration_batch, format_batch
+from services.transports import FakeTransport, register_transport, unregister_transport
+
+
+def apply(monkeypatch, commands, failing=None, max_length=None):
+    """Apply commands against a fake ovs-vsctl that rejects any batch mentioning failing"""
+    sent = []
+
+    def run_ovs_command(cmd, hostname=None, password=None, deadline=None):
+        sent.append(cmd)
+        if failing and failing in cmd:
+            return "", f"ovs-vsctl: cannot create a port named {failing}"
+        return "", ""
+
+    monkeypatch.setattr(ovs_configurator, 'run_ovs_command', run_ovs_command)
+    if max_length:
+        monkeypatch.setattr(ovs_configurator, 'MAX_BATCH_LENGTH', max_length)
+    return apply_configuration_batch(commands, 'switch', 'pw'), sent
+
+
+COMMANDS = [['--may-exist', 'add-br', 'br0'], ['--may-exist', 'add-port', 'br0', 'eth1'],
+            ['--may-exist', 'add-port', 'brX', 'eth2'], ['--may-exist', 'add-port', 'br0', 'eth3']]
+
+
+def test_one_transaction_for_the_whole_plan(monkeypatch):
+    results, sent = apply(monkeypatch, COMMANDS)
+    assert sent == [format_batch(COMMANDS)]
+    assert all(err == "" for _, _, err in results)
+
+
+def test_failed_transaction_rolls_back_all_of_it(monkeypatch):
+    results, sent = apply(monkeypatch, COMMANDS, failing='eth2')
+    assert len(sent) == 1
+    errors = [err for _, _, err in results]
+    assert errors[2] == "ovs-vsctl: cannot create a port named eth2"
+    assert all(err.startswith("Not applied: transaction rolled back") for err in errors[:2] + errors[3:])
+    assert "remain applied" not in errors[0]
+
+
+def test_split_plan_reports_earlier_transactions_as_applied(monkeypatch):
+    # Two sub-commands per transaction
+    results, sent = apply(monkeypatch, COMMANDS, failing='eth2', max_length=90)
+    assert len(sent) == 2
+    errors = [err for _, _, err in results]
+    assert errors[:2] == ["", ""]
+    assert errors[2] == "ovs-vsctl: cannot create a port named eth2"
+    assert errors[3].startswith("Not applied: transaction rolled back")
+    assert "the 2 commands of earlier transactions remain applied" in errors[3]
+
+
+def test_transactions_after_a_failure_are_not_sent(monkeypatch):
+    results, sent = apply(monkeypatch, list(reversed(COMMANDS)), failing='eth2', max_length=90)
+    assert len(sent) == 1
+    assert [err for _, _, err in results][2:] == ["Not applied: an earlier transaction failed"] * 2
+
+
+def test_failure_without_an_ovs_vsctl_message(monkeypatch):
+    register_transport('switch', FakeTransport({
+        format_batch(COMMANDS): ("[sudo] password for kali: \r\nSorry, try again.\r\n"
+                                 "sudo: 1 incorrect password attempt\r\n", "", 1),
+    }, target='switch'))
+    try:
+        results = apply_configuration_batch(COMMANDS, 'switch', 'pw')
+    finally:
+        unregister_transport('switch')
+    errors = [err for _, _, err in results]
+    assert all(err == "Not applied: transaction rolled back (sudo: 1 incorrect password attempt)"
+               for err in errors), errors
@@ -0,0 +1,38 @@
+# tests/test_ovs_load_config.py
+
+from routes import ovs_load_config
+from services import ovs_configurator, ovs_planner
+from tests.test_ovs_planner import backup, topology
+
+CONFIG = backup({'br0': {'br0': 'internal', 'eth1': '', 'eth2': ''}})
+
+
+def load(monkeypatch, current, batch):
+    sent = []
+
+    def run_ovs_command(cmd, hostname=None, password=None, deadline=None):
+        sent.append(cmd)
+        return "", ""
+
+    monkeypatch.setattr(ovs_planner, 'read_switch_state', lambda host, password, deadline=None: current)
+    monkeypatch.setattr(ovs_configurator, 'run_ovs_command', run_ovs_command)
+    payload, status = ovs_load_config.perform_load_config(CONFIG, 'switch', 'pw', batch=batch)
+    assert status == 200
+    return payload, sent
+
+
+def test_diff_restore_honours_batch(monkeypatch):
+    current = (topology({'br0': {'br0': 'internal'}}), '')
+    payload, sent = load(monkeypatch, current, batch=False)
+    assert payload['mode'] == 'diff'
+    assert len(sent) == len(payload['plan']) == 2
+
+    payload, sent = load(monkeypatch, current, batch=True)
+    assert len(sent) == 1
+
+
+def test_unreadable_switch_falls_back_to_a_reported_full_replay(monkeypatch):
+    payload, sent = load(monkeypatch, (None, 'connection refused'), batch=True)
+    assert payload['mode'] == 'full_replay'
+    assert 'connection refused' in payload['diff_error']
+    assert len(sent) == 1
@@ -0,0 +1,77 @@
+# tests/test_ovs_planner.py
+
+from services.ovs_planner import plan_restore
+from services.ovs_topology import Topology
+
+
+def topology(bridges):
+    """Topology from {bridge: {port: interface type}}"""
+    tables = {'Bridge': [], 'Port': [], 'Interface': []}
+    for bridge, ports in bridges.items():
+        port_uuids = []
+        for port, port_type in ports.items():
+            tables['Interface'].append({'_uuid': f'i-{port}', 'name': port, 'type': port_type})
+            tables['Port'].append({'_uuid': f'p-{port}', 'name': port, 'interfaces': f'i-{port}'})
+            port_uuids.append(f'p-{port}')
+        tables['Bridge'].append({'_uuid': f'b-{bridge}', 'name': bridge, 'ports': port_uuids})
+    return Topology.from_tables(tables)
+
+
+def backup(bridges, interfaces=None):
+    """Backup dict from {bridge: {port: type}}"""
+    return {
+        'bridges': [{'name': bridge, 'ports': [{'name': port, 'type': port_type} for port, port_type in ports.items()]}
+                    for bridge, ports in bridges.items()],
+        'interfaces': [{'name': name, 'type': iface_type} for name, iface_type in (interfaces or {}).items()],
+    }
+
+
+def test_in_sync_switch_needs_no_command():
+    current = topology({'br0': {'br0': 'internal', 'eth1': '', 'vif1': 'internal'}})
+    commands, summary = plan_restore(backup({'br0': {'eth1': '', 'vif1': 'internal'}}), current)
+    assert commands == []
+    assert summary['in_sync']
+
+
+def test_missing_bridge_and_port_are_added_with_their_type():
+    current = topology({'br0': {'br0': 'internal'}})
+    commands, summary = plan_restore(backup({'br0': {'vif1': 'internal'}, 'br1': {'eth2': ''}}), current)
+    assert commands == [
+        ['--may-exist', 'add-port', 'br0', 'vif1'],
+        ['set', 'Interface', 'vif1', 'type=internal'],
+        ['--may-exist', 'add-br', 'br1'],
+        ['--may-exist', 'add-port', 'br1', 'eth2'],
+    ]
+    assert summary['bridges_added'] == ['br1']
+    assert summary['types_changed'] == ['vif1: system -> internal']
+
+
+def test_moved_port_keeps_its_type():
+    current = topology({'br0': {'br0': 'internal', 'vif1': 'internal'}, 'br1': {'br1': 'internal'}})
+    commands, summary = plan_restore(backup({'br0': {}, 'br1': {'vif1': 'internal'}}), current)
+    assert commands == [
+        ['--if-exists', 'del-port', 'br0', 'vif1'],
+        ['--may-exist', 'add-port', 'br1', 'vif1'],
+        ['set', 'Interface', 'vif1', 'type=internal'],
+    ]
+    assert summary['ports_removed'] == ['br0/vif1']
+    assert summary['ports_added'] == ['br1/vif1']
+
+
+def test_type_change_on_existing_port():
+    current = topology({'br0': {'br0': 'internal', 'vx1': ''}})
+    commands, summary = plan_restore(backup({'br0': {'vx1': ''}}, {'vx1': 'vxlan'}), current)
+    assert commands == [['set', 'Interface', 'vx1', 'type=vxlan']]
+    assert summary['types_changed'] == ['vx1: system -> vxlan']
+
+
+def test_extra_ports_are_kept_unless_pruning():
+    current = topology({'br0': {'br0': 'internal', 'eth1': '', 'eth9': ''}})
+    config = backup({'br0': {'eth1': ''}})
+
+    commands, _ = plan_restore(config, current)
+    assert commands == []
+
+    commands, summary = plan_restore(config, current, prune=True)
+    assert commands == [['--if-exists', 'del-port', 'br0', 'eth9']]
+    assert summary['ports_removed'] == ['br0/eth9']
@@ -0,0 +1,63 @@
+# tests/test_scan_ranges.py
+
+import ipaddress
+import random
+
+import pytest
+
+from services.scan_ranges import count_addresses, iter_addresses, parse_exclusions
+
+
+def addresses(network, exclude=None):
+    network = ipaddress.IPv4Network(network)
+    exclusions = parse_exclusions(exclude)
+    found = [str(address) for address in iter_addresses(network, exclusions)]
+    assert count_addresses(network, exclusions) == len(found)
+    return found
+
+
+def test_point_to_point_and_single_host_networks():
+    assert addresses('10.0.0.0/31') == ['10.0.0.0', '10.0.0.1']
+    assert addresses('10.0.0.5/32') == ['10.0.0.5']
+    assert addresses('10.0.0.0/31', '10.0.0.1') == ['10.0.0.0']
+    assert addresses('10.0.0.5/32', '10.0.0.5') == []
+
+
+def test_network_and_broadcast_are_skipped():
+    found = addresses('10.0.0.0/29', '10.0.0.0/30')
+    assert found == ['10.0.0.4', '10.0.0.5', '10.0.0.6']
+
+
+def test_overlapping_exclusions():
+    assert parse_exclusions('10.0.0.0/26, 10.0.0.0/25 10.0.0.100-10.0.0.130') == \
+        [ipaddress.IPv4Network('10.0.0.0/25'), ipaddress.IPv4Network('10.0.0.128/31'),
+         ipaddress.IPv4Network('10.0.0.130/32')]
+    assert addresses('10.0.0.0/24', ['10.0.0.0/25', '10.0.0.64-10.0.0.200', '10.0.0.199']) == \
+        [f'10.0.0.{i}' for i in range(201, 255)]
+
+
+def test_exclusion_larger_than_the_network():
+    assert addresses('10.0.0.0/28', '10.0.0.0/8') == []
+    assert addresses('10.0.0.0/28', '192.168.0.0/16') == [f'10.0.0.{i}' for i in range(1, 15)]
+
+
+def test_inverted_range_is_rejected():
+    with pytest.raises(ValueError):
+        parse_exclusions('10.0.0.20-10.0.0.10')
+    with pytest.raises(ValueError):
+        parse_exclusions('10.0.0.300')
+
+
+def test_count_matches_iteration():
+    rng = random.Random(0)
+    for _ in range(300):
+        prefix = rng.randint(22, 32)
+        network = ipaddress.IPv4Network((rng.getrandbits(32), prefix), strict=False)
+        exclude = []
+        for _ in range(rng.randint(0, 4)):
+            first = int(network.network_address) + rng.randrange(network.num_addresses + 8) - 4
+            last = first + rng.randrange(64)
+            exclude.append(f'{ipaddress.IPv4Address(first)}-{ipaddress.IPv4Address(last)}')
+        blocks = parse_exclusions(exclude)
+        expected = [str(a) for a in network.hosts() if not any(a in block for block in blocks)]
+        assert addresses(network, exclude) == expected, (network, exclude)
@@ -0,0 +1,37 @@
+# tests/test_ssh_session.py
+
+import pytest
+
+from services import ssh_session
+from services.ssh_scheduler import QueueTimeout, SSHScheduler
+from services.ssh_session import PrivilegedSession, SessionManager
+
+
+class FakeConnection:
+    hostname = 'sw1'
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(ssh_session.ssh_pool, 'acquire', lambda hostname, **kwargs: FakeConnection())
+    monkeypatch.setattr(ssh_session.ssh_pool, 'release', lambda conn, discard=False: None)
+    monkeypatch.setattr(PrivilegedSession, 'open', lambda self: None)
+    monkeypatch.setattr(PrivilegedSession, 'is_alive', lambda self: True)
+    monkeypatch.setattr(PrivilegedSession, 'run', lambda self, cmd, timeout=None: (cmd, '', 0))
+    manager = SessionManager(scheduler=SSHScheduler(max_per_host=2))
+    yield manager
+    manager.close_all()
+
+
+def test_session_holds_a_host_slot_while_it_lives(manager):
+    scheduler = manager.scheduler
+    assert manager.run('ovs-vsctl show', 'sw1', password='pw') == ('ovs-vsctl show', '', 0)
+    assert manager.run('ovs-vsctl show', 'sw1', password='pw') == ('ovs-vsctl show', '', 0)
+    assert scheduler.stats()['hosts']['sw1']['running'] == 1
+
+    with scheduler.slot('sw1', timeout=1):
+        with pytest.raises(QueueTimeout):
+            scheduler.acquire('sw1', timeout=0.1)
+
+    manager.close_host('sw1')
+    assert scheduler.stats()['hosts']['sw1']['running'] == 0
@@ -0,0 +1,22 @@
+# tests/test_ssh_utils.py
+
+import random
+
+from services.ssh_utils import iter_lines
+
+
+def test_crlf_split_across_chunks_is_one_line_end():
+    assert list(iter_lines(['a\r', '\nb\r', '', '\n'])) == ['a', 'b']
+
+
+def test_line_spanning_many_chunks():
+    assert list(iter_lines(['ab', 'c', 'd\nef'])) == ['abcd', 'ef']
+
+
+def test_same_lines_as_splitlines_whatever_the_chunking():
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = ''.join(rng.choice('ab\r\n') for _ in range(rng.randint(0, 20)))
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 5))))
+        chunks = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+        assert list(iter_lines(chunks)) == text.splitlines(), chunks
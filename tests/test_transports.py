@@ -0,0 +1,61 @@
+# tests/test_transports.py
+
+import pytest
+
+from services.deadline import Deadline, DeadlineExceeded
+from services.ovs_cache import ovs_cache
+from services.ssh_utils import run_ovs_command, run_ovs_commands, stream_ovs_command
+from services.transports import FakeTransport, Transport, register_transport, unregister_transport
+
+TARGET = 'switch-under-test'
+
+
+@pytest.fixture
+def fake():
+    transport = FakeTransport({
+        'ovs-vsctl list-br': 'br0\nbr1\n',
+        'ovs-vsctl add-br br2': '',
+        'ovs-vsctl show': ('', 'ovs-vsctl: unix:/var/run/openvswitch/db.sock: database connection failed'),
+    }, target=TARGET)
+    register_transport(TARGET, transport)
+    ovs_cache.invalidate_host(TARGET)
+    yield transport
+    unregister_transport(TARGET)
+    ovs_cache.invalidate_host(TARGET)
+
+
+def test_transport_is_abstract():
+    with pytest.raises(TypeError):
+        Transport('x')
+
+
+def test_reads_are_cached_until_a_mutation(fake):
+    assert run_ovs_command('ovs-vsctl list-br', hostname=TARGET) == ('br0\nbr1\n', '')
+    assert run_ovs_command('ovs-vsctl list-br', hostname=TARGET) == ('br0\nbr1\n', '')
+    assert fake.calls == ['ovs-vsctl list-br']
+
+    run_ovs_command('ovs-vsctl add-br br2', hostname=TARGET)
+    run_ovs_command('ovs-vsctl list-br', hostname=TARGET)
+    assert fake.calls == ['ovs-vsctl list-br', 'ovs-vsctl add-br br2', 'ovs-vsctl list-br']
+
+
+def test_errors_are_not_cached(fake):
+    for _ in range(2):
+        out, err = run_ovs_command('ovs-vsctl show', hostname=TARGET)
+        assert out == '' and 'database connection failed' in err
+    assert fake.calls == ['ovs-vsctl show'] * 2
+
+
+def test_run_many_and_stream(fake):
+    results = run_ovs_commands(['ovs-vsctl list-br', 'ovs-vsctl list-br', 'unknown'], hostname=TARGET)
+    assert results['ovs-vsctl list-br'] == ('br0\nbr1\n', '')
+    assert 'no response' in results['unknown'][1]
+    assert list(stream_ovs_command('ovs-vsctl list-br', hostname=TARGET)) == ['br0', 'br1']
+
+
+def test_expired_deadline_stops_the_command(fake):
+    deadline = Deadline(60)
+    deadline.cancel()
+    with pytest.raises(DeadlineExceeded):
+        list(stream_ovs_command('ovs-vsctl list-br', hostname=TARGET, deadline=deadline))
+    assert fake.calls == []